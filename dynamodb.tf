@@ -15,3 +15,22 @@ resource "aws_dynamodb_table" "svep_references" {
     type = "S"
   }
 }
+
+# Progress Table
+resource "aws_dynamodb_table" "svep_progress" {
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "request_id"
+  name         = var.svep-progress-table-name
+
+  tags = var.common-tags
+
+  attribute {
+    name = "request_id"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+}
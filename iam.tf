@@ -18,12 +18,20 @@ data "aws_iam_policy_document" "main-apigateway" {
 # initQuery Lambda Function
 #
 data "aws_iam_policy_document" "lambda-initQuery" {
+  statement {
+    actions = [
+      "dynamodb:PutItem",
+    ]
+    resources = [
+      aws_dynamodb_table.svep_progress.arn,
+    ]
+  }
+
   statement {
     actions = [
       "SNS:Publish",
     ]
     resources = [
-      aws_sns_topic.concatStarter.arn,
       aws_sns_topic.queryVCF.arn,
       aws_sns_topic.sendJobEmail.arn,
     ]
@@ -110,11 +118,21 @@ data "aws_iam_policy_document" "lambda-initQuery" {
 # queryVCF Lambda Function
 #
 data "aws_iam_policy_document" "lambda-queryVCF" {
+  statement {
+    actions = [
+      "dynamodb:UpdateItem",
+    ]
+    resources = [
+      aws_dynamodb_table.svep_progress.arn,
+    ]
+  }
+
   statement {
     actions = [
       "SNS:Publish",
     ]
     resources = [
+      aws_sns_topic.concatStarter.arn,
       aws_sns_topic.queryGTF.arn,
       aws_sns_topic.queryVCF.arn,
       aws_sns_topic.queryVCFsubmit.arn,
@@ -142,6 +160,15 @@ data "aws_iam_policy_document" "lambda-queryVCF" {
     ]
   }
 
+  statement {
+    actions = [
+      "s3:GetObject",
+    ]
+    resources = [
+      "${aws_s3_bucket.svep-references.arn}/*",
+    ]
+  }
+
   statement {
     actions = [
       "s3:ListBucket",
@@ -185,11 +212,21 @@ data "aws_iam_policy_document" "lambda-queryVCF" {
 # queryVCFsubmit Lambda Function
 #
 data "aws_iam_policy_document" "lambda-queryVCFsubmit" {
+  statement {
+    actions = [
+      "dynamodb:UpdateItem",
+    ]
+    resources = [
+      aws_dynamodb_table.svep_progress.arn,
+    ]
+  }
+
   statement {
     actions = [
       "SNS:Publish",
     ]
     resources = [
+      aws_sns_topic.concatStarter.arn,
       aws_sns_topic.queryGTF.arn,
       aws_sns_topic.sendJobEmail.arn,
     ]
@@ -258,11 +295,21 @@ data "aws_iam_policy_document" "lambda-queryVCFsubmit" {
 # queryGTF Lambda Function
 #
 data "aws_iam_policy_document" "lambda-queryGTF" {
+  statement {
+    actions = [
+      "dynamodb:UpdateItem",
+    ]
+    resources = [
+      aws_dynamodb_table.svep_progress.arn,
+    ]
+  }
+
   statement {
     actions = [
       "SNS:Publish",
     ]
     resources = [
+      aws_sns_topic.concatStarter.arn,
       aws_sns_topic.pluginConsequence.arn,
       aws_sns_topic.queryGTF.arn,
       aws_sns_topic.sendJobEmail.arn,
@@ -331,11 +378,21 @@ data "aws_iam_policy_document" "lambda-queryGTF" {
 # pluginConsequence Lambda Function
 #
 data "aws_iam_policy_document" "lambda-pluginConsequence" {
+  statement {
+    actions = [
+      "dynamodb:UpdateItem",
+    ]
+    resources = [
+      aws_dynamodb_table.svep_progress.arn,
+    ]
+  }
+
   statement {
     actions = [
       "SNS:Publish",
     ]
     resources = [
+      aws_sns_topic.concatStarter.arn,
       aws_sns_topic.pluginClinvar.arn,
       aws_sns_topic.sendJobEmail.arn,
     ]
@@ -413,11 +470,21 @@ data "aws_iam_policy_document" "lambda-pluginConsequence" {
 # pluginClinvar Lambda Function
 #
 data "aws_iam_policy_document" "lambda-pluginClinvar" {
+  statement {
+    actions = [
+      "dynamodb:UpdateItem",
+    ]
+    resources = [
+      aws_dynamodb_table.svep_progress.arn,
+    ]
+  }
+
   statement {
     actions = [
       "SNS:Publish",
     ]
     resources = [
+      aws_sns_topic.concatStarter.arn,
       aws_sns_topic.sendJobEmail.arn,
       aws_sns_topic.pluginGnomad.arn
     ]
@@ -487,14 +554,24 @@ data "aws_iam_policy_document" "lambda-pluginClinvar" {
 # pluginGnomad Lambda Function
 #
 data "aws_iam_policy_document" "lambda-pluginGnomad" {
+  statement {
+    actions = [
+      "dynamodb:UpdateItem",
+    ]
+    resources = [
+      aws_dynamodb_table.svep_progress.arn,
+    ]
+  }
+
   statement {
     actions = [
       "SNS:Publish",
     ]
     resources = [
+      aws_sns_topic.concatStarter.arn,
       aws_sns_topic.pluginGnomad.arn,
       aws_sns_topic.sendJobEmail.arn,
-      aws_sns_topic.pluginGnomadOneKG.arn,
+      aws_sns_topic.pluginGnomadConstraint.arn,
     ]
   }
 
@@ -518,77 +595,12 @@ data "aws_iam_policy_document" "lambda-pluginGnomad" {
     ]
   }
 
-  statement {
-    actions = [
-      "s3:ListBucket",
-    ]
-    resources = [
-      "${aws_s3_bucket.svep-references.arn}",
-    ]
-  }
-
   statement {
     actions = [
       "dynamodb:GetItem",
-      "dynamodb:PutItem",
-      "dynamodb:UpdateItem",
-    ]
-    resources = [
-      var.dynamo-clinic-jobs-table-arn,
-    ]
-  }
-
-  statement {
-    actions = [
-      "lambda:InvokeFunction",
-    ]
-    resources = [
-      var.clinic-job-email-lambda-function-arn,
-    ]
-  }
-
-  statement {
-    actions = [
-      "cognito-idp:ListUsers",
-    ]
-    resources = [
-      var.cognito-user-pool-arn,
-    ]
-  }
-}
-
-#
-# pluginGnomadOneKG Lambda Function
-#
-data "aws_iam_policy_document" "lambda-pluginGnomadOneKG" {
-  statement {
-    actions = [
-      "SNS:Publish",
-    ]
-    resources = [
-      aws_sns_topic.pluginGnomadConstraint.arn,
-      aws_sns_topic.pluginGnomadOneKG.arn,
-      aws_sns_topic.sendJobEmail.arn,
-    ]
-  }
-
-  statement {
-    actions = [
-      "s3:PutObject",
-      "s3:DeleteObject",
-      "s3:GetObject",
-    ]
-    resources = [
-      "${aws_s3_bucket.svep-temp.arn}/*",
-    ]
-  }
-
-  statement {
-    actions = [
-      "s3:GetObject",
     ]
     resources = [
-      "${aws_s3_bucket.svep-references.arn}/*",
+      aws_dynamodb_table.svep_references.arn,
     ]
   }
 
@@ -635,11 +647,21 @@ data "aws_iam_policy_document" "lambda-pluginGnomadOneKG" {
 # pluginGnomadConstraint Lambda Function
 #
 data "aws_iam_policy_document" "lambda-pluginGnomadConstraint" {
+  statement {
+    actions = [
+      "dynamodb:UpdateItem",
+    ]
+    resources = [
+      aws_dynamodb_table.svep_progress.arn,
+    ]
+  }
+
   statement {
     actions = [
       "SNS:Publish",
     ]
     resources = [
+      aws_sns_topic.concatStarter.arn,
       aws_sns_topic.pluginGnomadConstraint.arn,
       aws_sns_topic.sendJobEmail.arn,
       aws_sns_topic.formatOutput.arn,
@@ -778,7 +800,6 @@ data "aws_iam_policy_document" "lambda-concatStarter" {
     ]
     resources = [
       aws_sns_topic.concat.arn,
-      aws_sns_topic.concatStarter.arn,
       aws_sns_topic.sendJobEmail.arn,
     ]
   }
@@ -1220,11 +1241,21 @@ data "aws_iam_policy_document" "lambda-sendJobEmail" {
 # formatOutput Lambda Function
 #
 data "aws_iam_policy_document" "lambda-formatOutput" {
+  statement {
+    actions = [
+      "dynamodb:UpdateItem",
+    ]
+    resources = [
+      aws_dynamodb_table.svep_progress.arn,
+    ]
+  }
+
   statement {
     actions = [
       "SNS:Publish",
     ]
     resources = [
+      aws_sns_topic.concatStarter.arn,
       aws_sns_topic.sendJobEmail.arn,
     ]
   }
@@ -101,6 +101,18 @@ resource "aws_lambda_function_recursion_config" "plugin_consequence_recursion" {
 }
 
 
+#
+# pluginConsequencePython Lambda Function
+#
+resource "aws_lambda_permission" "plugin_consequence_python_invoke_permission" {
+  statement_id  = "SNSPluginConsequencePythonAllowInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = module.lambda-pluginConsequencePython.lambda_function_name
+  principal     = "sns.amazonaws.com"
+  source_arn    = aws_sns_topic.pluginConsequence.arn
+}
+
+
 #
 # pluginClinvar Lambda Function
 #
@@ -134,10 +146,6 @@ resource "aws_lambda_permission" "concat_starter_invoke_permission" {
   principal     = "sns.amazonaws.com"
   source_arn    = aws_sns_topic.concatStarter.arn
 }
-resource "aws_lambda_function_recursion_config" "concat_starter_recursion" {
-  function_name  = module.lambda-concatStarter.lambda_function_name
-  recursive_loop = "Allow"
-}
 
 #
 # createPages Lambda Function
@@ -235,17 +243,6 @@ resource "aws_lambda_permission" "plugin_plugin_gnomad_invoke_permission" {
   principal     = "sns.amazonaws.com"
   source_arn    = aws_sns_topic.pluginGnomad.arn
 
-}
-#
-# pluginGnomadOneKG Lambda Function
-#
-resource "aws_lambda_permission" "plugin_plugin_gnomad_one_kg_invoke_permission" {
-  statement_id  = "SNSPluginGnomadAllowInvoke"
-  action        = "lambda:InvokeFunction"
-  function_name = module.lambda-pluginGnomadOneKG.lambda_function_name
-  principal     = "sns.amazonaws.com"
-  source_arn    = aws_sns_topic.pluginGnomadOneKG.arn
-
 }
 #
 # pluginGnomadConstraint Lambda Function
@@ -14,6 +14,7 @@ import base64
 from functools import lru_cache
 
 from shared.apiutils import bad_request, bundle_response
+from shared.progress import progress_tracker
 from shared.utils import (
     chrom_matching,
     handle_failed_execution,
@@ -35,7 +36,6 @@ from shared.utils import (
 )
 
 # Environment variables
-CONCAT_STARTER_SNS_TOPIC_ARN = os.environ["CONCAT_STARTER_SNS_TOPIC_ARN"]
 SLICE_SIZE_MBP = int(os.environ["SLICE_SIZE_MBP"])
 ALLOWED_SNS_TOPIC_ARNS = os.environ.get("ALLOWED_SNS_TOPIC_ARNS", "").split(",")
 os.environ["PATH"] += f":{os.environ['LAMBDA_TASK_ROOT']}"
@@ -337,7 +337,11 @@ def lambda_handler(event, _):
     )
 
     print(vcf_regions)
-    with orchestration(request_id=request_id) as orc:
+    # The last tracked function to finish starts concatenation
+    progress_tracker.start_job(request_id, project)
+    with orchestration(
+        request_id=request_id, reference_versions=reference_versions
+    ) as orc:
         orc.next_function(
             message={
                 "regions": vcf_regions,
@@ -345,12 +349,6 @@ def lambda_handler(event, _):
                 "mapping": chrom_mapping,
             },
         )
-        orc.start_function(
-            CONCAT_STARTER_SNS_TOPIC_ARN,
-            {
-                "project": project,
-            },
-        )
     return bundle_response(
         200,
         {
@@ -2,10 +2,17 @@ import os
 from collections import defaultdict
 
 
+from shared.indexutils import (
+    REGION_MERGE_GAP,
+    TabixReader,
+    VariantLookup,
+    get_merged_regions,
+)
+from shared.refcache import reference_cache
 from shared.utils import (
-    CheckedProcess,
     orchestration,
     download_bedfile,
+    download_to_tmp,
 )
 
 # Environment variables
@@ -28,47 +35,77 @@ CLINVAR_COLUMNS = [
 ]
 FILTER_CLINVAR_EXCLUDE = set(os.environ["FILTER_CLINVAR_EXCLUDE"].split(",")) - {""}
 
-# Download reference genome and index
-download_bedfile(BUCKET_NAME, CLINVAR_REFERENCE)
+
+def load_clinvar():
+    # Download reference genome and index
+    download_bedfile(BUCKET_NAME, CLINVAR_REFERENCE)
+    clinvar_reader = TabixReader(f"/tmp/{CLINVAR_REFERENCE}")
+    # References built before lookups existed fall back to tabix queries
+    clinvar_lookup = (
+        VariantLookup(
+            f"/tmp/{CLINVAR_REFERENCE}.lookup",
+            f"/tmp/{CLINVAR_REFERENCE}",
+            bgzf=clinvar_reader.bgzf,
+        )
+        if download_to_tmp(BUCKET_NAME, f"{CLINVAR_REFERENCE}.lookup")
+        else None
+    )
+    paths = [
+        f"/tmp/{CLINVAR_REFERENCE}{suffix}"
+        for suffix in ("", ".tbi", ".csi", ".lookup")
+    ]
+    return (clinvar_reader, clinvar_lookup), paths
+
+
+def get_clinvar_records(ref_chrom, keys, reference_versions):
+    # Kept for the life of the container so warm invocations reuse cached blocks
+    clinvar_reader, clinvar_lookup = reference_cache.get(
+        "clinvar", reference_versions.get("clinvar_version"), load_clinvar
+    )
+    if clinvar_lookup is not None:
+        return {
+            key: [line.split("\t")[5:] for line in clinvar_lookup.get(ref_chrom, *key)]
+            for key in keys
+        }
+    records = defaultdict(list)
+    positions = [pos for pos, _, _ in keys]
+    for start, end in get_merged_regions(positions, REGION_MERGE_GAP):
+        for line in clinvar_reader.fetch(ref_chrom, start, end):
+            _, bed_start, _, bed_ref, bed_alt, *clinvar_data = line.split("\t")
+            pos = int(bed_start) + 1
+            # Records starting before the region were seen with an earlier one
+            if start <= pos <= end:
+                records[(pos, bed_ref, bed_alt)].append(clinvar_data)
+    return records
 
 
-def add_clinvar_columns(in_rows, ref_chrom):
+def add_clinvar_columns(in_rows, ref_chrom, reference_versions):
     num_rows_hit = 0
     results = []
     all_pos_rows = defaultdict(list)
     for in_row in in_rows:
         all_pos_rows[in_row["posVcf"]].append(in_row)
+    clinvar_records = get_clinvar_records(
+        ref_chrom,
+        {(row["posVcf"], row["refVcf"], row["altVcf"]) for row in in_rows},
+        reference_versions,
+    )
     for pos, pos_rows in all_pos_rows.items():
-        args = [
-            "tabix",
-            f"/tmp/{CLINVAR_REFERENCE}",
-            f"{ref_chrom}:{pos}-{pos}",
-        ]
-        query_process = CheckedProcess(args)
-        main_data = query_process.stdout.read().rstrip("\n").split("\n")
-        query_process.check()
         for in_row in pos_rows:
-            ref = in_row["refVcf"]
-            alt = in_row["altVcf"]
-            is_matched = False
-            for data in main_data:
-                if not data:
-                    continue
-                _, bed_start, _, bed_ref, bed_alt, *clinvar_data = data.split("\t")
-                if bed_alt == alt and bed_ref == ref and int(bed_start) + 1 == pos:
-                    is_matched = True
-                    results.append(
-                        dict(
-                            **in_row,
-                            **{
-                                col_name: clinvar_datum
-                                for col_name, clinvar_datum in zip(
-                                    CLINVAR_COLUMNS, clinvar_data
-                                )
-                            },
-                        )
+            matches = clinvar_records.get((pos, in_row["refVcf"], in_row["altVcf"]), [])
+            for clinvar_data in matches:
+                results.append(
+                    dict(
+                        **in_row,
+                        **{
+                            col_name: clinvar_datum
+                            for col_name, clinvar_datum in zip(
+                                CLINVAR_COLUMNS, clinvar_data
+                            )
+                        },
                     )
-            if is_matched:
+                )
+            if matches:
                 num_rows_hit += 1
     print(
         f"Matched {num_rows_hit}/{len(in_rows)} rows to Clinvar, for a total of {len(results)} rows"
@@ -86,7 +123,7 @@ def add_clinvar_columns(in_rows, ref_chrom):
 def lambda_handler(event, _):
     with orchestration(event) as orc:
         sns_data = orc.message["snsData"]
-        sns_data = add_clinvar_columns(sns_data, orc.ref_chrom)
+        sns_data = add_clinvar_columns(sns_data, orc.ref_chrom, orc.reference_versions)
         if sns_data:
             orc.next_function(
                 message={
@@ -57,6 +57,7 @@ use base qw(Exporter);
 use Data::Dumper;
 use consequence::CodonTable;
 use consequence::Sequence qw(reverse_comp);
+use ReferenceReader;
 #use consequence::Sequence qw(reverse_comp);
 
 our @EXPORT_OK = qw(overlap _intron_overlap within_feature within_cds MAX_DISTANCE_FROM_TRANSCRIPT within_intron stop_lost stop_retained start_lost frameshift $UPSTREAM_DISTANCE $DOWNSTREAM_DISTANCE);
@@ -692,7 +693,7 @@ sub get_adjacent_exon_nucleotides {
     my $cdna_start = $feat->{'cdna_coding_start'};
     my $cdna_end = $feat->{'cdna_coding_end'};
     my $position = $feat->{'position'};
-    my $tabix_result = `./tabix $gtf_file $reference_chr:$transcript_start-$transcript_end`;
+    my $tabix_result = ReferenceReader::tabix_query($gtf_file, "$reference_chr:$transcript_start-$transcript_end");
     my @cds_coords = ();
     my $exon_index = undef;
     for my $record (split /[\r\n]+/, $tabix_result){
@@ -720,9 +721,7 @@ sub get_adjacent_exon_nucleotides {
         my $next_start_coords = $cds_coords[$exon_index+1][0];
         ($query_start, $query_end) = ($next_start_coords, $next_start_coords-1+$num_bases);
     }
-    my $faidx_result = `./samtools faidx $fasta_file $reference_chr:$query_start-$query_end`;
-    my @faidx_lines = split(/\n/, $faidx_result);
-    return $faidx_lines[1];
+    return ReferenceReader::fetch_fasta($fasta_file, $reference_chr, $query_start, $query_end);
 }
 
 sub _get_peptide_alleles {
@@ -0,0 +1,299 @@
+package AwsClient;
+
+use strict;
+use warnings;
+
+use Digest::SHA qw(sha256_hex hmac_sha256 hmac_sha256_hex);
+use File::Basename qw(dirname);
+use File::Path qw(mkpath);
+use HTTP::Tiny;
+use JSON;
+use POSIX qw(strftime);
+
+# Calls S3, SNS and DynamoDB directly, signing requests with Signature
+# Version 4 from the Lambda's credentials. Each host keeps a connection
+# open for the rest of the invocation, so a call costs a round trip
+# rather than starting the AWS CLI.
+
+my $maxAttempts = 4;
+# Error codes, from a JSON __type or an XML Code, that throttled requests
+# are reported with alongside a 400 status, as retried by botocore
+my %throttlingCodes = map { $_ => 1 } qw(
+  ProvisionedThroughputExceededException
+  RequestLimitExceeded
+  RequestThrottled
+  SlowDown
+  Throttled
+  Throttling
+  ThrottlingException
+  TooManyRequestsException
+);
+my $region = $ENV{'AWS_REGION'} // $ENV{'AWS_DEFAULT_REGION'};
+my %agents;
+my $requests = 0;
+my $retries = 0;
+
+sub _agent {
+  my ($host) = @_;
+  return $agents{$host} //= HTTP::Tiny->new(
+    keep_alive => 1,
+    timeout => 60,
+    verify_SSL => 1,
+  );
+}
+
+sub _escape {
+  my ($value, $keepSlash) = @_;
+  utf8::encode($value) if utf8::is_utf8($value);
+  my $unreserved = $keepSlash ? 'A-Za-z0-9\-._~\/' : 'A-Za-z0-9\-._~';
+  $value =~ s/([^$unreserved])/sprintf('%%%02X', ord($1))/ge;
+  return $value;
+}
+
+sub _signing_key {
+  my ($date, $service) = @_;
+  my $key = hmac_sha256($date, "AWS4$ENV{'AWS_SECRET_ACCESS_KEY'}");
+  $key = hmac_sha256($region, $key);
+  $key = hmac_sha256($service, $key);
+  return hmac_sha256('aws4_request', $key);
+}
+
+sub _signed_headers {
+  # Headers for the request, including its Signature Version 4
+  # Authorization header
+  my ($method, $service, $host, $path, $query, $headers, $body) = @_;
+  my $amzDate = strftime('%Y%m%dT%H%M%SZ', gmtime());
+  my $date = substr($amzDate, 0, 8);
+  my $payloadHash = sha256_hex($body);
+  my %headers = (
+    %{$headers},
+    'x-amz-date' => $amzDate,
+    'x-amz-content-sha256' => $payloadHash,
+  );
+  if ($ENV{'AWS_SESSION_TOKEN'}) {
+    $headers{'x-amz-security-token'} = $ENV{'AWS_SESSION_TOKEN'};
+  }
+  my %canonical = (host => $host, map { lc($_) => $headers{$_} } keys %headers);
+  my @signed = sort keys %canonical;
+  my $canonicalRequest = join("\n",
+    $method,
+    $path,
+    $query,
+    join('', map { "$_:$canonical{$_}\n" } @signed),
+    join(';', @signed),
+    $payloadHash,
+  );
+  my $scope = "$date/$region/$service/aws4_request";
+  my $stringToSign = join("\n",
+    'AWS4-HMAC-SHA256',
+    $amzDate,
+    $scope,
+    sha256_hex($canonicalRequest),
+  );
+  my $signature = hmac_sha256_hex($stringToSign, _signing_key($date, $service));
+  $headers{'Authorization'} = "AWS4-HMAC-SHA256 Credential=$ENV{'AWS_ACCESS_KEY_ID'}/$scope, "
+    ."SignedHeaders=".join(';', @signed).", Signature=$signature";
+  return \%headers;
+}
+
+sub _error_code {
+  # The error code in the body of a failed response, if there is one
+  my ($response) = @_;
+  my $content = $response->{content} // '';
+  return $1 if $content =~ /"__type"\s*:\s*"(?:[^"#]*#)?([^"]*)"/;
+  return $1 if $content =~ m{<Code>([^<]*)</Code>};
+  return undef;
+}
+
+sub _is_retryable {
+  my ($response) = @_;
+  my $status = $response->{status};
+  # 599 is HTTP::Tiny's status for a connection that failed or was closed
+  return 1 if $status == 599 || $status >= 500 || $status == 429;
+  my $code = _error_code($response);
+  return defined $code && $throttlingCodes{$code};
+}
+
+sub _request {
+  # Sends a signed request and returns the HTTP::Tiny response, retrying
+  # dropped connections and server errors. Statuses in $allowed are
+  # returned rather than treated as failures. Throttled requests are
+  # retried too.
+  my (%args) = @_;
+  my $method = $args{method};
+  my $host = $args{host};
+  my $path = $args{path} // '/';
+  my $body = $args{body} // '';
+  my @query = map { [_escape($_->[0]), _escape($_->[1])] } @{$args{query} // []};
+  my $query = join('&', map { "$_->[0]=$_->[1]" } sort {
+    $a->[0] cmp $b->[0] or $a->[1] cmp $b->[1]
+  } @query);
+  my $url = "https://$host$path".($query ne '' ? "?$query" : '');
+  my %allowed = map { $_ => 1 } @{$args{allowed} // []};
+  my $response;
+  foreach my $attempt (1..$maxAttempts) {
+    # Signed afresh each time, as the signature covers the request time
+    my $headers = _signed_headers(
+      $method, $args{service}, $host, $path, $query, $args{headers} // {}, $body
+    );
+    my %options = (headers => $headers);
+    $options{content} = $body if length($body);
+    $options{data_callback} = $args{data_callback} if $args{data_callback};
+    $requests++;
+    $response = _agent($host)->request($method, $url, \%options);
+    return $response if $response->{success} || $allowed{$response->{status}};
+    last unless _is_retryable($response);
+    $retries++;
+    select(undef, undef, undef, 0.1 * 2 ** $attempt);
+  }
+  die "$args{service} $method $host$path failed with status $response->{status}: $response->{content}\n";
+}
+
+sub _s3_host {
+  my ($bucket) = @_;
+  return "$bucket.s3.$region.amazonaws.com";
+}
+
+sub s3_get_object {
+  # Contents of the object, or undef if it doesn't exist. Given $file, the
+  # object is streamed there instead and a true value returned.
+  my ($bucket, $key, $file) = @_;
+  my $fh;
+  my %args = (
+    service => 's3',
+    method => 'GET',
+    host => _s3_host($bucket),
+    path => '/'._escape($key, 1),
+    allowed => [404],
+  );
+  if (defined $file) {
+    open($fh, '>:raw', $file) or die "Could not open file '$file' $!";
+    my $attempt;
+    $args{data_callback} = sub {
+      my ($chunk, $response) = @_;
+      # A retried request starts the file again
+      if (!defined $attempt || $attempt != $response) {
+        $attempt = $response;
+        seek($fh, 0, 0);
+        truncate($fh, 0);
+      }
+      print $fh $chunk;
+    };
+  }
+  my $response = _request(%args);
+  if (defined $fh) {
+    close($fh);
+    if ($response->{status} == 404) {
+      unlink($file);
+      return undef;
+    }
+    return 1;
+  }
+  return $response->{status} == 404 ? undef : $response->{content};
+}
+
+sub s3_put_object {
+  my ($bucket, $key, $content) = @_;
+  _request(
+    service => 's3',
+    method => 'PUT',
+    host => _s3_host($bucket),
+    path => '/'._escape($key, 1),
+    body => $content,
+  );
+}
+
+sub s3_delete_object {
+  my ($bucket, $key) = @_;
+  _request(
+    service => 's3',
+    method => 'DELETE',
+    host => _s3_host($bucket),
+    path => '/'._escape($key, 1),
+  );
+}
+
+sub _xml_unescape {
+  my ($text) = @_;
+  my %entities = (amp => '&', lt => '<', gt => '>', quot => '"', apos => "'");
+  $text =~ s/&(amp|lt|gt|quot|apos);/$entities{$1}/g;
+  $text =~ s/&#(\d+);/chr($1)/ge;
+  return $text;
+}
+
+sub s3_list_keys {
+  # Keys in the bucket starting with $prefix
+  my ($bucket, $prefix) = @_;
+  my @keys;
+  my $token;
+  do {
+    my @query = (['list-type', '2'], ['prefix', $prefix]);
+    push @query, ['continuation-token', $token] if defined $token;
+    my $content = _request(
+      service => 's3',
+      method => 'GET',
+      host => _s3_host($bucket),
+      query => \@query,
+    )->{content};
+    push @keys, map { _xml_unescape($_) } $content =~ m{<Key>(.*?)</Key>}g;
+    $token = $content =~ m{<IsTruncated>true</IsTruncated>}
+      && $content =~ m{<NextContinuationToken>(.*?)</NextContinuationToken>}
+      ? _xml_unescape($1) : undef;
+  } while (defined $token);
+  return @keys;
+}
+
+sub s3_download_prefix {
+  # Copies the objects starting with $prefix into $dir, like
+  # aws s3 cp --recursive with --include "$prefix*", returning their count
+  my ($bucket, $prefix, $dir) = @_;
+  my @keys = s3_list_keys($bucket, $prefix);
+  foreach my $key (@keys) {
+    my $file = "$dir/$key";
+    mkpath(dirname($file));
+    s3_get_object($bucket, $key, $file);
+  }
+  return scalar(@keys);
+}
+
+sub sns_publish {
+  # Publishes $message, which should already be a JSON string, returning
+  # the response body
+  my ($topicArn, $message) = @_;
+  my @params = (
+    ['Action', 'Publish'],
+    ['Message', $message],
+    ['TopicArn', $topicArn],
+    ['Version', '2010-03-31'],
+  );
+  return _request(
+    service => 'sns',
+    method => 'POST',
+    host => "sns.$region.amazonaws.com",
+    headers => {'content-type' => 'application/x-www-form-urlencoded; charset=utf-8'},
+    body => join('&', map { _escape($_->[0]).'='._escape($_->[1]) } @params),
+  )->{content};
+}
+
+sub dynamodb {
+  # Calls the DynamoDB $operation, e.g. GetItem, with the $request hash and
+  # returns the decoded response
+  my ($operation, $request) = @_;
+  my $content = _request(
+    service => 'dynamodb',
+    method => 'POST',
+    host => "dynamodb.$region.amazonaws.com",
+    headers => {
+      'content-type' => 'application/x-amz-json-1.0',
+      'x-amz-target' => "DynamoDB_20120810.$operation",
+    },
+    body => encode_json($request),
+  )->{content};
+  return length($content) ? decode_json($content) : {};
+}
+
+sub stats {
+  return "$requests requests, $retries retries, ".scalar(keys %agents)." connections";
+}
+
+1;
@@ -0,0 +1,52 @@
+package Payload;
+
+use strict;
+use warnings;
+
+use Compress::Zlib qw(uncompress);
+use JSON;
+use MIME::Base64 qw(decode_base64);
+
+# Reads the envelope written by shared.utils.payload_utils.encode_payload:
+# zlib compressed, base64 encoded JSON holding a table of shared strings
+# and the message, with lists of records packed as a list of keys and
+# rows of values.
+
+my $encodedPayloadKey = '_encoded_payload';
+my $tableKey = '_t';
+my $rowsKey = '_r';
+my $stringKey = '_s';
+
+sub _unpack {
+  my ($value, $strings) = @_;
+  if (ref($value) eq 'ARRAY') {
+    return [map { _unpack($_, $strings) } @{$value}];
+  }
+  if (ref($value) eq 'HASH') {
+    return $strings->[$value->{$stringKey}] if exists $value->{$stringKey};
+    if (exists $value->{$tableKey}) {
+      my @keys = @{$value->{$tableKey}};
+      return [map {
+        my $row = $_;
+        my %record;
+        @record{@keys} = map { _unpack($_, $strings) } @{$row};
+        \%record;
+      } @{$value->{$rowsKey}}];
+    }
+    return {map { $_ => _unpack($value->{$_}, $strings) } keys %{$value}};
+  }
+  return $value;
+}
+
+sub decode_payload {
+  # The original message of an envelope, or $message unchanged
+  my ($message) = @_;
+  my $encoded = $message->{$encodedPayloadKey};
+  return $message unless defined $encoded;
+  my $packed = uncompress(decode_base64($encoded))
+    // die "Could not decompress the encoded payload\n";
+  my $contents = decode_json($packed);
+  return _unpack($contents->{value}, $contents->{strings});
+}
+
+1;
@@ -0,0 +1,290 @@
+package ReferenceReader;
+
+use strict;
+use warnings;
+
+use Compress::Raw::Zlib;
+use Fcntl qw(SEEK_SET);
+
+# Reads sequence from bgzipped FASTA files using their .fai and .gzi
+# indexes, and remembers tabix results, so repeated lookups for the
+# transcripts of a chunk stay in the process instead of forking
+# samtools and tabix each time.
+
+my $maxCachedBlocks = 256;
+my $maxCachedTabixResults = 10000;
+my $maxCachedCdsSequences = 1024;
+
+my $readerVersion;
+my %fastaFiles;
+my %tabixResults;
+my $tabixHits = 0;
+my $tabixMisses = 0;
+my $cdsSequences = _lru_new($maxCachedCdsSequences);
+my $cdsHits = 0;
+my $cdsMisses = 0;
+
+# Least recently used caches: a hash of nodes forming a list from the most
+# to the least recently used entry, linked by key so the nodes hold no
+# references to each other
+
+sub _lru_new {
+  my ($maxSize) = @_;
+  return {max_size => $maxSize, nodes => {}, head => undef, tail => undef};
+}
+
+sub _lru_unlink {
+  my ($lru, $key) = @_;
+  my $node = $lru->{nodes}{$key};
+  if (defined $node->{prev}) {
+    $lru->{nodes}{$node->{prev}}{next} = $node->{next};
+  } else {
+    $lru->{head} = $node->{next};
+  }
+  if (defined $node->{next}) {
+    $lru->{nodes}{$node->{next}}{prev} = $node->{prev};
+  } else {
+    $lru->{tail} = $node->{prev};
+  }
+}
+
+sub _lru_push_front {
+  my ($lru, $key) = @_;
+  my $node = $lru->{nodes}{$key};
+  $node->{prev} = undef;
+  $node->{next} = $lru->{head};
+  if (defined $lru->{head}) {
+    $lru->{nodes}{$lru->{head}}{prev} = $key;
+  } else {
+    $lru->{tail} = $key;
+  }
+  $lru->{head} = $key;
+}
+
+sub _lru_get {
+  # The value for $key, now the most recently used, or undef
+  my ($lru, $key) = @_;
+  my $node = $lru->{nodes}{$key} or return undef;
+  if ($lru->{head} ne $key) {
+    _lru_unlink($lru, $key);
+    _lru_push_front($lru, $key);
+  }
+  return $node->{value};
+}
+
+sub _lru_set {
+  # Stores $value for a $key not yet held, dropping the least recently
+  # used entry once more than max_size are held
+  my ($lru, $key, $value) = @_;
+  $lru->{nodes}{$key} = {value => $value};
+  _lru_push_front($lru, $key);
+  if (keys(%{$lru->{nodes}}) > $lru->{max_size}) {
+    my $oldest = $lru->{tail};
+    _lru_unlink($lru, $oldest);
+    delete $lru->{nodes}{$oldest};
+  }
+}
+
+sub _read_fai {
+  my ($faiFile) = @_;
+  my %sequences;
+  open(my $fh, '<', $faiFile) or die "Could not open file '$faiFile' $!";
+  while (my $line = <$fh>) {
+    chomp $line;
+    my ($name, $length, $offset, $lineBases, $lineWidth) = split(/\t/, $line);
+    $sequences{$name} = {
+      length => $length,
+      offset => $offset,
+      line_bases => $lineBases,
+      line_width => $lineWidth,
+    };
+  }
+  close($fh);
+  return \%sequences;
+}
+
+sub _read_gzi {
+  # Pairs of compressed and uncompressed block offsets, sorted by both
+  my ($gziFile) = @_;
+  my @compressed = (0);
+  my @uncompressed = (0);
+  if (-e $gziFile) {
+    open(my $fh, '<:raw', $gziFile) or die "Could not open file '$gziFile' $!";
+    local $/;
+    my $data = <$fh>;
+    close($fh);
+    my $count = unpack('Q<', $data);
+    my @pairs = unpack("x8 (Q<Q<)$count", $data);
+    while (@pairs) {
+      push @compressed, shift @pairs;
+      push @uncompressed, shift @pairs;
+    }
+  }
+  return (\@compressed, \@uncompressed);
+}
+
+sub _open_fasta {
+  my ($file) = @_;
+  return $fastaFiles{$file} if exists $fastaFiles{$file};
+  open(my $fh, '<:raw', $file) or die "Could not open file '$file' $!";
+  my ($compressed, $uncompressed) = _read_gzi("$file.gzi");
+  $fastaFiles{$file} = {
+    fh => $fh,
+    sequences => _read_fai("$file.fai"),
+    compressed => $compressed,
+    uncompressed => $uncompressed,
+    blocks => _lru_new($maxCachedBlocks),
+    hits => 0,
+    misses => 0,
+  };
+  return $fastaFiles{$file};
+}
+
+sub _read_block {
+  # Returns the decompressed block starting at $offset and the offset of
+  # the next block
+  my ($fasta, $offset) = @_;
+  if (my $block = _lru_get($fasta->{blocks}, $offset)) {
+    $fasta->{hits}++;
+    return @{$block};
+  }
+  $fasta->{misses}++;
+  my $fh = $fasta->{fh};
+  seek($fh, $offset, SEEK_SET) or die "Could not seek to $offset: $!";
+  read($fh, my $header, 18) == 18 or die "Truncated BGZF block at $offset";
+  my $blockSize = unpack('v', substr($header, 16, 2)) + 1;
+  read($fh, my $compressedData, $blockSize - 18) == $blockSize - 18
+    or die "Truncated BGZF block at $offset";
+  my $inflater = Compress::Raw::Zlib::Inflate->new(-WindowBits => -MAX_WBITS)
+    or die "Could not create inflater";
+  my $data = '';
+  my $status = $inflater->inflate(substr($compressedData, 0, -8), $data);
+  die "Could not inflate BGZF block at $offset: $status"
+    unless $status == Z_OK || $status == Z_STREAM_END;
+  my $block = [$data, $offset + $blockSize];
+  _lru_set($fasta->{blocks}, $offset, $block);
+  return @{$block};
+}
+
+sub _block_containing {
+  # Index of the last block starting at or before $position
+  my ($uncompressed, $position) = @_;
+  my ($low, $high) = (0, $#{$uncompressed});
+  while ($low < $high) {
+    my $mid = int(($low + $high + 1) / 2);
+    if ($uncompressed->[$mid] <= $position) {
+      $low = $mid;
+    } else {
+      $high = $mid - 1;
+    }
+  }
+  return $low;
+}
+
+sub fetch_fasta {
+  # Sequence of $chrom from $start to $end, 1-based and inclusive, clamped
+  # to the sequence like samtools faidx
+  my ($file, $chrom, $start, $end) = @_;
+  my $fasta = _open_fasta($file);
+  my $sequence = $fasta->{sequences}{$chrom};
+  die "Sequence $chrom not found in $file" unless defined $sequence;
+  $start = 1 if $start < 1;
+  $end = $sequence->{length} if $end > $sequence->{length};
+  return '' if $start > $end;
+  my $lineBases = $sequence->{line_bases};
+  my $lineWidth = $sequence->{line_width};
+  my $firstByte = $sequence->{offset} + int(($start - 1) / $lineBases) * $lineWidth
+    + ($start - 1) % $lineBases;
+  my $lastByte = $sequence->{offset} + int(($end - 1) / $lineBases) * $lineWidth
+    + ($end - 1) % $lineBases;
+  my $blockIndex = _block_containing($fasta->{uncompressed}, $firstByte);
+  my $blockStart = $fasta->{uncompressed}[$blockIndex];
+  my $offset = $fasta->{compressed}[$blockIndex];
+  my $text = '';
+  # Blocks missing from the .gzi are found by reading on from the last one
+  while ($blockStart + length($text) <= $lastByte) {
+    my ($data, $nextOffset) = _read_block($fasta, $offset);
+    last unless length($data);
+    $text .= $data;
+    $offset = $nextOffset;
+  }
+  my $bases = substr($text, $firstByte - $blockStart, $lastByte - $firstByte + 1);
+  $bases =~ s/[\r\n]+//g;
+  return $bases;
+}
+
+sub fetch_cds {
+  # fetch_fasta for a CDS, with the least recently used sequences dropped
+  # once more than $maxCachedCdsSequences are held
+  my ($file, $chrom, $start, $end) = @_;
+  my $key = "$file\t$chrom\t$start\t$end";
+  my $sequence = _lru_get($cdsSequences, $key);
+  if (defined $sequence) {
+    $cdsHits++;
+    return $sequence;
+  }
+  $cdsMisses++;
+  $sequence = fetch_fasta($file, $chrom, $start, $end);
+  _lru_set($cdsSequences, $key, $sequence);
+  return $sequence;
+}
+
+sub tabix_query {
+  # Output of tabix for $location, remembered for later calls
+  my ($file, $location) = @_;
+  my $key = "$file\t$location";
+  if (exists $tabixResults{$key}) {
+    $tabixHits++;
+    return $tabixResults{$key};
+  }
+  $tabixMisses++;
+  %tabixResults = () if keys(%tabixResults) >= $maxCachedTabixResults;
+  my $result = `./tabix $file $location`;
+  $tabixResults{$key} = $result;
+  return $result;
+}
+
+sub stats {
+  my @fastaStats = map {
+    "$_: $fastaFiles{$_}{hits} block hits, $fastaFiles{$_}{misses} misses"
+  } sort keys %fastaFiles;
+  return join(
+    "; ",
+    @fastaStats,
+    "CDS sequences: $cdsHits hits, $cdsMisses misses",
+    "tabix: $tabixHits hits, $tabixMisses misses",
+  );
+}
+
+sub close_files {
+  # Closes the files under $dir, before they are removed or replaced
+  my ($dir) = @_;
+  foreach my $file (grep { index($_, "$dir/") == 0 } keys %fastaFiles) {
+    close($fastaFiles{$file}{fh});
+    delete $fastaFiles{$file};
+  }
+}
+
+sub use_version {
+  # Files are only replaced with new versions of the references, so what
+  # is open and cached is kept for as long as $version stays the same
+  my ($version) = @_;
+  return if defined $readerVersion && $readerVersion eq $version;
+  _clear();
+  $readerVersion = $version;
+}
+
+sub _clear {
+  foreach my $fasta (values %fastaFiles) {
+    close($fasta->{fh});
+  }
+  %fastaFiles = ();
+  %tabixResults = ();
+  $tabixHits = 0;
+  $tabixMisses = 0;
+  $cdsSequences = _lru_new($maxCachedCdsSequences);
+  $cdsHits = 0;
+  $cdsMisses = 0;
+}
+
+1;
@@ -57,7 +57,7 @@ use warnings;
 # module list
 use Getopt::Long;
 use FileHandle;
-use File::Path qw(mkpath);
+use File::Path qw(mkpath rmtree);
 use Storable qw(nstore_fd fd_retrieve freeze thaw);
 use Scalar::Util qw(weaken looks_like_number);
 use Digest::MD5 qw(md5_hex);
@@ -74,11 +74,14 @@ use consequence::Transcript;
 use consequence::TranscriptVariation;
 use consequence::TranscriptVariationAllele;
 use Try::Tiny;
+use ReferenceReader;
+use AwsClient;
+use Payload;
 use File::Temp qw(tempfile);
 use Encode qw(encode);
 
 my $config = {};
-my $fastaLocation = "s3://$ENV{'REFERENCE_LOCATION'}/";
+my $referenceLocation = $ENV{'REFERENCE_LOCATION'};
 my $spliceFile =  $ENV{'SPLICE_REFERENCE'};
 my $nextFunctionSnsTopicArn =  $ENV{'NEXT_FUNCTION_SNS_TOPIC_ARN'};
 my $mirnaFile =  $ENV{'MIRNA_REFERENCE'};
@@ -87,11 +90,18 @@ my $outputLocation =  $ENV{'SVEP_REGIONS'};
 my $tempLocation =  $ENV{'SVEP_TEMP'};
 my $filterConsequenceRank = $ENV{'FILTER_CONSEQUENCE_RANK'};
 my $dynamoClinicJobsTable = $ENV{'DYNAMO_CLINIC_JOBS_TABLE'};
+my $dynamoSvepProgressTable = $ENV{'DYNAMO_SVEP_PROGRESS_TABLE'};
+my $concatStarterSnsTopicArn = $ENV{'CONCAT_STARTER_SNS_TOPIC_ARN'};
 my $functionName = $ENV{'AWS_LAMBDA_FUNCTION_NAME'};
 my $sendJobEmailArn = $ENV{'SEND_JOB_EMAIL_ARN'};
 my $maxSnsMessageSize = 260000;
 my $s3PayloadKey = "_s3_payload_key";
 my $processedRecords = 0;
+# References are kept across invocations of a warm container
+my $refCacheDir = "/tmp/refcache";
+my $refCacheMaxBytes = ($ENV{'REFERENCE_CACHE_MB'} // 400) * 1024 * 1024;
+my $referenceVersions = {};
+my %referenceDirs;
 
 sub handle {
     my ($payload) = @_;
@@ -103,30 +113,35 @@ sub handle {
     my $payloadKey = $message->{$s3PayloadKey};
     if (defined $payloadKey) {
       print("Loading payload from S3 bucket $tempLocation and key: $payloadKey\n");
-      my $payloadFile = "/tmp/payload.json";
-      system("/usr/bin/aws s3 cp s3://$tempLocation/$payloadKey $payloadFile 1>/dev/null");
-      my $messageString;
-      {
-        local $/;
-        open(my $fh, '<', $payloadFile) or die "can't open $payloadFile: $!";
-        $messageString = <$fh>;
-      }
+      my $messageString = AwsClient::s3_get_object($tempLocation, $payloadKey)
+        // die "Payload $payloadKey not found in $tempLocation\n";
       simple_truncated_print("Payload from S3: $messageString\n");
       $message = decode_json($messageString);
     }
+    $message = Payload::decode_payload($message);
+    if (my $features = $message->{'features'}) {
+      # queryGTF sends each GTF line once per message, referred to by index
+      foreach my $line (@{$message->{'snsData'}}) {
+        $line->{'data'} = [map { $features->[$_] } @{$line->{'data'}}];
+      }
+    }
     my @data = $message->{'snsData'};
     my $request_id = $message->{'requestId'};
     my $tempFileName = $message->{'tempFileName'};
     my $refChrom = $message->{'refChrom'};
+    $referenceVersions = $message->{'referenceVersions'} // {};
+    %referenceDirs = ();
+    ReferenceReader::use_version(join(',', map {
+      "$_=".($referenceVersions->{$_} // '')
+    } sort keys %{$referenceVersions}));
     print("tempFileName is - $tempFileName\n");
     #############################################
 
     try {
       my $fasta = $fastaBase.'.'.$refChrom.'.fa.bgz';
-      print "Copying fasta reference files.\n";
-      system("/usr/bin/aws s3 cp $fastaLocation /tmp/ --recursive  --exclude '*'  --include '$fasta*' 1>/dev/null");
-      print "Copying splice reference files.\n";
-      system("/usr/bin/aws s3 cp $fastaLocation /tmp/ --recursive  --exclude '*'  --include '$spliceFile*' 1>/dev/null");
+      my $ensemblVersion = $referenceVersions->{'ensembl_version'};
+      $referenceDirs{'fasta'} = cached_reference("fasta.$refChrom", $ensemblVersion, $fasta);
+      $referenceDirs{'splice'} = cached_reference('splice', $ensemblVersion, $spliceFile);
       my @results;
       while(@data){
         my $region = shift @data;
@@ -141,19 +156,23 @@ sub handle {
         }
       }
       print("Passed ", scalar(@results), "/$processedRecords records with rank >= $filterConsequenceRank\n");
+      print("Reference lookups: ", ReferenceReader::stats(), "\n");
       if (scalar(@results) > 0) {
         my %outMessage = (
           'snsData' => \@results,
           'refChrom' => $refChrom,
           'requestId' => $request_id,
         );
+        if (%{$referenceVersions}) {
+          $outMessage{'referenceVersions'} = $referenceVersions;
+        }
         start_function($nextFunctionSnsTopicArn, $tempFileName, \%outMessage);
       }
 
-      my $tempOut = 's3://'.$tempLocation.'/'.$tempFileName;
-      system("/usr/bin/aws s3 rm $tempOut");
+      mark_completed($request_id, $tempFileName);
+      print("AWS calls: ", AwsClient::stats(), "\n");
       print("Cleaning /tmp/\n");
-      system("rm -rf /tmp/*");
+      rmtree(grep { $_ ne $refCacheDir } glob("/tmp/*"));
       print("Task Complete.\n");
     }
     catch {
@@ -164,14 +183,13 @@ sub handle {
 sub handle_failed_execution {
     my ($request_id, $failed_step, $error_message) = @_;
 
-    my $query_result = `/usr/bin/aws dynamodb get-item --table-name $dynamoClinicJobsTable --key '{"job_id":{"S":"$request_id"}}' --output json 2>&1`;
-    die "Failed to query DynamoDB: $query_result" if $? != 0;
-    my $query_json;
-    eval { $query_json = decode_json($query_result); };
-    if ($@) {
-      warn "Error parsing JSON response: $@";
-      $query_json = {};
-    }
+    my $query_json = eval {
+      AwsClient::dynamodb('GetItem', {
+        TableName => $dynamoClinicJobsTable,
+        Key => { job_id => { S => $request_id } },
+      });
+    };
+    die "Failed to query DynamoDB: $@" if $@;
 
     # Check if item exists and job_status is already "failed"
     if (exists $query_json->{Item} && 
@@ -183,27 +201,29 @@ sub handle_failed_execution {
 
     # Prepare the update expression
     my $update_expression = "SET #svep_status = :svep_status, #svep_failed_step = :svep_failed_step, #svep_error_message = :svep_error_message";
-    my $expression_attribute_names = encode_json({
+    my $expression_attribute_names = {
         "#svep_status"        => "svep_status",
         "#svep_failed_step"   => "svep_failed_step",
         "#svep_error_message" => "svep_error_message"
-    });
-    my $expression_attribute_values = encode_json({
+    };
+    my $expression_attribute_values = {
         ":svep_status"        => { "S" => "failed" },
         ":svep_failed_step"   => { "S" => $failed_step },
-        ":svep_error_message" => { "S" => $error_message }
-    });
+        ":svep_error_message" => { "S" => "$error_message" }
+    };
 
     # Update the item in DynamoDB
-    my $system_call = "/usr/bin/aws dynamodb update-item --table-name $dynamoClinicJobsTable " .
-      "--key '{\"job_id\":{\"S\":\"$request_id\"}}' " .
-      "--update-expression \"$update_expression\" " .
-      "--expression-attribute-names '$expression_attribute_names' " .
-      "--expression-attribute-values '$expression_attribute_values'";
-    print("System call: $system_call\n");
-    my $exit_code = system($system_call);
-
-    die "DynamoDB update failed with exit code " . ($exit_code >> 8) if $exit_code != 0;
+    print("Marking job $request_id as failed in $dynamoClinicJobsTable\n");
+    eval {
+      AwsClient::dynamodb('UpdateItem', {
+        TableName => $dynamoClinicJobsTable,
+        Key => { job_id => { S => $request_id } },
+        UpdateExpression => $update_expression,
+        ExpressionAttributeNames => $expression_attribute_names,
+        ExpressionAttributeValues => $expression_attribute_values,
+      });
+    };
+    die "DynamoDB update failed: $@" if $@;
     
     # Send SNS Email Job notification
     sns_publish($sendJobEmailArn, {
@@ -218,35 +238,81 @@ sub handle_failed_execution {
     die "$error_message\n";
 }
 
-sub create_temp_file {
-  my ($nextTempFile) = @_;
-  print("Creating file: $nextTempFile\n");
-  system("aws", "s3api", "put-object", "--bucket", $tempLocation, "--key",  $nextTempFile, "--content-length", "0");
+sub record_started {
+  # Counted before the function is published, so it can't be seen to
+  # finish first
+  my ($request_id) = @_;
+  AwsClient::dynamodb('UpdateItem', {
+    TableName => $dynamoSvepProgressTable,
+    Key => { request_id => { S => $request_id } },
+    UpdateExpression => 'ADD started :one',
+    ExpressionAttributeValues => { ':one' => { N => '1' } },
+  });
+}
+
+sub mark_completed {
+  # Counts this function as finished, and if it was the last tracked
+  # function of the job to do so, starts concatenation
+  my ($request_id, $tempFileName) = @_;
+  print("Marking completed: $tempFileName\n");
+  my $progress = eval {
+    AwsClient::dynamodb('UpdateItem', {
+      TableName => $dynamoSvepProgressTable,
+      Key => { request_id => { S => $request_id } },
+      UpdateExpression => 'ADD finished :one',
+      ConditionExpression => 'attribute_exists(request_id)',
+      ExpressionAttributeValues => { ':one' => { N => '1' } },
+      ReturnValues => 'ALL_NEW',
+    })->{Attributes};
+  };
+  if (!$progress) {
+    if ($@ =~ /ConditionalCheckFailedException/) {
+      print("No progress recorded for $request_id\n");
+      return;
+    }
+    die $@;
+  }
+  my $started = $progress->{started}{N};
+  my $finished = $progress->{finished}{N};
+  print("Finished $finished/$started tracked functions for $request_id\n");
+  return if $finished < $started;
+  # Several finishers can see the counts level, but only one claims it
+  my $claimed = eval {
+    AwsClient::dynamodb('UpdateItem', {
+      TableName => $dynamoSvepProgressTable,
+      Key => { request_id => { S => $request_id } },
+      UpdateExpression => 'SET completed_at = :now',
+      ConditionExpression => 'attribute_not_exists(completed_at) AND finished >= started',
+      ExpressionAttributeValues => { ':now' => { N => ''.time() } },
+    });
+    1;
+  };
+  if (!$claimed) {
+    return if $@ =~ /ConditionalCheckFailedException/;
+    die $@;
+  }
+  print("All tracked functions finished, starting concatenation\n");
+  sns_publish($concatStarterSnsTopicArn, {
+    'project' => $progress->{project}{S},
+    'requestId' => $request_id,
+    'tempFileName' => "_${tempFileName}_0_".(split(":", $concatStarterSnsTopicArn))[-1],
+  });
 }
 
 sub sns_publish {
   my ($topicArn, $message, $s3PayloadPrefix) = @_;
-  my $jsonMessage = to_json($message);
-  # In order to get around command-line character limits, we must pass the message as a file
-  # https://github.com/aws/aws-cli/issues/1314#issuecomment-515674161
-  my $filename = "/tmp/message.json";
-  print("Saving message to local file $filename\n");
-  open(my $fh, '>', $filename) or die "Could not open file '$filename' $!";
-  print $fh $jsonMessage;
-  close $fh;
-  my $messageString = "file://$filename";
+  my $jsonMessage = encode_json($message);
   my $messageSize = length($jsonMessage);
   if ($messageSize > $maxSnsMessageSize && defined $s3PayloadPrefix) {
     print("SNS message too large ($messageSize bytes), uploading to S3\n");
     my $payloadKey = "payloads/$s3PayloadPrefix.json";
     simple_truncated_print("Uploading to S3 bucket $tempLocation and key $payloadKey: $jsonMessage\n");
-    system("/usr/bin/aws s3 cp $filename s3://$tempLocation/$payloadKey 1>/dev/null");
+    AwsClient::s3_put_object($tempLocation, $payloadKey, $jsonMessage);
     my %s3Map = ($s3PayloadKey => $payloadKey);
-    $jsonMessage = to_json(\%s3Map);
-    $messageString = $jsonMessage;
+    $jsonMessage = encode_json(\%s3Map);
   }
   simple_truncated_print("Calling SNS Publish with topicArn: $topicArn and message: $jsonMessage\n");
-  system("aws", "sns", "publish", "--topic-arn", $topicArn, "--message", $messageString);
+  AwsClient::sns_publish($topicArn, $jsonMessage);
 }
 
 sub start_function {
@@ -254,10 +320,72 @@ sub start_function {
   my $functionName = (split(":", $topicArn))[-1];
   my $fileName = $baseFilename."_".$functionName;
   $message->{'tempFileName'} = $fileName;
-  create_temp_file($fileName);
+  record_started($message->{'requestId'});
   sns_publish($topicArn, $message, $fileName);
 }
 
+sub read_version_stamp {
+  my ($stamp) = @_;
+  open(my $fh, '<', $stamp) or return undef;
+  my $version = <$fh>;
+  close($fh);
+  return $version;
+}
+
+sub cached_reference {
+  # Returns the directory holding the files starting with $prefix, only
+  # downloading them when this version is not already cached
+  my ($entry, $version, $prefix) = @_;
+  $version //= 'unversioned';
+  my $dir = "$refCacheDir/$entry";
+  my $stamp = "$dir/.version";
+  my $cachedVersion = read_version_stamp($stamp);
+  if (defined $cachedVersion && $cachedVersion eq $version) {
+    print("Reference cache hit for $entry version $version\n");
+    # The stamp's modification time orders entries for eviction
+    utime(undef, undef, $stamp);
+    return $dir;
+  }
+  print("Reference cache miss for $entry version $version, copying $prefix files\n");
+  ReferenceReader::close_files($dir);
+  rmtree($dir);
+  mkpath($dir);
+  my $copied = eval { AwsClient::s3_download_prefix($referenceLocation, $prefix, $dir) };
+  warn "Failed to copy $prefix files: $@" if $@;
+  # Without a stamp a failed copy is retried by the next message
+  if ($copied) {
+    open(my $fh, '>', $stamp) or die "Could not open file '$stamp' $!";
+    print $fh $version;
+    close($fh);
+  }
+  evict_references($entry);
+  return $dir;
+}
+
+sub evict_references {
+  # Removes the least recently used entries until the cache fits its budget,
+  # keeping $keep and anything else this message is using
+  my ($keep) = @_;
+  my %inUse = map { $_ => 1 } ("$refCacheDir/$keep", values %referenceDirs);
+  my @entries;
+  my $totalBytes = 0;
+  foreach my $dir (glob("$refCacheDir/*")) {
+    my $bytes = 0;
+    $bytes += (-s $_ // 0) for glob("$dir/*");
+    $totalBytes += $bytes;
+    push @entries, [$dir, $bytes, (stat("$dir/.version"))[9] // 0];
+  }
+  foreach my $entry (sort { $a->[2] <=> $b->[2] } @entries) {
+    last if $totalBytes <= $refCacheMaxBytes;
+    my ($dir, $bytes) = @{$entry};
+    next if $inUse{$dir};
+    print("Evicting $dir ($bytes bytes) from the reference cache\n");
+    ReferenceReader::close_files($dir);
+    rmtree($dir);
+    $totalBytes -= $bytes;
+  }
+}
+
 sub simple_truncated_print {
   # This doesn't need to be precise, just good enough
   my $maxLength = 1000;
@@ -430,11 +558,11 @@ sub parse_vcf {
       }
 
       if( !$intron_result ){
-        my $file = "/tmp/".$spliceFile;
+        my $file = $referenceDirs{'splice'}."/".$spliceFile;
         my $intronStart = $start - 8;
         my $intronEnd = $start + 8;
         my $location = $refChrom.":".$intronStart."-".$intronEnd;
-        $intron_result =  `./tabix $file $location`;
+        $intron_result = ReferenceReader::tabix_query($file, $location);
         #print("\n Intron result = $intron_result")
       }
 
@@ -457,16 +585,12 @@ sub parse_vcf {
         my $intron_boundary = 0;
         my $splice_region_variant =0;
         if(exists($info{'CDS'})){
-          my $location = $refChrom.':'.$info{'CDS_start'}.'-'.$info{'CDS_end'};
           my $fasta ='Homo_sapiens.GRCh38.dna.chromosome.'.$refChrom.'.fa.bgz';
-          my $file = '/tmp/'.$fasta;
+          my $file = $referenceDirs{'fasta'}.'/'.$fasta;
           $vf->{'fasta_file'} = $file;
-          $vf->{'gtf_file'} = "/tmp/".$spliceFile;
+          $vf->{'gtf_file'} = $referenceDirs{'splice'}."/".$spliceFile;
           $vf->{'reference_chr'} = $refChrom;
-          my @result = `./samtools faidx $file $location`;
-          shift @result;
-          $seq = join "", @result;
-          $seq =~ s/[\r\n]+//g;
+          $seq = ReferenceReader::fetch_cds($file, $refChrom, $info{'CDS_start'}, $info{'CDS_end'});
           $length = abs($info{'CDS_end'}-$info{'CDS_start'}) + 1;
 
           for my $tran (split /[\r\n]+/, $intron_result){
@@ -602,15 +726,12 @@ sub parse_vcf {
           });
         }
 
-        my $mirnaLocalFile = "/tmp/".$mirnaFile;
-        unless (-e $mirnaLocalFile) {
-          print "Copying: $mirnaFile\n";
-          system("/usr/bin/aws s3 cp $fastaLocation /tmp/ --recursive  --exclude '*'  --include '$mirnaFile*' 1>/dev/null");
-        }
+        $referenceDirs{'mirna'} //= cached_reference('mirna', $referenceVersions->{'mirna_hash'}, $mirnaFile);
+        my $mirnaLocalFile = $referenceDirs{'mirna'}."/".$mirnaFile;
         if($rows[1] eq "mirbase"){
           #my $intron_loc = $start;
           my $location = "chr".$refChrom.":".$start."-".$start;
-          my $mirna_result =  `./tabix $mirnaLocalFile $location`;
+          my $mirna_result = ReferenceReader::tabix_query($mirnaLocalFile, $location);
           if(length $mirna_result){
             $tr->{within_mirna} = 1;
           }else{
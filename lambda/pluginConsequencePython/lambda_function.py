@@ -0,0 +1,83 @@
+import os
+
+from shared.consequence import ConsequenceEngine
+from shared.indexutils import FastaReader, TabixReader
+from shared.refcache import reference_cache
+from shared.utils import (
+    orchestration,
+    download_bedfile,
+    download_to_tmp,
+)
+
+# Environment variables
+BUCKET_NAME = os.environ["REFERENCE_LOCATION"]
+SPLICE_REFERENCE = os.environ["SPLICE_REFERENCE"]
+MIRNA_REFERENCE = os.environ["MIRNA_REFERENCE"]
+FASTA_REFERENCE_BASE = os.environ["FASTA_REFERENCE_BASE"]
+FILTER_CONSEQUENCE_RANK = int(os.environ["FILTER_CONSEQUENCE_RANK"])
+
+
+def load_fasta(fasta):
+    for suffix in ("", ".fai", ".gzi"):
+        download_to_tmp(BUCKET_NAME, f"{fasta}{suffix}", raise_on_notfound=True)
+    paths = [f"/tmp/{fasta}{suffix}" for suffix in ("", ".fai", ".gzi")]
+    return FastaReader(f"/tmp/{fasta}"), paths
+
+
+def load_tabix(bedfile):
+    download_bedfile(BUCKET_NAME, bedfile)
+    paths = [f"/tmp/{bedfile}{suffix}" for suffix in ("", ".tbi", ".csi")]
+    return TabixReader(f"/tmp/{bedfile}"), paths
+
+
+def get_engine(ref_chrom, reference_versions):
+    # Readers are kept for the life of the container so warm invocations
+    # reuse cached blocks, matching the Perl function's /tmp reference cache
+    ensembl_version = reference_versions.get("ensembl_version")
+    fasta = f"{FASTA_REFERENCE_BASE}.{ref_chrom}.fa.bgz"
+    return ConsequenceEngine(
+        fasta=reference_cache.get(
+            f"fasta.{ref_chrom}", ensembl_version, lambda: load_fasta(fasta)
+        ),
+        splice=reference_cache.get(
+            "splice", ensembl_version, lambda: load_tabix(SPLICE_REFERENCE)
+        ),
+        mirna=reference_cache.get(
+            "mirna",
+            reference_versions.get("mirna_hash"),
+            lambda: load_tabix(MIRNA_REFERENCE),
+        ),
+        filter_rank=FILTER_CONSEQUENCE_RANK,
+    )
+
+
+def resolve_features(in_rows, features):
+    # queryGTF sends each GTF line once per message, referred to by index
+    for in_row in in_rows:
+        in_row["data"] = [features[i] for i in in_row["data"]]
+    return in_rows
+
+
+def add_consequences(in_rows, ref_chrom, reference_versions):
+    engine = get_engine(ref_chrom, reference_versions)
+    results = []
+    for in_row in in_rows:
+        results.extend(engine.annotate(in_row, ref_chrom))
+    print(
+        f"Passed {len(results)}/{engine.processed_records} records with rank >= {FILTER_CONSEQUENCE_RANK}"
+    )
+    return results
+
+
+def lambda_handler(event, _):
+    with orchestration(event) as orc:
+        in_rows = orc.message["snsData"]
+        if (features := orc.message.get("features")) is not None:
+            resolve_features(in_rows, features)
+        sns_data = add_consequences(in_rows, orc.ref_chrom, orc.reference_versions)
+        if sns_data:
+            orc.next_function(
+                message={
+                    "snsData": sns_data,
+                },
+            )
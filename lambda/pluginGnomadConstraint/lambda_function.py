@@ -3,8 +3,10 @@ import csv
 import os
 from collections import defaultdict
 
+from shared.indexutils import ConstraintTable
+from shared.refcache import reference_cache
 from shared.utils import (
-    CheckedProcess,
+    CONSTRAINT_COLUMNS,
     orchestration,
     Timer,
     download_to_tmp,
@@ -13,25 +15,42 @@ from shared.utils import (
 REFERENCE_LOCATION = os.environ["REFERENCE_LOCATION"]
 CONSTRAINT_REFERENCE = os.environ["CONSTRAINT_REFERENCE"]
 GENE_INDEX_REFERENCE = f"{CONSTRAINT_REFERENCE}.idx"
+CONSTRAINT_TABLE_REFERENCE = f"{CONSTRAINT_REFERENCE}.table"
 
 MAX_ROW_PER_CHUNK = 300
 MILLISECONDS_BEFORE_SPLIT = 300000
-CONSTRAINT_COLUMNS = {
-    "misZ": 32,
-    "misOe": 27,
-    "misOeCiLower": 29,
-    "misOeCiUpper": 30,
-    "lofPli": 15,
-    "lofOe": 13,
-    "lofOeCiUpper": 19,
-    "lofOeCiLower": 18,
-}
-
-try:
-    download_to_tmp(REFERENCE_LOCATION, CONSTRAINT_REFERENCE, raise_on_notfound=True)
-    download_to_tmp(REFERENCE_LOCATION, GENE_INDEX_REFERENCE, raise_on_notfound=True)
-except:
-    pass
+
+
+def load_constraints():
+    table_path = f"/tmp/{CONSTRAINT_TABLE_REFERENCE}"
+    if download_to_tmp(REFERENCE_LOCATION, CONSTRAINT_TABLE_REFERENCE):
+        try:
+            return ConstraintTable(table_path), [table_path]
+        except ValueError as error:
+            print(f"Not using {CONSTRAINT_TABLE_REFERENCE}: {error}")
+            os.remove(table_path)
+    # References built before the current table format fall back to the TSV
+    # and its JSON index
+    try:
+        download_to_tmp(
+            REFERENCE_LOCATION, CONSTRAINT_REFERENCE, raise_on_notfound=True
+        )
+        download_to_tmp(
+            REFERENCE_LOCATION, GENE_INDEX_REFERENCE, raise_on_notfound=True
+        )
+    except:
+        pass
+    gene_index_path = f"/tmp/{GENE_INDEX_REFERENCE}"
+    constraint_ref_path = f"/tmp/{CONSTRAINT_REFERENCE}"
+    if not (os.path.exists(gene_index_path) and os.path.exists(constraint_ref_path)):
+        raise Exception(
+            f"Unable to load {GENE_INDEX_REFERENCE} or {CONSTRAINT_REFERENCE} file."
+        )
+
+    with open(gene_index_path) as injson:
+        index_file = json.load(injson)
+    return index_file, [gene_index_path, constraint_ref_path]
+
 
 def parse_value(val):
     try:
@@ -71,41 +90,45 @@ def convert_to_genes_queries(sns_data):
     return genes_data
 
 
-def add_constraint_columns(sns_data, timer):
-    genes_data = convert_to_genes_queries(sns_data)
-    
-    gene_index_path = f"/tmp/{GENE_INDEX_REFERENCE}"
-    constraint_ref_path = f"/tmp/{CONSTRAINT_REFERENCE}"
-    if not (os.path.exists(gene_index_path) and os.path.exists(constraint_ref_path)):
-        raise Exception(f"Unable to load {GENE_INDEX_REFERENCE} or {CONSTRAINT_REFERENCE} file.")
+def get_constraints(genes, reference_versions):
+    # Kept for the life of the container so warm invocations skip loading
+    constraints = reference_cache.get(
+        "constraints",
+        reference_versions.get("gnomad_constraints_version"),
+        load_constraints,
+    )
+    if isinstance(constraints, ConstraintTable):
+        for gene in genes:
+            yield constraints.get(gene)
+        return
+    with open(f"/tmp/{CONSTRAINT_REFERENCE}") as constraint_file:
+        for gene in genes:
+            yield get_query_process(gene, constraints, constraint_file)
 
-    with open(gene_index_path) as injson:
-        index_file = json.load(injson)
+
+def add_constraint_columns(sns_data, timer, reference_versions):
+    genes_data = convert_to_genes_queries(sns_data)
 
     lines_updated = 0
     completed_lines = []
     remaining_data = []
 
-    with open(constraint_ref_path) as constraint_file:
-        for gene, gene_datas in genes_data.items():
-
-            constraint_info = get_query_process(gene, index_file, constraint_file)
-            for i, data in enumerate(gene_datas):
-                if timer.out_of_time():
-                    remaining_data = gene_datas[i:] + [
-                        item
-                        for g, datas in list(genes_data.items())[
-                            list(genes_data.keys()).index(gene) + 1 :
-                        ]
-                        for item in datas
-                    ]
-                    break
-                transcript = data["transcriptId"].split(".")[0]
-                if transcript in constraint_info:
-                    data.update(constraint_info[transcript])
-                    lines_updated += 1
-
-            completed_lines.extend(gene_datas)
+    genes = list(genes_data.keys())
+    for gene_i, constraint_info in enumerate(
+        get_constraints(genes, reference_versions)
+    ):
+        gene_datas = genes_data[genes[gene_i]]
+        if timer.out_of_time():
+            remaining_data = [
+                item for gene in genes[gene_i:] for item in genes_data[gene]
+            ]
+            break
+        for data in gene_datas:
+            transcript = data["transcriptId"].split(".")[0]
+            if transcript in constraint_info:
+                data.update(constraint_info[transcript])
+                lines_updated += 1
+        completed_lines.extend(gene_datas)
 
     print(
         f"Updated {lines_updated}/{len(completed_lines)} rows with Constraint Genomes data"
@@ -117,7 +140,9 @@ def lambda_handler(event, context):
     timer = Timer(context, MILLISECONDS_BEFORE_SPLIT)
     with orchestration(event) as orc:
         sns_data = orc.message["snsData"]
-        complete_lines, remaining = add_constraint_columns(sns_data, timer)
+        complete_lines, remaining = add_constraint_columns(
+            sns_data, timer, orc.reference_versions
+        )
         if remaining:
             print(f"remaining data length {len(remaining)}")
             orc.resend_self(
@@ -1,14 +1,21 @@
 import json
 import os
 
+from shared.indexutils import (
+    REGION_MERGE_GAP,
+    FeatureStore,
+    TabixReader,
+    get_merged_regions,
+)
+from shared.refcache import reference_cache
 from shared.utils import (
-    CheckedProcess,
+    download_to_tmp,
     download_vcf,
+    gene_panel_prefix,
     orchestration,
     Timer,
 )
 
-
 # Environment variables
 BUCKET_NAME = os.environ["REFERENCE_LOCATION"]
 FILTER_GENES = set(os.environ["FILTER_GENES"].split(",")) - {""}
@@ -18,58 +25,175 @@ os.environ["PATH"] += f':{os.environ["LAMBDA_TASK_ROOT"]}'
 MILLISECONDS_BEFORE_SPLIT = 4000
 PAYLOAD_SIZE = 260000
 
-# Download reference genome and index
-download_vcf(BUCKET_NAME, REFERENCE_GENOME)
+
+def load_gtf():
+    # Gene panels use a pre-filtered GTF if one was built for this gene set
+    gtf_file = f"{gene_panel_prefix(FILTER_GENES)}{REFERENCE_GENOME}"
+    if gtf_file != REFERENCE_GENOME and not download_to_tmp(
+        BUCKET_NAME, f"{gtf_file}.tbi"
+    ):
+        print(f"No gene panel GTF found, using {REFERENCE_GENOME}")
+        gtf_file = REFERENCE_GENOME
+    # Download reference genome and index
+    download_vcf(BUCKET_NAME, gtf_file)
+    gtf_reader = TabixReader(f"/tmp/{gtf_file}")
+    # References built before feature stores existed fall back to tabix queries
+    feature_store = (
+        FeatureStore(
+            f"/tmp/{gtf_file}.features",
+            f"/tmp/{gtf_file}",
+            bgzf=gtf_reader.bgzf,
+        )
+        if download_to_tmp(BUCKET_NAME, f"{gtf_file}.features")
+        else None
+    )
+    paths = [f"/tmp/{gtf_file}{suffix}" for suffix in ("", ".tbi", ".csi", ".features")]
+    return (gtf_reader, feature_store), paths
+
+
+def query_features(gtf_reader, ref_chrom, positions):
+    regions = get_merged_regions(positions, REGION_MERGE_GAP)
+    # Features overlapping several regions are returned once per region
+    features = {}
+    for start, end in regions:
+        for line in gtf_reader.fetch(ref_chrom, start, end):
+            if line not in features:
+                _, _, _, feature_start, feature_end, _ = line.split("\t", 5)
+                features[line] = (int(feature_start), int(feature_end))
+    print(
+        f"Found {len(features)} features in {len(regions)} merged regions"
+        f" ({gtf_reader.bgzf.hits} block cache hits, {gtf_reader.bgzf.misses} misses)"
+    )
+    # The GTF is sorted by start then end, so a stable sort restores file order
+    return sorted(features.items(), key=lambda feature: feature[1])
+
+
+def get_overlapping_lines(all_coords, features):
+    overlapping_lines = [[] for _ in all_coords]
+    order = sorted(range(len(all_coords)), key=lambda i: all_coords[i]["posVcf"])
+    active = []
+    next_feature = 0
+    for i in order:
+        pos = all_coords[i]["posVcf"]
+        while next_feature < len(features) and features[next_feature][1][0] <= pos:
+            active.append(features[next_feature])
+            next_feature += 1
+        active = [feature for feature in active if feature[1][1] >= pos]
+        overlapping_lines[i] = [line for line, _ in active]
+    return overlapping_lines
+
+
+def matches_filter_genes(line):
+    return ((start := line.find('gene_name "') + 11) > 10) and (
+        line[start : line.find('"', start)] in FILTER_GENES
+    )
+
+
+def get_stored_overlapping_lines(gtf_reader, feature_store, ref_chrom, all_coords):
+    chrom_features = feature_store.chromosome(ref_chrom)
+    gene_ids = chrom_features.gene_ids(FILTER_GENES) if FILTER_GENES else None
+    lines = {}
+    overlapping_lines = []
+    for data in all_coords:
+        indices = chrom_features.overlapping(data["posVcf"], data["posVcf"])
+        # Filter out features that do not have a matching gene name
+        if gene_ids is not None:
+            indices = [i for i in indices if chrom_features.genes[i] in gene_ids]
+        for i in indices:
+            if i not in lines:
+                lines[i] = chrom_features.line(i)
+        overlapping_lines.append([lines[i] for i in indices])
+    print(
+        f"Found {len(lines)} features in the feature store"
+        f" ({gtf_reader.bgzf.hits} block cache hits, {gtf_reader.bgzf.misses} misses)"
+    )
+    return overlapping_lines
+
+
+def find_overlapping_lines(ref_chrom, all_coords, reference_versions):
+    # Kept for the life of the container so warm invocations reuse cached blocks
+    gtf_reader, feature_store = reference_cache.get(
+        "gtf", reference_versions.get("ensembl_version"), load_gtf
+    )
+    if feature_store is not None:
+        return get_stored_overlapping_lines(
+            gtf_reader, feature_store, ref_chrom, all_coords
+        )
+    features = query_features(
+        gtf_reader, ref_chrom, [data["posVcf"] for data in all_coords]
+    )
+    # Filter out lines that do not contain the gene name
+    if FILTER_GENES:
+        features = [feature for feature in features if matches_filter_genes(feature[0])]
+    return get_overlapping_lines(all_coords, features)
+
+
+class FeatureBatch:
+    """Records for one message, with the GTF lines they overlap sent once.
+
+    Each record's data lists indices into the batch's features, as nearby
+    variants mostly overlap the same transcripts.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.features = []
+        self.feature_ids = {}
+        self.size = 0
+
+    def add(self, data, lines):
+        # Refuses the record, returning False, if it would take a non-empty
+        # batch over PAYLOAD_SIZE
+        new_ids = {}
+        indices = []
+        for line in lines:
+            if (i := self.feature_ids.get(line, new_ids.get(line))) is None:
+                i = new_ids[line] = len(self.features) + len(new_ids)
+            indices.append(i)
+        record = data | {"data": indices}
+        size = len(json.dumps(record, separators=(",", ":"))) + 1
+        size += sum(len(json.dumps(line)) + 1 for line in new_ids)
+        if self.records and self.size + size >= PAYLOAD_SIZE:
+            return False
+        self.feature_ids.update(new_ids)
+        self.features.extend(new_ids)
+        self.records.append(record)
+        self.size += size
+        return True
 
 
 def overlap_feature(orc, all_coords, timer):
-    results = []
-    tot_size = 0
+    batch = FeatureBatch()
     records_processed = 0
     records_passed = 0
-    for idx, data in enumerate(all_coords):
-        pos = data["posVcf"]
-        loc = f"{orc.ref_chrom}:{pos}-{pos}"
-        local_file = f"/tmp/{REFERENCE_GENOME}"
-        args = ["tabix", local_file, loc]
-        query_process = CheckedProcess(args)
-        main_data = query_process.stdout.read().rstrip("\n").split("\n")
-        query_process.check()
-        records_processed += len(main_data)
-        # Filter out lines that do not contain the gene name
-        if FILTER_GENES:
-            main_data = [
-                line
-                for line in main_data
-                if (
-                    ((start := line.find('gene_name "') + 11) > 10)
-                    and (line[start : line.find('"', start)] in FILTER_GENES)
-                )
-            ]
+    all_lines = find_overlapping_lines(
+        orc.ref_chrom, all_coords, orc.reference_versions
+    )
+    for idx, (data, main_data) in enumerate(zip(all_coords, all_lines)):
+        records_processed += 1
         if main_data:
-            data["data"] = main_data
-            records_passed += len(main_data)
-            cur_size = len(json.dumps(data, separators=(",", ":"))) + 1
-            tot_size += cur_size
-            if tot_size < PAYLOAD_SIZE:
-                results.append(data)
-            else:
-                send_data_to_plugins(orc, results)
-                results = [data]
-                tot_size = cur_size
+            records_passed += 1
+            if not batch.add(data, main_data):
+                send_data_to_plugins(orc, batch)
+                batch = FeatureBatch()
+                batch.add(data, main_data)
         if timer.out_of_time():
-            send_data_to_self(orc, all_coords[idx:])
+            send_data_to_self(orc, all_coords[idx + 1 :])
             break
-    send_data_to_plugins(orc, results)
-    print(f"Passed {records_passed}/{records_processed} records with matching genes.")
+    send_data_to_plugins(orc, batch)
+    print(
+        f"Passed {records_passed}/{records_processed} records with matching features."
+    )
 
 
-def send_data_to_plugins(orc, results):
-    if not results:
+def send_data_to_plugins(orc, batch):
+    if not batch.records:
         return
+    print(f"Sending {len(batch.records)} records with {len(batch.features)} features")
     orc.next_function(
         message={
-            "snsData": results,
+            "snsData": batch.records,
+            "features": batch.features,
         },
     )
 
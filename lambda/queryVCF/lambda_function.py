@@ -1,16 +1,27 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from contextlib import closing
+import gzip
+import itertools
 import os
+import queue
+import threading
 
+from shared.refcache import reference_cache
 from shared.utils import (
     CheckedProcess,
     orchestration,
     Timer,
+    download_to_tmp,
 )
-
+from shared.utils.chrom_matching import ChromosomeNotFoundError, _match_chromosome_name
 
 # Environment variables
 FILTER_MIN_QUAL = float(os.environ["FILTER_MIN_QUAL"])
 QUERY_VCF_SUBMIT_SNS_TOPIC_ARN = os.environ["QUERY_VCF_SUBMIT_SNS_TOPIC_ARN"]
+REFERENCE_LOCATION = os.environ["REFERENCE_LOCATION"]
 SLICE_SIZE_MBP = int(os.environ["SLICE_SIZE_MBP"])
+TARGET_BED = os.environ.get("TARGET_BED", "")
 os.environ["PATH"] += f':{os.environ["LAMBDA_TASK_ROOT"]}'
 
 MILLISECONDS_BEFORE_SPLIT = 130000
@@ -18,6 +29,11 @@ MILLISECONDS_BEFORE_SECOND_SPLIT = 120000
 RECORDS_PER_SAMPLE = 700
 BATCH_CHUNK_SIZE = 20
 PAYLOAD_SIZE = 260000
+# Chunks read ahead of the one being published
+MAX_PENDING_CHUNKS = 4
+PREFETCH_POLL_SECONDS = 0.5
+QUAL_INCLUDE = f'QUAL>={FILTER_MIN_QUAL} || QUAL="."'
+TARGETS_FILE = "/tmp/targets.tsv"
 
 REQUESTED_FORMAT_TAGS = {
     "gt": "GT",
@@ -81,12 +97,75 @@ def get_query_fields(location):
     }
 
 
-def get_query_lines(location, chrom, start, end, query_values):
+def load_target_bed():
+    download_to_tmp(REFERENCE_LOCATION, TARGET_BED, raise_on_notfound=True)
+    path = f"/tmp/{TARGET_BED}"
+    intervals = defaultdict(list)
+    ref_chroms = {}
+    with (gzip.open if path.endswith(".gz") else open)(path, "rt") as bed_file:
+        for line in bed_file:
+            if line.startswith(("#", "track", "browser")) or not line.strip():
+                continue
+            chrom, bed_start, bed_end = line.split("\t", 3)[:3]
+            if chrom not in ref_chroms:
+                try:
+                    ref_chroms[chrom] = _match_chromosome_name(chrom)
+                except ChromosomeNotFoundError:
+                    # Contigs outside the reference chromosomes can't hold
+                    # variants we annotate
+                    ref_chroms[chrom] = None
+            if (ref_chrom := ref_chroms[chrom]) is not None:
+                intervals[ref_chrom].append((int(bed_start) + 1, int(bed_end)))
+    # Everything needed is held in memory
+    os.remove(path)
+    # Merged into sorted, disjoint 1-based intervals per chromosome
+    targets = {}
+    for ref_chrom, chrom_intervals in intervals.items():
+        starts, ends = [], []
+        for start, end in sorted(chrom_intervals):
+            if starts and start <= ends[-1] + 1:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        targets[ref_chrom] = (starts, ends)
+    print(
+        f"Loaded {sum(map(len, intervals.values()))} target intervals from {TARGET_BED}"
+    )
+    return targets, []
+
+
+def get_targets(ref_chrom, start, end):
+    # Target intervals of the slice, clipped to it, or None without a target BED
+    if not TARGET_BED:
+        return None
+    targets = reference_cache.get("target_bed", TARGET_BED, load_target_bed)
+    starts, ends = targets.get(ref_chrom, ([], []))
+    first = bisect_left(ends, start)
+    last = bisect_right(starts, end)
+    return [
+        (max(target_start, start), min(target_end, end))
+        for target_start, target_end in zip(starts[first:last], ends[first:last])
+    ]
+
+
+def write_targets_file(chrom, targets):
+    # 1-based and inclusive, as bcftools reads files not ending in .bed
+    with open(TARGETS_FILE, "w") as targets_file:
+        for target_start, target_end in targets:
+            targets_file.write(f"{chrom}\t{target_start}\t{target_end}\n")
+    return TARGETS_FILE
+
+
+def get_query_lines(location, chrom, start, end, query_values, targets_file=None):
+    # Records are filtered on QUAL by bcftools and read as they are written,
+    # so only passing lines cross the pipe and the slice is never held whole
     norm_args = [
         "bcftools",
         "norm",
         "--regions",
         f"{chrom}:{start}-{end}",
+        *(["--targets-file", targets_file] if targets_file else []),
         "--atomize",
         "--atom-overlaps",
         ".",
@@ -98,92 +177,160 @@ def get_query_lines(location, chrom, start, end, query_values):
     query_args = [
         "bcftools",
         "query",
+        "--include",
+        QUAL_INCLUDE,
         "--format",
         "\t".join(query_values) + "\n",
     ]
     query_process = CheckedProcess(query_args, stdin=norm_process.stdout)
-    lines = query_process.stdout.read().splitlines()
-    norm_process.check()
-    query_process.check()
-    return lines
-
-
-def trim_alleles(vcf_line_dict):
-    pos = int(vcf_line_dict["posVcf"])
-    ref = vcf_line_dict["refVcf"]
-    alt = vcf_line_dict["altVcf"]
-    while len(ref) > 1 and len(alt) > 1:
-        if ref[-1] == alt[-1]:
-            ref = ref[:-1]
-            alt = alt[:-1]
-        elif ref[0] == alt[0]:
-            ref = ref[1:]
-            alt = alt[1:]
-            pos += 1
-        else:
-            break
-    vcf_line_dict.update(
-        {
-            "posVcf": pos,
-            "refVcf": ref,
-            "altVcf": alt,
-        }
-    )
-    return vcf_line_dict
+    try:
+        for line in query_process.stdout:
+            yield line[:-1]
+        norm_process.check()
+        query_process.check()
+    finally:
+        # Left running if the lines stop being read, such as when publishing
+        # fails, and no-ops for processes already checked
+        for process in (query_process, norm_process):
+            process.process.kill()
+            process.process.communicate()
 
 
-def submit_query_gtf(orc, regions_list, base_id, timer, query_keys):
-    all_lines = [
-        trim_alleles(
-            {
-                key: value
-                for key, value in zip(
-                    query_keys,
-                    vcf_line.split("\t"),
-                )
-            }
+def parse_query_lines(query_lines, query_keys):
+    # Columns keyed by field name. One split of the joined lines, then a
+    # strided slice per field, keeps the per-record work in C
+    query_keys = list(query_keys)
+    num_fields = len(query_keys)
+    fields = "\t".join(query_lines).split("\t") if query_lines else []
+    if len(fields) != num_fields * len(query_lines):
+        raise ValueError(
+            f"Expected {num_fields} fields in each of {len(query_lines)} query lines"
         )
-        for vcf_line in regions_list
-    ]
-    # Filter out records with low quality
-    before_filter = len(all_lines)
-    passed_lines = [
-        line_dict
-        for line_dict in all_lines
-        if ((qual := line_dict["qual"]) == ".") or (float(qual) >= FILTER_MIN_QUAL)
-    ]
-    print(
-        f"Passed {len(passed_lines)}/{before_filter} records with QUAL >= {FILTER_MIN_QUAL} or unknown"
+    return {key: fields[i::num_fields] for i, key in enumerate(query_keys)}
+
+
+def _common_prefix_length(a, b, limit):
+    length = 0
+    while length < limit and a[length] == b[length]:
+        length += 1
+    return length
+
+
+def trim_alleles(columns):
+    # Common suffixes go before common prefixes, leaving at least one base of
+    # each allele. Only records with both alleles longer than a base can
+    # change, so just those are visited.
+    positions = columns["posVcf"] = list(map(int, columns["posVcf"]))
+    refs = columns["refVcf"]
+    alts = columns["altVcf"]
+    shortest = map(min, map(len, refs), map(len, alts))
+    for i in itertools.compress(itertools.count(), map((1).__lt__, shortest)):
+        ref = refs[i]
+        alt = alts[i]
+        limit = min(len(ref), len(alt)) - 1
+        suffix = _common_prefix_length(ref[::-1], alt[::-1], limit)
+        if suffix:
+            ref = ref[:-suffix]
+            alt = alt[:-suffix]
+        prefix = _common_prefix_length(ref, alt, limit - suffix)
+        refs[i] = ref[prefix:]
+        alts[i] = alt[prefix:]
+        positions[i] += prefix
+    return columns
+
+
+def get_records(query_lines, query_keys):
+    columns = trim_alleles(parse_query_lines(query_lines, query_keys))
+    # Records are only built as dicts once they are about to be sent
+    keys = columns.keys()
+    return [dict(zip(keys, values)) for values in zip(*columns.values())]
+
+
+def prefetch(iterable, max_pending):
+    # Yields the items of iterable as a background thread produces them, at
+    # most max_pending ahead, so producing the next items overlaps with
+    # whatever the caller does with the current one
+    pending = queue.Queue(max_pending)
+    stopped = threading.Event()
+    end = object()
+
+    def put(item, error=None):
+        while not stopped.is_set():
+            try:
+                pending.put((item, error), timeout=PREFETCH_POLL_SECONDS)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(end)
+        except BaseException as error:
+            put(end, error)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = pending.get()
+            if error is not None:
+                raise error
+            if item is end:
+                return
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
+
+
+def submit_query_gtf(orc, query_lines, base_id, timer, query_keys):
+    num_records = 0
+    batches = iter(lambda: list(itertools.islice(query_lines, RECORDS_PER_SAMPLE)), [])
+    # bcftools keeps writing and chunks keep being built while earlier ones
+    # are published
+    chunks = prefetch(
+        (get_records(batch, query_keys) for batch in batches), MAX_PENDING_CHUNKS
     )
-    total_coords = [
-        passed_lines[x : x + RECORDS_PER_SAMPLE]
-        for x in range(0, len(passed_lines), RECORDS_PER_SAMPLE)
-    ]
-    for idx in range(len(total_coords)):
-        idx_base_id = f"{base_id}_{idx}"
-        if timer.out_of_time():
-            # Call self with remaining data
-            remaining_coords = total_coords[idx:]
-            print(f"remaining coords length {len(remaining_coords)}")
-            # These payloads will likely trigger s3 uploads, but it's faster than splitting into
-            # smaller chunks and starting more smaller functions.
-            for i in range(0, len(remaining_coords), BATCH_CHUNK_SIZE):
-                orc.start_function(
-                    topic_arn=QUERY_VCF_SUBMIT_SNS_TOPIC_ARN,
+    # The producer is joined when chunks closes, so query_lines is closed
+    # after it, from this thread
+    with closing(query_lines), closing(chunks):
+        for idx, chunk in enumerate(chunks):
+            idx_base_id = f"{base_id}_{idx}"
+            if timer.out_of_time():
+                # Call self with remaining data, a batch at a time as it is
+                # read, so no more than one batch is held
+                remaining_coords = itertools.chain([chunk], chunks)
+                num_remaining = 0
+                # These payloads will likely trigger s3 uploads, but it's faster than splitting into
+                # smaller chunks and starting more smaller functions.
+                while batch := list(
+                    itertools.islice(remaining_coords, BATCH_CHUNK_SIZE)
+                ):
+                    num_remaining += len(batch)
+                    num_records += sum(map(len, batch))
+                    orc.start_function(
+                        topic_arn=QUERY_VCF_SUBMIT_SNS_TOPIC_ARN,
+                        suffix=idx_base_id,
+                        message={
+                            "coords": batch,
+                        },
+                        track=True,
+                    )
+                print(f"remaining coords length {num_remaining}")
+                break
+            else:
+                num_records += len(chunk)
+                orc.next_function(
                     suffix=idx_base_id,
                     message={
-                        "coords": remaining_coords[i : i + BATCH_CHUNK_SIZE],
+                        "coords": chunk,
                     },
-                    track=True,
                 )
-            break
-        else:
-            orc.next_function(
-                suffix=idx_base_id,
-                message={
-                    "coords": total_coords[idx],
-                },
-            )
+    print(f"Submitted {num_records} records with QUAL >= {FILTER_MIN_QUAL} or unknown")
 
 
 def lambda_handler(event, context):
@@ -213,8 +360,18 @@ def lambda_handler(event, context):
                 region_base_id = f"{chrom}_{start_str}"
                 start = round(1000000 * float(start_str) + 1)
                 end = start + round(1000000 * SLICE_SIZE_MBP - 1)
+                targets = get_targets(orc.ref_chrom, start, end)
+                if targets == []:
+                    print(f"No targets in {region}, skipping")
+                    continue
+                targets_file = write_targets_file(chrom, targets) if targets else None
                 query_lines = get_query_lines(
-                    location, chrom, start, end, query_fields.values()
+                    location,
+                    chrom,
+                    start,
+                    end,
+                    query_fields.values(),
+                    targets_file=targets_file,
                 )
                 submit_query_gtf(
                     orc, query_lines, region_base_id, second_timer, query_fields.keys()
@@ -32,6 +32,15 @@ cat > xmltobed.py << 'EOF'
 __clinvar_xmltobed.py__
 EOF
 
+mkdir indexutils
+touch indexutils/__init__.py
+cat > indexutils/tabix.py << 'EOF'
+__indexutils/tabix.py__
+EOF
+cat > indexutils/lookup.py << 'EOF'
+__indexutils/lookup.py__
+EOF
+
 curl -O "${FULL_PATH}" --retry 9
 curl -O "${FULL_PATH}.md5" --retry 9
 # Remove preceeding path from md5 file
@@ -39,6 +48,7 @@ sed -i 's|\([a-f0-9]\+ \).*/|\1*|' "${CLINVAR_FILE}.md5"
 md5sum -c "${CLINVAR_FILE}.md5"
 bgzip -cd "${CLINVAR_FILE}" | python3 xmltobed.py | sort -k 1,1 -k 2,2n -k 3,3n | bgzip -c > "${OUTPUT_BED}"
 tabix --csi "${OUTPUT_BED}"
+python3 -m indexutils.lookup "${OUTPUT_BED}" "${OUTPUT_BED}.lookup"
 aws s3 cp --recursive --exclude "*" --include "${OUTPUT_BED}*" . "s3://${REFERENCE_BUCKET}/"
 aws dynamodb update-item \
   --region "${REGION}" \
@@ -1,7 +1,9 @@
 import json
 import os
 
+from shared.indexutils import write_constraint_table
 from shared.utils import (
+    CONSTRAINT_COLUMNS,
     download_remote_content,
     prepend_tmp,
     sns_publish,
@@ -39,15 +41,19 @@ def process_constraints(gnomad_version):
     index_filename = f"{constraints_filename}.idx"
     with open(index_filename, "w") as constraints_index_file:
         json.dump(index, constraints_index_file)
+    table_filename = f"{constraints_filename}.table"
+    write_constraint_table(constraints_filename, table_filename, CONSTRAINT_COLUMNS)
     s3_upload(
         bucket=REFERENCE_LOCATION,
         keys=[
             truncate_tmp(constraints_filename),
             truncate_tmp(index_filename),
+            truncate_tmp(table_filename),
         ],
         files=[
             constraints_filename,
             index_filename,
+            table_filename,
         ],
     )
     update_references_table(
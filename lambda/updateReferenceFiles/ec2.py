@@ -0,0 +1,80 @@
+import gzip
+import json
+import os
+
+import boto3
+
+EC2_IAM_INSTANCE_PROFILE = os.environ["EC2_IAM_INSTANCE_PROFILE"]
+AWS_REGION = os.environ["AWS_REGION"]
+FUNCTION_NAME = os.environ["AWS_LAMBDA_FUNCTION_NAME"]
+
+# EC2's limit on user data, counted before base64 encoding
+MAX_USER_DATA_BYTES = 16384
+
+REGION_AMI_MAP = {
+    "ap-southeast-2": "ami-0822a7a2356687b0f",
+    "ap-southeast-3": "ami-0f6fd501d5bfeb733",
+}
+
+
+def compress_user_data(user_data):
+    # cloud-init unpacks gzipped user data, which keeps scripts with
+    # inlined modules within EC2's limit
+    compressed = gzip.compress(user_data.encode(), mtime=0)
+    print(f"User data is {len(user_data)} bytes, {len(compressed)} bytes compressed")
+    if len(compressed) > MAX_USER_DATA_BYTES:
+        raise ValueError(
+            f"Compressed user data is {len(compressed)} bytes,"
+            f" over the {MAX_USER_DATA_BYTES} byte limit"
+        )
+    return compressed
+
+
+def launch_reference_instance(user_data, name, instance_type, volume_size):
+    try:
+        user_data = compress_user_data(user_data)
+    except ValueError as e:
+        print(f"Error preparing {name} user data: {str(e)}")
+        return {"statusCode": 500, "body": json.dumps(str(e))}
+    ec2_client = boto3.client("ec2")
+    ami = REGION_AMI_MAP[AWS_REGION]
+    device_name = ec2_client.describe_images(ImageIds=[ami])["Images"][0][
+        "RootDeviceName"
+    ]
+    try:
+        # Launch EC2 instance
+        response = ec2_client.run_instances(
+            ImageId=ami,
+            InstanceType=instance_type,
+            MinCount=1,
+            MaxCount=1,
+            BlockDeviceMappings=[
+                {
+                    "DeviceName": device_name,
+                    "Ebs": {
+                        "DeleteOnTermination": True,
+                        "VolumeSize": volume_size,
+                        "VolumeType": "gp3",
+                        "Encrypted": True,
+                    },
+                },
+            ],
+            UserData=user_data,
+            InstanceInitiatedShutdownBehavior="terminate",
+            TagSpecifications=[
+                {
+                    "ResourceType": "instance",
+                    "Tags": [{"Key": "Name", "Value": f"{FUNCTION_NAME}-{name}"}],
+                }
+            ],
+            IamInstanceProfile={"Name": EC2_IAM_INSTANCE_PROFILE},
+        )
+        instance_id = response["Instances"][0]["InstanceId"]
+    except Exception as e:
+        print(f"Error launching EC2 instance: {str(e)}")
+        return {"statusCode": 500, "body": json.dumps("Error launching EC2 instance")}
+    print(f"Launched EC2 instance {instance_id} To create {name} reference")
+    return {
+        "statusCode": 200,
+        "body": json.dumps(f"Launched EC2 instance {instance_id}"),
+    }
@@ -1,8 +1,10 @@
 import os
 
+from shared.indexutils import write_feature_store
 from shared.utils import (
     download_remote_content,
     execute_subprocess,
+    gene_panel_prefix,
     prepend_tmp,
     sns_publish,
     s3_upload,
@@ -10,6 +12,7 @@ from shared.utils import (
     update_references_table,
     _remove,
     _filter,
+    _filter_genes,
     _sort,
     _bgzip,
     _tabix_index,
@@ -20,6 +23,7 @@ UPDATEREFERENCEFILES_SNS_TOPIC_ARN = os.environ["UPDATEREFERENCEFILES_SNS_TOPIC_
 GTF_BASE = os.environ["GTF_BASE"]
 SPLICE_BASE = os.environ["SPLICE_BASE"]
 FASTA_BASE = os.environ["FASTA_BASE"]
+FILTER_GENES = set(os.environ.get("FILTER_GENES", "").split(",")) - {""}
 
 
 def update_ensembl(ensembl_version):
@@ -71,6 +75,16 @@ def process_ensembl_gtf(gtf_url):
     bgzipped_gtf_index = prepend_tmp(f"{bgzipped_gtf_file}.tbi")
     _tabix_index(bgzipped_gtf_file)
 
+    gtf_features_file = prepend_tmp(f"{bgzipped_gtf_file}.features")
+    write_feature_store(bgzipped_gtf_file, gtf_features_file)
+
+    # GENE PANEL
+    panel_files = (
+        _build_gene_panel_gtf(sorted_filtered_gtf_file, FILTER_GENES)
+        if FILTER_GENES
+        else []
+    )
+
     # SPLICE
     splice_file = prepend_tmp(f"{SPLICE_BASE}.gtf")
     _extract_splice(sorted_filtered_gtf_file, splice_file)
@@ -90,8 +104,10 @@ def process_ensembl_gtf(gtf_url):
     files = [
         bgzipped_gtf_file,
         bgzipped_gtf_index,
+        gtf_features_file,
         bgzipped_splice_file,
         bgzipped_splice_index,
+        *panel_files,
     ]
     keys = list(map(lambda file: truncate_tmp(file), files))
 
@@ -102,6 +118,31 @@ def process_ensembl_gtf(gtf_url):
     )
 
 
+def _build_gene_panel_gtf(sorted_gtf_file, genes):
+    # The splice file is left whole, splice region checks look at the exons
+    # of every nearby transcript, not just those in the panel.
+    panel_gtf_file = prepend_tmp(
+        f"{gene_panel_prefix(genes)}{truncate_tmp(sorted_gtf_file)}"
+    )
+    _filter_genes(sorted_gtf_file, panel_gtf_file, genes)
+
+    bgzipped_panel_gtf_file = prepend_tmp(f"{panel_gtf_file}.bgz")
+    _bgzip(panel_gtf_file, bgzipped_panel_gtf_file)
+    _remove(panel_gtf_file)
+
+    bgzipped_panel_gtf_index = prepend_tmp(f"{bgzipped_panel_gtf_file}.tbi")
+    _tabix_index(bgzipped_panel_gtf_file)
+
+    panel_features_file = prepend_tmp(f"{bgzipped_panel_gtf_file}.features")
+    write_feature_store(bgzipped_panel_gtf_file, panel_features_file)
+
+    return [
+        bgzipped_panel_gtf_file,
+        bgzipped_panel_gtf_index,
+        panel_features_file,
+    ]
+
+
 def process_ensembl_fasta(fasta_url, chr):
     fasta_file = prepend_tmp(f"{FASTA_BASE}.{chr}.fa")
     gzipped_fasta_file = prepend_tmp(f"{fasta_file}.gz")
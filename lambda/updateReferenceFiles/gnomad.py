@@ -0,0 +1,37 @@
+import os
+
+from shared.utils import (
+    GNOMAD_CHROMOSOMES,
+    GNOMAD_COLUMNS,
+    GNOMAD_S3_PREFIX,
+    GNOMAD_S3_SUFFIX,
+    GNOMAD_SLIM_BASE,
+)
+from ec2 import AWS_REGION, launch_reference_instance
+
+REFERENCE_LOCATION = os.environ["REFERENCE_LOCATION"]
+DYNAMO_SVEP_REFERENCES_TABLE = os.environ["DYNAMO_SVEP_REFERENCES_TABLE"]
+
+
+def update_gnomad_slim(gnomad_version):
+    with open("gnomad.sh") as user_data_file:
+        ec2_startup = (
+            user_data_file.read()
+            .replace("__GNOMAD_PREFIX__", GNOMAD_S3_PREFIX)
+            .replace("__GNOMAD_SUFFIX__", GNOMAD_S3_SUFFIX)
+            .replace("__SLIM_BASE__", GNOMAD_SLIM_BASE)
+            .replace("__CHROMOSOMES__", " ".join(GNOMAD_CHROMOSOMES))
+            .replace("__INFO_FIELDS__", ",".join(GNOMAD_COLUMNS.values()))
+            .replace("__REFERENCE_BUCKET__", REFERENCE_LOCATION)
+            .replace("__REGION__", AWS_REGION)
+            .replace("__TABLE__", DYNAMO_SVEP_REFERENCES_TABLE)
+            .replace("__ID__", "gnomad_slim_version")
+            .replace("__VERSION__", gnomad_version)
+        )
+    # Each chromosome is streamed from gnomAD and discarded once uploaded
+    return launch_reference_instance(
+        ec2_startup,
+        name="gnomad",
+        instance_type="m5.2xlarge",
+        volume_size=200,
+    )
@@ -0,0 +1,68 @@
+#!/bin/bash
+
+set -exuo pipefail
+trap 'shutdown -h now' EXIT
+
+GNOMAD_PREFIX="__GNOMAD_PREFIX__"
+GNOMAD_SUFFIX="__GNOMAD_SUFFIX__"
+SLIM_BASE="__SLIM_BASE__"
+CHROMOSOMES="__CHROMOSOMES__"
+INFO_FIELDS="__INFO_FIELDS__"
+REFERENCE_BUCKET="__REFERENCE_BUCKET__"
+REGION="__REGION__"
+TABLE="__TABLE__"
+ID="__ID__"
+VERSION="__VERSION__"
+
+yum update -y
+yum install -y \
+    awscli \
+    bzip2 \
+    gcc \
+    libcurl-devel \
+    make \
+    openssl-devel \
+    zlib-devel \
+
+# Install htslib and bcftools
+HTSLIB_VERSION="1.21"
+curl -L https://github.com/samtools/htslib/releases/download/$HTSLIB_VERSION/htslib-$HTSLIB_VERSION.tar.bz2 | tar -xjf -
+cd htslib-$HTSLIB_VERSION
+./configure --disable-bz2 --disable-lzma --enable-libcurl
+make install
+cd ..
+curl -L https://github.com/samtools/bcftools/releases/download/$HTSLIB_VERSION/bcftools-$HTSLIB_VERSION.tar.bz2 | tar -xjf -
+cd bcftools-$HTSLIB_VERSION
+./configure --disable-bz2 --disable-lzma
+make install
+cd ..
+
+slim_chromosome() {
+  set -euo pipefail
+  CHROM="$1"
+  OUTPUT="${SLIM_BASE}${CHROM}${GNOMAD_SUFFIX}"
+  bcftools annotate \
+    --remove "^${INFO_FIELDS}" \
+    --output-type u \
+    "${GNOMAD_PREFIX}${CHROM}${GNOMAD_SUFFIX}" \
+  | bcftools annotate \
+    --remove "ID,QUAL,FILTER" \
+    --output-type z \
+    --output "${OUTPUT}"
+  tabix -p vcf "${OUTPUT}"
+  # The index is uploaded last so a readable index implies a complete file
+  aws s3 cp "${OUTPUT}" "s3://${REFERENCE_BUCKET}/${OUTPUT}"
+  aws s3 cp "${OUTPUT}.tbi" "s3://${REFERENCE_BUCKET}/${OUTPUT}.tbi"
+  rm "${OUTPUT}" "${OUTPUT}.tbi"
+}
+export -f slim_chromosome
+export GNOMAD_PREFIX GNOMAD_SUFFIX SLIM_BASE INFO_FIELDS REFERENCE_BUCKET
+
+echo ${CHROMOSOMES} | tr ' ' '\n' | xargs -P "$(nproc)" -I {} bash -c 'slim_chromosome {}'
+
+aws dynamodb update-item \
+  --region "${REGION}" \
+  --table-name "${TABLE}" \
+  --key '{"id": {"S": "'"${ID}"'"}}' \
+  --update-expression "SET version = :version" \
+  --expression-attribute-values '{":version": {"S": "'"${VERSION}"'"}}'
@@ -1,15 +1,21 @@
+import os
+
 from clinvar import update_clinvar
 from ensembl import process_ensembl_gtf, process_ensembl_fasta, update_ensembl
 from constraints import process_constraints, update_constraints
+from gnomad import update_gnomad_slim
 from mirna import process_mirna_gff, update_mirna
 from shared.utils import get_sns_event, clear_tmp
 from version_checks import (
     check_clinvar_version,
     check_ensembl_version,
     check_gnomad_constraints_version,
+    check_gnomad_slim_version,
     check_mirna_hash,
 )
 
+GNOMAD_LOCAL_STORE = os.environ.get("GNOMAD_LOCAL_STORE", "false") == "true"
+
 
 def lambda_handler(event, _):
     clear_tmp()
@@ -20,6 +26,9 @@ def lambda_handler(event, _):
             check_gnomad_constraints_version()
         )
         mirna_outdated, mirna_hash = check_mirna_hash()
+        gnomad_slim_outdated, gnomad_slim_version = (
+            check_gnomad_slim_version() if GNOMAD_LOCAL_STORE else (False, None)
+        )
 
         if clinvar_outdated:
             update_clinvar(clinvar_version)
@@ -33,6 +42,9 @@ def lambda_handler(event, _):
         if mirna_outdated:
             update_mirna(mirna_hash)
 
+        if gnomad_slim_outdated:
+            update_gnomad_slim(gnomad_slim_version)
+
     elif "Records" in event and event["Records"][0].get("EventSource") == "aws:sns":
         message = get_sns_event(event)
         match message["file_type"]:
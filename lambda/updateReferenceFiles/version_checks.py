@@ -2,7 +2,7 @@ import hashlib
 import os
 import xml.etree.ElementTree as ET
 
-from shared.utils import fetch_remote_content, query_references_table
+from shared.utils import GNOMAD_VERSION, fetch_remote_content, query_references_table
 from clinvar import CLINVAR_FTP_PATH, CLINVAR_FTP_FILE
 
 REFERENCE_LOCATION = os.environ["REFERENCE_LOCATION"]
@@ -46,6 +46,12 @@ def check_gnomad_constraints_version():
     )
 
 
+def check_gnomad_slim_version():
+    id = "gnomad_slim_version"
+    local_gnomad_version = query_references_table(id)
+    return GNOMAD_VERSION != local_gnomad_version, GNOMAD_VERSION
+
+
 def check_mirna_hash():
     id = "mirna_hash"
     mirna_content = fetch_remote_content(MIRNA_GFF_URL)
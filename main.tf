@@ -89,7 +89,6 @@ module "lambda-initQuery" {
   tags                   = var.common-tags
 
   environment_variables = {
-    CONCAT_STARTER_SNS_TOPIC_ARN    = aws_sns_topic.concatStarter.arn
     NEXT_FUNCTION_SNS_TOPIC_ARN     = aws_sns_topic.queryVCF.arn
     RESULT_DURATION                 = local.result_duration
     RESULT_SUFFIX                   = local.result_suffix
@@ -98,6 +97,7 @@ module "lambda-initQuery" {
     HTS_S3_HOST                     = "s3.${var.region}.amazonaws.com"
     DYNAMO_PROJECT_USERS_TABLE      = var.dynamo-project-users-table
     DYNAMO_CLINIC_JOBS_TABLE        = var.dynamo-clinic-jobs-table
+    DYNAMO_SVEP_PROGRESS_TABLE      = aws_dynamodb_table.svep_progress.name
     DYNAMO_SVEP_REFERENCES_TABLE    = aws_dynamodb_table.svep_references.name
     COGNITO_CLINIC_JOB_EMAIL_LAMBDA = var.clinic-job-email-lambda-function-arn
     USER_POOL_ID                    = var.cognito-user-pool-id
@@ -169,7 +169,12 @@ module "lambda-queryVCF" {
     QUERY_VCF_SUBMIT_SNS_TOPIC_ARN  = aws_sns_topic.queryVCFsubmit.arn
     SLICE_SIZE_MBP                  = local.slice_size_mbp
     FILTER_MIN_QUAL                 = var.filters.min_qual
+    REFERENCE_LOCATION              = aws_s3_bucket.svep-references.bucket
+    TARGET_BED                      = var.filters.target_bed
     DYNAMO_CLINIC_JOBS_TABLE        = var.dynamo-clinic-jobs-table
+    CONCAT_STARTER_SNS_TOPIC_ARN    = aws_sns_topic.concatStarter.arn
+    DYNAMO_SVEP_PROGRESS_TABLE      = aws_dynamodb_table.svep_progress.name
+    PAYLOAD_ENCODING                = var.payload_encoding
     COGNITO_CLINIC_JOB_EMAIL_LAMBDA = var.clinic-job-email-lambda-function-arn
     USER_POOL_ID                    = var.cognito-user-pool-id
     SEND_JOB_EMAIL_ARN              = aws_sns_topic.sendJobEmail.arn
@@ -203,11 +208,14 @@ module "lambda-queryVCFsubmit" {
   tags                   = var.common-tags
 
   environment_variables = {
-    SVEP_TEMP                   = aws_s3_bucket.svep-temp.bucket
-    NEXT_FUNCTION_SNS_TOPIC_ARN = aws_sns_topic.queryGTF.arn
-    DYNAMO_CLINIC_JOBS_TABLE    = var.dynamo-clinic-jobs-table
-    USER_POOL_ID                = var.cognito-user-pool-id
-    SEND_JOB_EMAIL_ARN          = aws_sns_topic.sendJobEmail.arn
+    SVEP_TEMP                    = aws_s3_bucket.svep-temp.bucket
+    NEXT_FUNCTION_SNS_TOPIC_ARN  = aws_sns_topic.queryGTF.arn
+    DYNAMO_CLINIC_JOBS_TABLE     = var.dynamo-clinic-jobs-table
+    CONCAT_STARTER_SNS_TOPIC_ARN = aws_sns_topic.concatStarter.arn
+    DYNAMO_SVEP_PROGRESS_TABLE   = aws_dynamodb_table.svep_progress.name
+    PAYLOAD_ENCODING             = var.payload_encoding
+    USER_POOL_ID                 = var.cognito-user-pool-id
+    SEND_JOB_EMAIL_ARN           = aws_sns_topic.sendJobEmail.arn
   }
 
   layers = [
@@ -241,6 +249,9 @@ module "lambda-queryGTF" {
     NEXT_FUNCTION_SNS_TOPIC_ARN     = aws_sns_topic.pluginConsequence.arn
     FILTER_GENES                    = join(",", var.filters.genes)
     DYNAMO_CLINIC_JOBS_TABLE        = var.dynamo-clinic-jobs-table
+    CONCAT_STARTER_SNS_TOPIC_ARN    = aws_sns_topic.concatStarter.arn
+    DYNAMO_SVEP_PROGRESS_TABLE      = aws_dynamodb_table.svep_progress.name
+    PAYLOAD_ENCODING                = var.payload_encoding
     COGNITO_CLINIC_JOB_EMAIL_LAMBDA = var.clinic-job-email-lambda-function-arn
     USER_POOL_ID                    = var.cognito-user-pool-id
     SEND_JOB_EMAIL_ARN              = aws_sns_topic.sendJobEmail.arn
@@ -285,6 +296,8 @@ module "lambda-pluginConsequence" {
     FASTA_REFERENCE_BASE            = var.fasta_file_base
     FILTER_CONSEQUENCE_RANK         = var.filters.consequence_rank
     DYNAMO_CLINIC_JOBS_TABLE        = var.dynamo-clinic-jobs-table
+    CONCAT_STARTER_SNS_TOPIC_ARN    = aws_sns_topic.concatStarter.arn
+    DYNAMO_SVEP_PROGRESS_TABLE      = aws_dynamodb_table.svep_progress.name
     COGNITO_CLINIC_JOB_EMAIL_LAMBDA = var.clinic-job-email-lambda-function-arn
     SEND_JOB_EMAIL_ARN              = aws_sns_topic.sendJobEmail.arn
     USER_POOL_ID                    = var.cognito-user-pool-id
@@ -293,70 +306,80 @@ module "lambda-pluginConsequence" {
 }
 
 #
-# pluginClinvar Lambda Function
+# pluginConsequencePython Lambda Function
 #
-module "lambda-pluginClinvar" {
+module "lambda-pluginConsequencePython" {
   source              = "terraform-aws-modules/lambda/aws"
-  function_name       = "svep-backend-pluginClinvar"
-  description         = "Add ClinVar annotations to sVEP result rows."
+  function_name       = "svep-backend-pluginConsequencePython"
+  description         = "Annotates variant consequences without the VEP docker image."
   handler             = "lambda_function.lambda_handler"
   runtime             = "python3.12"
   memory_size         = 2048
-  timeout             = 24
+  timeout             = 600
   attach_policy_jsons = true
   policy_jsons = [
-    data.aws_iam_policy_document.lambda-pluginClinvar.json
+    data.aws_iam_policy_document.lambda-pluginConsequence.json
   ]
   number_of_policy_jsons = 1
-  source_path            = "${path.module}/lambda/pluginClinvar"
+  source_path            = "${path.module}/lambda/pluginConsequencePython"
   tags                   = var.common-tags
 
   environment_variables = {
     SVEP_TEMP                       = aws_s3_bucket.svep-temp.bucket
+    NEXT_FUNCTION_SNS_TOPIC_ARN     = aws_sns_topic.pluginClinvar.arn
     REFERENCE_LOCATION              = aws_s3_bucket.svep-references.bucket
-    CLINVAR_REFERENCE               = "clinvar.bed.gz"
-    NEXT_FUNCTION_SNS_TOPIC_ARN     = aws_sns_topic.pluginGnomad.arn
-    FILTER_CLINVAR_EXCLUDE          = join(",", var.filters.clinvar_exclude)
+    SPLICE_REFERENCE                = "sorted_${var.splice_file_base}.gtf.bgz"
+    MIRNA_REFERENCE                 = "sorted_filtered_${var.mirna_file_base}.gff3.bgz"
+    FASTA_REFERENCE_BASE            = var.fasta_file_base
+    FILTER_CONSEQUENCE_RANK         = var.filters.consequence_rank
     DYNAMO_CLINIC_JOBS_TABLE        = var.dynamo-clinic-jobs-table
+    CONCAT_STARTER_SNS_TOPIC_ARN    = aws_sns_topic.concatStarter.arn
+    DYNAMO_SVEP_PROGRESS_TABLE      = aws_dynamodb_table.svep_progress.name
+    PAYLOAD_ENCODING                = var.payload_encoding
     COGNITO_CLINIC_JOB_EMAIL_LAMBDA = var.clinic-job-email-lambda-function-arn
-    USER_POOL_ID                    = var.cognito-user-pool-id
     SEND_JOB_EMAIL_ARN              = aws_sns_topic.sendJobEmail.arn
+    USER_POOL_ID                    = var.cognito-user-pool-id
     HTS_S3_HOST                     = "s3.${var.region}.amazonaws.com"
   }
 
   layers = [
-    local.binaries_layer,
     local.python_modules_layer,
   ]
 }
 
 #
-# pluginGnomad Lambda Function
+# pluginClinvar Lambda Function
 #
-module "lambda-pluginGnomad" {
+module "lambda-pluginClinvar" {
   source              = "terraform-aws-modules/lambda/aws"
-  function_name       = "svep-backend-pluginGnomad"
-  description         = "Add Gnomad annotations to sVEP result rows."
+  function_name       = "svep-backend-pluginClinvar"
+  description         = "Add ClinVar annotations to sVEP result rows."
   handler             = "lambda_function.lambda_handler"
   runtime             = "python3.12"
-  memory_size         = 256
-  timeout             = 900
+  memory_size         = 2048
+  timeout             = 24
   attach_policy_jsons = true
   policy_jsons = [
-    data.aws_iam_policy_document.lambda-pluginGnomad.json
+    data.aws_iam_policy_document.lambda-pluginClinvar.json
   ]
   number_of_policy_jsons = 1
-  source_path            = "${path.module}/lambda/pluginGnomad"
+  source_path            = "${path.module}/lambda/pluginClinvar"
   tags                   = var.common-tags
 
   environment_variables = {
     SVEP_TEMP                       = aws_s3_bucket.svep-temp.bucket
-    NEXT_FUNCTION_SNS_TOPIC_ARN     = aws_sns_topic.pluginGnomadOneKG.arn
-    FILTER_MAX_MAF                  = var.filters.max_maf
+    REFERENCE_LOCATION              = aws_s3_bucket.svep-references.bucket
+    CLINVAR_REFERENCE               = "clinvar.bed.gz"
+    NEXT_FUNCTION_SNS_TOPIC_ARN     = aws_sns_topic.pluginGnomad.arn
+    FILTER_CLINVAR_EXCLUDE          = join(",", var.filters.clinvar_exclude)
     DYNAMO_CLINIC_JOBS_TABLE        = var.dynamo-clinic-jobs-table
+    CONCAT_STARTER_SNS_TOPIC_ARN    = aws_sns_topic.concatStarter.arn
+    DYNAMO_SVEP_PROGRESS_TABLE      = aws_dynamodb_table.svep_progress.name
+    PAYLOAD_ENCODING                = var.payload_encoding
     COGNITO_CLINIC_JOB_EMAIL_LAMBDA = var.clinic-job-email-lambda-function-arn
     USER_POOL_ID                    = var.cognito-user-pool-id
     SEND_JOB_EMAIL_ARN              = aws_sns_topic.sendJobEmail.arn
+    HTS_S3_HOST                     = "s3.${var.region}.amazonaws.com"
   }
 
   layers = [
@@ -366,31 +389,38 @@ module "lambda-pluginGnomad" {
 }
 
 #
-# pluginGnomadOneKG Lambda Function
+# pluginGnomad Lambda Function
 #
-module "lambda-pluginGnomadOneKG" {
+module "lambda-pluginGnomad" {
   source              = "terraform-aws-modules/lambda/aws"
-  function_name       = "svep-backend-pluginGnomadOneKG"
-  description         = "Add Gnomad 1kg annotations to sVEP result rows."
+  function_name       = "svep-backend-pluginGnomad"
+  description         = "Add Gnomad and 1kg annotations to sVEP result rows."
   handler             = "lambda_function.lambda_handler"
   runtime             = "python3.12"
   memory_size         = 256
   timeout             = 900
   attach_policy_jsons = true
   policy_jsons = [
-    data.aws_iam_policy_document.lambda-pluginGnomadOneKG.json
+    data.aws_iam_policy_document.lambda-pluginGnomad.json
   ]
   number_of_policy_jsons = 1
-  source_path            = "${path.module}/lambda/pluginGnomadOneKG"
+  source_path            = "${path.module}/lambda/pluginGnomad"
   tags                   = var.common-tags
 
   environment_variables = {
     SVEP_TEMP                       = aws_s3_bucket.svep-temp.bucket
     NEXT_FUNCTION_SNS_TOPIC_ARN     = aws_sns_topic.pluginGnomadConstraint.arn
+    FILTER_MAX_MAF                  = var.filters.max_maf
     DYNAMO_CLINIC_JOBS_TABLE        = var.dynamo-clinic-jobs-table
+    CONCAT_STARTER_SNS_TOPIC_ARN    = aws_sns_topic.concatStarter.arn
+    DYNAMO_SVEP_PROGRESS_TABLE      = aws_dynamodb_table.svep_progress.name
+    PAYLOAD_ENCODING                = var.payload_encoding
     COGNITO_CLINIC_JOB_EMAIL_LAMBDA = var.clinic-job-email-lambda-function-arn
     USER_POOL_ID                    = var.cognito-user-pool-id
     SEND_JOB_EMAIL_ARN              = aws_sns_topic.sendJobEmail.arn
+    DYNAMO_SVEP_REFERENCES_TABLE    = aws_dynamodb_table.svep_references.name
+    GNOMAD_SLIM_LOCATION            = var.gnomad_local_store ? "s3://${aws_s3_bucket.svep-references.bucket}/" : ""
+    HTS_S3_HOST                     = "s3.${var.region}.amazonaws.com"
   }
 
   layers = [
@@ -398,6 +428,7 @@ module "lambda-pluginGnomadOneKG" {
     local.python_modules_layer,
   ]
 }
+
 #
 # pluginGnomadConstraint Lambda Function
 #
@@ -421,6 +452,9 @@ module "lambda-pluginGnomadConstraint" {
     SVEP_TEMP                       = aws_s3_bucket.svep-temp.bucket
     NEXT_FUNCTION_SNS_TOPIC_ARN     = aws_sns_topic.formatOutput.arn
     DYNAMO_CLINIC_JOBS_TABLE        = var.dynamo-clinic-jobs-table
+    CONCAT_STARTER_SNS_TOPIC_ARN    = aws_sns_topic.concatStarter.arn
+    DYNAMO_SVEP_PROGRESS_TABLE      = aws_dynamodb_table.svep_progress.name
+    PAYLOAD_ENCODING                = var.payload_encoding
     COGNITO_CLINIC_JOB_EMAIL_LAMBDA = var.clinic-job-email-lambda-function-arn
     USER_POOL_ID                    = var.cognito-user-pool-id
     SEND_JOB_EMAIL_ARN              = aws_sns_topic.sendJobEmail.arn
@@ -637,6 +671,8 @@ module "lambda-updateReferenceFiles" {
     SPLICE_BASE                        = var.splice_file_base
     FASTA_BASE                         = var.fasta_file_base
     MIRNA_BASE                         = var.mirna_file_base
+    FILTER_GENES                       = join(",", var.filters.genes)
+    GNOMAD_LOCAL_STORE                 = var.gnomad_local_store
     UPDATEREFERENCEFILES_SNS_TOPIC_ARN = aws_sns_topic.updateReferenceFiles.arn
     EC2_IAM_INSTANCE_PROFILE           = aws_iam_instance_profile.ec2_references_instance_profile.name
   }
@@ -695,6 +731,9 @@ module "lambda-formatOutput" {
     SVEP_TEMP                       = aws_s3_bucket.svep-temp.bucket
     SVEP_REGIONS                    = aws_s3_bucket.svep-regions.bucket
     DYNAMO_CLINIC_JOBS_TABLE        = var.dynamo-clinic-jobs-table
+    CONCAT_STARTER_SNS_TOPIC_ARN    = aws_sns_topic.concatStarter.arn
+    DYNAMO_SVEP_PROGRESS_TABLE      = aws_dynamodb_table.svep_progress.name
+    PAYLOAD_ENCODING                = var.payload_encoding
     COGNITO_CLINIC_JOB_EMAIL_LAMBDA = var.clinic-job-email-lambda-function-arn
     USER_POOL_ID                    = var.cognito-user-pool-id
     SEND_JOB_EMAIL_ARN              = aws_sns_topic.sendJobEmail.arn
@@ -0,0 +1,2 @@
+from .engine import ConsequenceEngine
+from .transcripts import TranscriptModel, transcript_models
@@ -0,0 +1,68 @@
+from itertools import product
+
+# Standard genetic code, codons ordered t, c, a, g at each position
+CODON_TABLE = "FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG"
+CODONS = {
+    "".join(codon): index for index, codon in enumerate(product("tcag", repeat=3))
+}
+IUB = {
+    "A": "A",
+    "C": "C",
+    "G": "G",
+    "T": "T",
+    "M": "AC",
+    "R": "AG",
+    "S": "CG",
+    "W": "AT",
+    "Y": "CT",
+    "K": "GT",
+    "V": "ACG",
+    "H": "ACT",
+    "D": "AGT",
+    "B": "CGT",
+    "N": "ACGT",
+    "X": "ACGT",
+}
+COMPLEMENT = str.maketrans(
+    "acgtrymkswhbvdnxACGTRYMKSWHBVDNX", "tgcayrkmswdvbhnxTGCAYRKMSWDVBHNX"
+)
+
+
+def reverse_complement(seq: str) -> str:
+    return seq[::-1].translate(COMPLEMENT)
+
+
+def _ambiguous_codon(triplet: str, partial: bool = False) -> str:
+    """The amino acid shared by every codon the ambiguous triplet can stand for."""
+    codons = product(*(IUB.get(base.upper(), "") for base in triplet))
+    aas = {CODON_TABLE[CODONS["".join(codon).lower()]] for codon in codons}
+    if len(aas) == 1:
+        return aas.pop()
+    if aas == {"D", "N"}:
+        return "B"
+    if aas == {"E", "Q"}:
+        return "Z"
+    return "" if partial else "X"
+
+
+def translate(seq: str, complete_codon: bool = False, frame: int = 0) -> str:
+    """Protein for seq read from frame, as the CodonTable module of the Perl engine.
+
+    With complete_codon, two trailing bases are translated if they settle
+    the amino acid on their own.
+    """
+    if not seq:
+        return ""
+    seq = seq[frame:].lower().replace("u", "t")
+    protein = []
+    for i in range(0, len(seq) - 2, 3):
+        triplet = seq[i : i + 3]
+        if triplet == "---":
+            protein.append("-")
+        elif (index := CODONS.get(triplet)) is not None:
+            protein.append(CODON_TABLE[index])
+        else:
+            protein.append(_ambiguous_codon(triplet))
+    if complete_codon and len(seq) % 3 == 2:
+        protein.append(_ambiguous_codon(f"{seq[-2:]}n", partial=True))
+    return "".join(protein)
@@ -0,0 +1,332 @@
+from typing import Dict, List, Tuple
+
+from .predicates import (
+    INCLUDE_KEYS,
+    INTERGENIC_VARIANT,
+    OVERLAP_CONSEQUENCES,
+    Allele,
+    Feature,
+    OverlapConsequence,
+    TranscriptVariation,
+    VariationFeature,
+    overlap,
+)
+from .transcripts import TranscriptModel, split_fields, transcript_models
+
+MAX_CACHED_SPLICE_ROWS = 10000
+NO_CONSEQUENCE_RANK = 99
+
+
+def _update_preds(preds: dict, digest: List[str], key: str, value):
+    preds[key] = value
+    if key in INCLUDE_KEYS:
+        digest.append(f"{key}{value}")
+
+
+def _near(distance: int) -> bool:
+    return 0 <= distance <= 3
+
+
+class ConsequenceEngine:
+    """Python counterpart of pluginConsequence's VEP.pm.
+
+    Gives the same records as its parse_vcf for a queryGTF line, from
+    in-process readers of the FASTA, splice and miRNA references. Use one
+    engine per invocation: like the Perl process, it remembers which
+    consequences to test for each combination of predicates it has seen.
+    """
+
+    def __init__(self, fasta, splice, mirna, filter_rank: int):
+        self.fasta_reader = fasta
+        self.splice = splice
+        self.mirna = mirna
+        self.filter_rank = filter_rank
+        self.processed_records = 0
+        self._oc_lists: Dict[str, List[OverlapConsequence]] = {}
+        self._splice_rows: Dict[Tuple[str, int, int], List[List[str]]] = {}
+
+    def fasta(self, chrom: str, start: int, end: int) -> str:
+        return self.fasta_reader.fetch(chrom, start, end)
+
+    def splice_rows(self, chrom: str, start: int, end: int) -> List[List[str]]:
+        key = (chrom, start, end)
+        if (rows := self._splice_rows.get(key)) is None:
+            if len(self._splice_rows) >= MAX_CACHED_SPLICE_ROWS:
+                self._splice_rows.clear()
+            rows = [line.split("\t") for line in self.splice.fetch(chrom, start, end)]
+            self._splice_rows[key] = rows
+        return rows
+
+    def _within_mirna(self, ref_chrom: str, start: int) -> int:
+        return int(any(True for _ in self.mirna.fetch(f"chr{ref_chrom}", start, start)))
+
+    def annotate(self, line: dict, ref_chrom: str) -> List[dict]:
+        """Consequence records for a queryGTF line, ordered by rank."""
+        data = line["data"]
+        if not data or data[0] == "":
+            return []
+        chrom = line["chrom"]
+        start = line["posVcf"]
+        ref = line["refVcf"]
+        alt = line["altVcf"]
+        non_variant = alt == "."
+        end = start + len(ref) - 1
+        alts = split_fields(alt, ",")
+        is_indel = any(
+            allele[:1] in ("D", "I") or len(allele) != len(ref) for allele in alts
+        )
+        if "," in alt:
+            if is_indel:
+                first_bases = {
+                    allele[:1] for allele in [ref, *alts] if "*" not in allele
+                }
+                if len(first_bases) == 1:
+                    ref = ref[1:] or "-"
+                    start += 1
+                    alts = [
+                        (allele if "*" in allele else allele[1:]) or "-"
+                        for allele in alts
+                    ]
+            alt = "/".join(alts)
+        elif is_indel and ref[:1] == alt[:1]:
+            ref = ref[1:] or "-"
+            alt = alt[1:] or "-"
+            start += 1
+        allele_string = ref if non_variant else f"{ref}/{alt}"
+
+        results = []
+        splice_rows = None
+        for model in transcript_models(data):
+            if not splice_rows:
+                splice_rows = self.splice_rows(ref_chrom, start - 8, start + 8)
+            tv = self._transcript_variation(
+                model, start, end, ref, alt, allele_string, ref_chrom, splice_rows
+            )
+            consequence, rank = self._vf_to_consequences(tv)
+            feature = tv.feature
+            if feature.three_prime_utr:
+                consequence = (
+                    "3_prime_UTR_variant"
+                    if consequence == INTERGENIC_VARIANT.term
+                    else f"3_prime_UTR_variant,{consequence}"
+                )
+            if feature.five_prime_utr:
+                consequence = (
+                    "5_prime_UTR_variant"
+                    if consequence == INTERGENIC_VARIANT.term
+                    else f"5_prime_UTR_variant,{consequence}"
+                )
+            attributes = model.attributes
+            gene_name = attributes.get("gene_name")
+            record = {key: value for key, value in line.items() if key != "data"}
+            record.update(
+                rank=rank,
+                region=f"{chrom}:{min(start, end)}-{max(start, end)}",
+                alt=alt,
+                consequence=consequence,
+                geneName="-" if gene_name is None else gene_name,
+                geneId=attributes.get("gene_id"),
+                feature=model.feature,
+                transcriptId=f"{attributes.get('transcript_id') or ''}.{attributes.get('transcript_version') or ''}",
+                transcriptBiotype=attributes.get("transcript_biotype"),
+                exonNumber=model.exon_number or "-",
+                aminoAcids=feature.aa or "-",
+                codons=feature.codons or "-",
+                strand=model.strand,
+                transcriptSupportLevel=attributes.get("transcript_support_level")
+                or "-",
+                ref=ref,
+            )
+            if feature.warning:
+                record["warning"] = feature.warning
+            self.processed_records += 1
+            if rank <= self.filter_rank:
+                results.append(record)
+        results.sort(key=lambda record: record["rank"])
+        return results
+
+    def _transcript_variation(
+        self,
+        model: TranscriptModel,
+        start: int,
+        end: int,
+        ref: str,
+        alt: str,
+        allele_string: str,
+        ref_chrom: str,
+        splice_rows: List[List[str]],
+    ) -> TranscriptVariation:
+        transcript_id = model.transcript_id
+        feature = Feature(
+            transcript_id,
+            model.attributes.get("transcript_biotype"),
+            model.start,
+            model.end,
+            model.strand,
+            start,
+            ref,
+            alt,
+        )
+        if model.exon is None:
+            vf = VariationFeature(start, end, allele_string, model.strand, intron=1)
+            span = 3 + end - start
+            for row in splice_rows:
+                if (row[7] if len(row) > 7 else "") != (transcript_id or ""):
+                    continue
+                row_start, row_end = int(row[3]), int(row[4])
+                boundary = None
+                if row[6] in ("+", "-"):
+                    if row_start > end and row_start - end < span:
+                        boundary = "acceptor" if row[6] == "+" else "donor"
+                    elif end > row_end and end - row_end < span:
+                        boundary = "donor" if row[6] == "+" else "acceptor"
+                if boundary is not None:
+                    setattr(feature, f"splice_{boundary}_variant", 1)
+                    feature.intron_boundary = 1
+                    vf.intron = 0
+                    break
+                if 0 < row_start - end < 9 or 0 < end - row_end < 9:
+                    feature.splice_region_variant = 1
+                    feature.intron_boundary = 1
+            return TranscriptVariation(vf, feature, self)
+
+        vf = VariationFeature(
+            start,
+            end,
+            allele_string,
+            model.strand,
+            seq_region_start=model.exon.start,
+            seq_region_end=model.exon.end,
+            exon=True,
+            reference_chr=ref_chrom,
+        )
+        if model.cds is not None:
+            boundary_start, boundary_end = model.cds.start, model.cds.end
+        else:
+            boundary_start, boundary_end = model.exon.start, model.exon.end
+        other_exon = any(
+            row[2] == "exon" and (len(row) < 8 or row[7] != transcript_id)
+            for row in splice_rows
+        )
+        at_boundary = other_exon and (
+            _near(boundary_end - start) or _near(start - boundary_start)
+        )
+        feature.intron_boundary = int(at_boundary)
+        feature.splice_region_variant = int(at_boundary)
+        if model.cds is not None:
+            if model.start_stop:
+                feature.intron_boundary = 0
+            feature.cds = True
+            feature.cdna_coding_start = model.cds.start
+            feature.cdna_coding_end = model.cds.end
+            feature.cds_frame = model.cds.frame
+            feature.seq = self.fasta(ref_chrom, model.cds.start, model.cds.end)
+            feature.seq_length = abs(model.cds.end - model.cds.start) + 1
+        else:
+            feature.three_prime_utr = model.three_prime_utr
+            feature.five_prime_utr = model.five_prime_utr and not model.three_prime_utr
+            feature.exon_start = model.exon.start
+            feature.exon_end = model.exon.end
+        if model.source == "mirbase":
+            feature.within_mirna = self._within_mirna(ref_chrom, start)
+        return TranscriptVariation(vf, feature, self)
+
+    def _pre_predicates(self, allele: Allele):
+        """Predicates that decide which consequences are worth testing for the allele."""
+        tv, vf, feature = allele.tv, allele.vf, allele.feature
+        preds = {}
+        digest = []
+        if vf.preds is None:
+            vf.preds = {}
+            vf.digest = []
+            if vf.start <= feature.start and vf.end >= feature.end:
+                _update_preds(vf.preds, vf.digest, "complete_overlap", 1)
+            _update_preds(vf.preds, vf.digest, "sv", 0)
+            _update_preds(vf.preds, vf.digest, "ref_length", vf.end - vf.start + 1)
+        preds.update(vf.preds)
+        digest.extend(vf.digest)
+        if tv.preds is None:
+            # The intron keys go to the first allele only, though every
+            # allele's digest includes them
+            tv.preds = {}
+            tv.digest = []
+            _update_preds(
+                tv.preds,
+                tv.digest,
+                "within_feature",
+                int(overlap(vf.start, vf.end, feature.start, feature.end)),
+            )
+            if tv.preds["within_feature"]:
+                _update_preds(tv.preds, tv.digest, feature.biotype or "", 1)
+                if vf.intron is not None:
+                    _update_preds(preds, tv.digest, "intron", 1)
+                if feature.intron_boundary == 1:
+                    _update_preds(preds, tv.digest, "intron_boundary", 1)
+                coding_start = feature.cdna_coding_start
+                coding_end = feature.cdna_coding_end
+                if coding_start and coding_end:
+                    min_vf, max_vf = min(vf.start, vf.end), max(vf.start, vf.end)
+                    if not overlap(min_vf, max_vf, coding_start, coding_end):
+                        _update_preds(tv.preds, tv.digest, "utr", 1)
+                    else:
+                        if min_vf < coding_start or max_vf > coding_end:
+                            _update_preds(tv.preds, tv.digest, "utr", 1)
+                        _update_preds(tv.preds, tv.digest, "coding", 1)
+        preds.update(tv.preds)
+        digest.extend(tv.digest)
+        if (
+            not (feature.cds or feature.three_prime_utr or feature.five_prime_utr)
+            and vf.exon
+        ):
+            _update_preds(preds, digest, "exon", 1)
+        alt_length = len("" if allele.seq == "-" else allele.seq)
+        _update_preds(preds, digest, "alt_length", alt_length)
+        if alt_length == preds["ref_length"]:
+            _update_preds(preds, digest, "snp", 1)
+        elif alt_length < preds["ref_length"]:
+            _update_preds(preds, digest, "deletion", 1)
+            _update_preds(preds, digest, "decrease_length", 1)
+        else:
+            _update_preds(preds, digest, "insertion", 1)
+            _update_preds(preds, digest, "increase_length", 1)
+        allele.preds = preds
+        allele.digest = "".join(digest)
+
+    def _oc_list(self, allele: Allele) -> List[OverlapConsequence]:
+        if (ocs := self._oc_lists.get(allele.digest)) is None:
+            ocs = [
+                oc
+                for oc in OVERLAP_CONSEQUENCES
+                if not any(
+                    (
+                        allele.preds.get(key, 0) != 0
+                        if value == 0
+                        else allele.preds.get(key) != value
+                    )
+                    for key, value in oc.include.items()
+                )
+            ]
+            self._oc_lists[allele.digest] = ocs
+        return ocs
+
+    def _overlap_consequences(self, allele: Allele) -> List[OverlapConsequence]:
+        self._pre_predicates(allele)
+        ocs = []
+        assigned_tier = None
+        for oc in self._oc_list(allele):
+            if assigned_tier and oc.tier > assigned_tier:
+                break
+            if oc.predicate(allele):
+                ocs.append(oc)
+                if oc.tier <= 2:
+                    assigned_tier = oc.tier
+        return ocs or [INTERGENIC_VARIANT]
+
+    def _vf_to_consequences(self, tv: TranscriptVariation) -> Tuple[str, int]:
+        ocs = sorted(
+            (oc for allele in tv.alleles for oc in self._overlap_consequences(allele)),
+            key=lambda oc: oc.rank,
+        )
+        if not ocs:
+            return "", NO_CONSEQUENCE_RANK
+        return ",".join(dict.fromkeys(oc.term for oc in ocs)), ocs[0].rank
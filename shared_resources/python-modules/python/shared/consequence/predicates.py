@@ -0,0 +1,718 @@
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .codons import reverse_complement, translate
+
+UPSTREAM_DISTANCE = 5000
+DOWNSTREAM_DISTANCE = 5000
+UNAMBIGUOUS_NUCLEOTIDES = re.compile("[ACGT-]+", re.IGNORECASE)
+STOP_CODONS = ("TGA", "TAA", "TAG")
+REF_MISMATCH_WARNING = "REF doesn't match GRCh38 reference at given position"
+CDS_NOT_FOUND_WARNING = "CDS is not found in gtf file"
+CODON_RANGE_WARNING = "Codon is out of CDS range."
+FRAME_WARNING = "Frame removes the variant position out of equation"
+
+
+def overlap(start1: int, end1: int, start2: int, end2: int) -> bool:
+    return end1 >= start2 and start1 <= end2
+
+
+def _substr(seq: str, offset: int, length: Optional[int] = None) -> str:
+    """seq[offset:offset + length] with the negative offsets and lengths of Perl's substr."""
+    size = len(seq)
+    start = offset + size if offset < 0 else offset
+    if start > size:
+        return ""
+    if length is None:
+        end = size
+    elif length < 0:
+        end = size + length
+    else:
+        end = start + length
+    start = max(start, 0)
+    return seq[start:end] if end > start else ""
+
+
+def _replace(seq: str, offset: int, length: int, replacement: str) -> str:
+    if offset > len(seq):
+        raise ValueError("substr outside of string")
+    return f"{seq[:offset]}{replacement}{seq[offset + length:]}"
+
+
+class VariationFeature:
+    """The variant as seen against one transcript."""
+
+    def __init__(
+        self,
+        start: int,
+        end: int,
+        allele_string: str,
+        strand: int,
+        seq_region_start: Optional[int] = None,
+        seq_region_end: Optional[int] = None,
+        exon: bool = False,
+        intron: Optional[int] = None,
+        reference_chr: Optional[str] = None,
+    ):
+        self.start = start
+        self.end = end
+        self.allele_string = allele_string
+        self.strand = strand
+        self.seq_region_start = seq_region_start
+        self.seq_region_end = seq_region_end
+        self.exon = exon
+        self.intron = intron
+        self.reference_chr = reference_chr
+        self.preds = None
+        self.digest = None
+
+
+class Feature:
+    """The transcript as seen by the predicates, which also record codons and warnings on it."""
+
+    def __init__(
+        self,
+        stable_id: Optional[str],
+        biotype: Optional[str],
+        start: int,
+        end: int,
+        strand: int,
+        position: int,
+        ref_allele: str,
+        alt_allele: str,
+    ):
+        self.stable_id = stable_id
+        self.biotype = biotype
+        self.start = start
+        self.end = end
+        self.strand = strand
+        self.position = position
+        self.ref_allele = ref_allele
+        self.alt_allele = alt_allele
+        self.cds = False
+        self.three_prime_utr = False
+        self.five_prime_utr = False
+        self.intron_boundary = None
+        self.splice_region_variant = None
+        self.splice_donor_variant = None
+        self.splice_acceptor_variant = None
+        self.cdna_coding_start = None
+        self.cdna_coding_end = None
+        self.cds_frame = None
+        self.seq = None
+        self.seq_length = None
+        self.exon_start = None
+        self.exon_end = None
+        self.within_mirna = None
+        self.warning = None
+        self.stop_ref = None
+        self.stop_alt = None
+        self.ref_codon = None
+        self.alt_codon = None
+        self.ref_aa = None
+        self.alt_aa = None
+        self.codons = None
+        self.aa = None
+
+
+class TranscriptVariation:
+    """A variation feature overlapping a feature, with one entry per alternate allele."""
+
+    def __init__(self, vf: VariationFeature, feature: Feature, references):
+        self.vf = vf
+        self.feature = feature
+        self.references = references
+        self.start_ref = ""
+        self.start_alt = ""
+        self.preds = None
+        self.digest = None
+        self._cdna_span = None
+        self._peptides = None
+        alleles = vf.allele_string.split("/")
+        while alleles and not alleles[-1]:
+            alleles.pop()
+        reference = alleles[0] if alleles else ""
+        self.alleles = [
+            Allele(self, allele)
+            for allele in dict.fromkeys(allele or "-" for allele in alleles)
+            if allele not in (reference or "-", "*", "<DEL:*>")
+        ]
+
+    def cdna_span(self) -> Tuple[int, int]:
+        """First and last cDNA coordinates of the variant's exon.
+
+        Like the Perl mapper, the genomic coordinates of any part outside
+        the coding region are reported as they are.
+        """
+        if self._cdna_span is None:
+            feature = self.feature
+            start, end = self.vf.seq_region_start, self.vf.seq_region_end
+            coding_start = feature.cdna_coding_start
+            coding_end = feature.cdna_coding_end
+            if end < coding_start or start > coding_end:
+                coords = [(start, end)]
+            else:
+                coords = []
+                if start < coding_start:
+                    coords.append((start, coding_start - 1))
+                    start = coding_start
+                if feature.strand == 1:
+                    coords.append(
+                        (
+                            start - coding_start + 1,
+                            (
+                                feature.seq_length
+                                if end > coding_end
+                                else end - coding_start + 1
+                            ),
+                        )
+                    )
+                else:
+                    coords.append(
+                        (
+                            (
+                                1
+                                if end > coding_end
+                                else feature.seq_length - (end - coding_start)
+                            ),
+                            feature.seq_length - (start - coding_start),
+                        )
+                    )
+                if coding_end < end:
+                    coords.append((coding_end + 1, end))
+                if feature.strand == -1:
+                    coords.reverse()
+            self._cdna_span = (coords[0][0], coords[-1][1])
+        return self._cdna_span
+
+    def adjacent_exon_bases(self, earlier: bool, count: int) -> str:
+        """Bases from the previous or next CDS exon, to complete a codon."""
+        feature = self.feature
+        chrom = self.vf.reference_chr
+        coords = []
+        index = None
+        for fields in self.references.splice_rows(chrom, feature.start, feature.end):
+            if (
+                fields[2] == "CDS"
+                and len(fields) > 7
+                and fields[7] == feature.stable_id
+            ):
+                cds = (int(fields[3]), int(fields[4]))
+                if cds == (feature.cdna_coding_start, feature.cdna_coding_end):
+                    index = len(coords)
+                coords.append(cds)
+        if index is None:
+            # The placeholder is wrong, but lets the variant be annotated
+            feature.warning = CDS_NOT_FOUND_WARNING
+            return "A" * count
+        if earlier:
+            previous_end = coords[index - 1][1]
+            return self.references.fasta(chrom, previous_end + 1 - count, previous_end)
+        next_start = coords[index + 1][0] if index + 1 < len(coords) else 0
+        return self.references.fasta(chrom, next_start, next_start - 1 + count)
+
+    def peptide_alleles(self) -> Tuple[Optional[str], Optional[str]]:
+        """Reference and alternate peptides of the CDS exon.
+
+        Codons, amino acids, the first codon and any warning are recorded
+        along the way. Every allele of the variant gets the same result, as
+        the transcript holds the whole alternate allele string.
+        """
+        if self._peptides is not None:
+            return self._peptides
+        feature = self.feature
+        ref_seq = feature.seq
+        ref_allele = feature.ref_allele
+        alt_allele = feature.alt_allele
+        frame = feature.cds_frame
+        var_loc = feature.position - feature.cdna_coding_start
+        var_loc_end = var_loc + len(ref_allele) - 1
+        seq_length = feature.seq_length
+        # Deletions running off either end of the CDS are cut to fit it
+        if var_loc_end >= seq_length:
+            length = len(ref_allele) - var_loc_end + seq_length - 1
+            ref_allele = _substr(ref_allele, 0, length)
+            alt_allele = _substr(alt_allele, 0, length)
+            var_loc_end = seq_length - 1
+        if var_loc < 0:
+            length = len(ref_allele) + var_loc
+            ref_allele = _substr(ref_allele, -length)
+            alt_allele = _substr(alt_allele, -length)
+            var_loc = 0
+        trailing_bases = (seq_length - frame) % 3
+        rev_var_loc = max(seq_length - var_loc_end - 1, 0)
+        pad_start = 0
+        pad_end = 0
+        reset_frame = False
+        if feature.strand == 1:
+            if var_loc < frame:
+                pad_start = 3 - frame
+                reset_frame = True
+            if rev_var_loc < trailing_bases:
+                pad_end = 3 - trailing_bases
+        else:
+            if var_loc < trailing_bases:
+                pad_start = 3 - trailing_bases
+            if rev_var_loc < frame:
+                pad_end = 3 - frame
+                reset_frame = True
+        if pad_start:
+            ref_seq = self.adjacent_exon_bases(True, pad_start) + ref_seq
+            var_loc += pad_start
+            var_loc_end += pad_start
+        if pad_end:
+            ref_seq += self.adjacent_exon_bases(False, pad_end)
+            rev_var_loc += pad_end
+        if reset_frame:
+            frame = 0
+        ref_seq = ref_seq.lower()
+        alt_seq = ref_seq
+        if ref_seq.upper() in STOP_CODONS:
+            feature.stop_ref = ref_seq
+            feature.stop_alt = _replace(ref_seq, var_loc, len(alt_allele), alt_allele)
+        reference = _substr(ref_seq, var_loc, len(ref_allele))
+        if ref_allele and ref_allele.casefold() in reference.casefold():
+            ref_seq = _replace(ref_seq, var_loc, len(ref_allele), ref_allele)
+            alt_seq = _replace(alt_seq, var_loc, len(ref_allele), alt_allele)
+        elif ref_allele == "-":
+            alt_seq = _replace(alt_seq, var_loc, 0, alt_allele)
+        else:
+            feature.warning = REF_MISMATCH_WARNING
+            ref_seq = _replace(ref_seq, var_loc, len(ref_allele), ref_allele)
+            alt_seq = _replace(alt_seq, var_loc, len(ref_allele), alt_allele)
+        if feature.strand == -1:
+            ref_seq = reverse_complement(ref_seq)
+            alt_seq = reverse_complement(alt_seq)
+            var_loc = rev_var_loc
+            var_loc_end = var_loc + len(ref_allele) - 1
+        codon_start = frame + 3 * int((var_loc - frame) / 3)
+        codon_end = frame + 2 + 3 * int((var_loc_end - frame - 2) / 3 + 0.9)
+        bases_to_trim = len(ref_seq) - codon_end - 1
+        ref_pep_allele = _substr(
+            ref_seq, codon_start, -bases_to_trim or len(ref_seq) - codon_start
+        )
+        alt_pep_allele = _substr(
+            alt_seq, codon_start, -bases_to_trim or len(alt_seq) - codon_start
+        )
+        if ref_pep_allele.upper() in STOP_CODONS and "-" in alt_pep_allele:
+            alt_pep_allele = ref_pep_allele
+        ref_seq = ref_seq.replace("-", "")
+        alt_seq = alt_seq.replace("-", "")
+        ref_pep_allele = ref_pep_allele.replace("-", "")
+        alt_pep_allele = alt_pep_allele.replace("-", "")
+        if len(ref_pep_allele) % 3:
+            feature.warning = CODON_RANGE_WARNING
+        ref_pep = translate(ref_seq, True, frame) if ref_seq else None
+        alt_pep = translate(alt_seq, True, frame) if alt_seq else None
+        self._peptides = (ref_pep, alt_pep)
+        if not ref_pep_allele and not alt_pep_allele:
+            feature.warning = FRAME_WARNING
+            self.start_ref = _substr(ref_seq, frame, 3)
+            self.start_alt = _substr(alt_seq, frame, 3)
+            return self._peptides
+        ref_aa = translate(ref_pep_allele, True)
+        alt_aa = translate(alt_pep_allele)
+        if len(alt_pep_allele) % 3:
+            alt_aa += "X"
+        feature.ref_codon = ref_pep_allele.upper()
+        feature.alt_codon = alt_pep_allele.upper()
+        feature.ref_aa = ref_aa
+        feature.alt_aa = alt_aa
+        feature.codons = f"{ref_pep_allele or '-'}/{alt_pep_allele or '-'}"
+        feature.aa = ref_aa if ref_aa == alt_aa else f"{ref_aa or '-'}/{alt_aa or '-'}"
+        self.start_ref = _substr(ref_seq, frame, 3).upper()
+        self.start_alt = _substr(alt_seq, frame, 3).upper()
+        return self._peptides
+
+
+class Allele:
+    """One alternate allele of a transcript variation."""
+
+    def __init__(self, tv: TranscriptVariation, seq: str):
+        self.tv = tv
+        self.seq = seq
+        self.cache = {}
+        self.preds = None
+        self.digest = None
+
+    @property
+    def vf(self) -> VariationFeature:
+        return self.tv.vf
+
+    @property
+    def feature(self) -> Feature:
+        return self.tv.feature
+
+
+def within_feature(allele: Allele) -> bool:
+    vf, feature = allele.vf, allele.feature
+    return overlap(vf.start, vf.end, feature.start, feature.end)
+
+
+def _before_start(vf: VariationFeature, feature: Feature, distance: int) -> bool:
+    return feature.start - distance <= vf.end < feature.start
+
+
+def _after_end(vf: VariationFeature, feature: Feature, distance: int) -> bool:
+    return feature.end < vf.start <= feature.end + distance
+
+
+def upstream(allele: Allele) -> bool:
+    vf, feature = allele.vf, allele.feature
+    if feature.strand == 1:
+        return _before_start(vf, feature, UPSTREAM_DISTANCE)
+    return _after_end(vf, feature, UPSTREAM_DISTANCE)
+
+
+def downstream(allele: Allele) -> bool:
+    vf, feature = allele.vf, allele.feature
+    if feature.strand == 1:
+        return _after_end(vf, feature, DOWNSTREAM_DISTANCE)
+    return _before_start(vf, feature, DOWNSTREAM_DISTANCE)
+
+
+def within_nmd_transcript(allele: Allele) -> bool:
+    return (
+        within_feature(allele) and allele.feature.biotype == "nonsense_mediated_decay"
+    )
+
+
+def within_mature_mirna(allele: Allele) -> bool:
+    feature = allele.feature
+    return (
+        feature.biotype == "miRNA"
+        and within_feature(allele)
+        and feature.within_mirna == 1
+    )
+
+
+def non_coding_exon_variant(allele: Allele) -> bool:
+    feature, vf = allele.feature, allele.vf
+    if within_mature_mirna(allele) or feature.exon_start is None:
+        return False
+    return overlap(vf.start, vf.end, feature.exon_start, feature.exon_end)
+
+
+def within_non_coding_gene(allele: Allele) -> bool:
+    return (
+        within_feature(allele)
+        and not within_mature_mirna(allele)
+        and not non_coding_exon_variant(allele)
+    )
+
+
+def donor_splice_site(allele: Allele) -> bool:
+    feature = allele.feature
+    return feature.intron_boundary == 1 and feature.splice_donor_variant == 1
+
+
+def acceptor_splice_site(allele: Allele) -> bool:
+    feature = allele.feature
+    return feature.intron_boundary == 1 and feature.splice_acceptor_variant == 1
+
+
+def splice_region(allele: Allele) -> bool:
+    feature = allele.feature
+    if donor_splice_site(allele) or acceptor_splice_site(allele):
+        return False
+    return feature.intron_boundary == 1 and feature.splice_region_variant == 1
+
+
+def within_intron(allele: Allele) -> bool:
+    return allele.vf.intron == 1
+
+
+def _changes_length(allele: Allele) -> bool:
+    return bool(
+        allele.preds.get("increase_length") or allele.preds.get("decrease_length")
+    )
+
+
+def _overlaps_start_codon(allele: Allele) -> bool:
+    cdna_start, cdna_end = allele.tv.cdna_span()
+    if not (cdna_start and cdna_end):
+        return False
+    coding_start = allele.feature.cdna_coding_start
+    return overlap(cdna_start, cdna_end, coding_start, coding_start + 2)
+
+
+def _overlaps_stop_codon(allele: Allele) -> bool:
+    cdna_start, cdna_end = allele.tv.cdna_span()
+    if not (cdna_start and cdna_end):
+        return False
+    coding_end = allele.feature.cdna_coding_end
+    return overlap(cdna_start, cdna_end, coding_end - 2, coding_end)
+
+
+def _ins_del_start_altered(allele: Allele) -> bool:
+    # An unchanged first codon is reported without being cached, so only
+    # the first call for each allele can see it; callers rely on this.
+    if "ins_del_start_altered" in allele.cache:
+        return allele.cache["ins_del_start_altered"]
+    allele.cache["ins_del_start_altered"] = False
+    allele.tv.peptide_alleles()
+    if not UNAMBIGUOUS_NUCLEOTIDES.fullmatch(allele.seq):
+        return False
+    if not _overlaps_start_codon(allele) or not _changes_length(allele):
+        return False
+    feature = allele.feature
+    if not (feature.cdna_coding_start and feature.cdna_coding_end):
+        return False
+    return allele.tv.start_ref == allele.tv.start_alt
+
+
+def _ins_del_stop_altered(allele: Allele) -> bool:
+    # The Perl engine has no UTR sequence to check the new stop codon
+    # against, and only reaches a verdict where it would fail on the edit
+    return False
+
+
+def start_lost(allele: Allele) -> bool:
+    tv = allele.tv
+    tv.peptide_alleles()
+    return tv.start_ref != tv.start_alt and tv.start_ref.upper() == "ATG"
+
+
+def start_retained_variant(allele: Allele) -> bool:
+    return (
+        _changes_length(allele)
+        and _overlaps_start_codon(allele)
+        and not _ins_del_start_altered(allele)
+    )
+
+
+def stop_retained(allele: Allele) -> bool:
+    if "stop_retained" not in allele.cache:
+        feature = allele.feature
+        ref_pep, alt_pep = allele.tv.peptide_alleles()
+        if alt_pep:
+            allele.cache["stop_retained"] = bool(
+                ref_pep
+                and (feature.ref_aa or "").startswith("*")
+                and (feature.alt_aa or "").startswith("*")
+            )
+        else:
+            allele.cache["stop_retained"] = (
+                _changes_length(allele)
+                and _overlaps_stop_codon(allele)
+                and not _ins_del_stop_altered(allele)
+            )
+    return allele.cache["stop_retained"]
+
+
+def stop_gained(allele: Allele) -> bool:
+    if "stop_gained" not in allele.cache:
+        ref_pep, alt_pep = allele.tv.peptide_alleles()
+        allele.cache["stop_gained"] = (
+            not stop_retained(allele)
+            and ref_pep is not None
+            and not allele.feature.stop_ref
+            and "*" in (alt_pep or "")
+            and "*" not in ref_pep
+        )
+    return allele.cache["stop_gained"]
+
+
+def stop_lost(allele: Allele) -> bool:
+    if stop_retained(allele):
+        return False
+    ref_pep, alt_pep = allele.tv.peptide_alleles()
+    if ref_pep is None or alt_pep is None:
+        return _ins_del_stop_altered(allele)
+    return "*" not in alt_pep and "*" in ref_pep
+
+
+def frameshift(allele: Allele) -> bool:
+    feature = allele.feature
+    allele.tv.peptide_alleles()
+    if feature.ref_codon is None or feature.alt_codon is None:
+        return False
+    return abs(len(feature.ref_codon) - len(feature.alt_codon)) % 3 != 0
+
+
+def _codon_alleles(allele: Allele) -> Optional[Tuple[str, str]]:
+    if frameshift(allele):
+        return None
+    feature = allele.feature
+    if feature.alt_codon is None or feature.ref_codon is None:
+        return None
+    return feature.ref_codon, feature.alt_codon
+
+
+def synonymous_variant(allele: Allele) -> bool:
+    ref_pep, alt_pep = allele.tv.peptide_alleles()
+    if not ref_pep:
+        return False
+    return (
+        alt_pep == ref_pep
+        and not stop_retained(allele)
+        and "X" not in alt_pep
+        and "X" not in ref_pep
+    )
+
+
+def missense_variant(allele: Allele) -> bool:
+    ref_pep, alt_pep = allele.tv.peptide_alleles()
+    if ref_pep is None:
+        return False
+    if start_lost(allele) or stop_lost(allele) or stop_gained(allele):
+        return False
+    return ref_pep != alt_pep and len(ref_pep) == len(alt_pep or "")
+
+
+def inframe_insertion(allele: Allele) -> bool:
+    codons = _codon_alleles(allele)
+    if start_lost(allele) or codons is None:
+        return False
+    ref_codon, alt_codon = codons
+    if len(alt_codon) <= len(ref_codon):
+        return False
+    ref_pep, alt_pep = allele.tv.peptide_alleles()
+    if ref_pep is None or alt_pep is None:
+        return False
+    # Not inframe if the inserted amino acids come before the start codon
+    if start_retained_variant(allele) and alt_pep.endswith(ref_pep):
+        return False
+    return (len(alt_codon) - len(ref_codon)) % 3 == 0
+
+
+def inframe_deletion(allele: Allele) -> bool:
+    codons = _codon_alleles(allele)
+    if codons is None:
+        return False
+    ref_codon, alt_codon = codons
+    if len(alt_codon) >= len(ref_codon):
+        return False
+    if (len(ref_codon) - len(alt_codon)) % 3:
+        return False
+    if ref_codon.startswith(alt_codon) or ref_codon.endswith(alt_codon):
+        return True
+    # Otherwise the deleted codons must lie wholly inside the reference
+    while ref_codon and alt_codon and ref_codon[0] == alt_codon[0]:
+        ref_codon = ref_codon[1:]
+        alt_codon = alt_codon[1:]
+    while ref_codon and alt_codon and ref_codon[-1] == alt_codon[-1]:
+        ref_codon = ref_codon[:-1]
+        alt_codon = alt_codon[:-1]
+    return not alt_codon and len(ref_codon) % 3 == 0
+
+
+def protein_altering_variant(allele: Allele) -> bool:
+    ref_pep, alt_pep = allele.tv.peptide_alleles()
+    if ref_pep is None or alt_pep is None:
+        return False
+    if len(alt_pep) == len(ref_pep):
+        return False
+    if ref_pep.startswith("*") or alt_pep.startswith("*"):
+        return False
+    return not (
+        inframe_insertion(allele)
+        or inframe_deletion(allele)
+        or start_lost(allele)
+        or frameshift(allele)
+    )
+
+
+class OverlapConsequence(NamedTuple):
+    term: str
+    rank: int
+    tier: int
+    include: Dict[str, int]
+    predicate: Callable[[Allele], bool]
+
+
+# Transcript consequences in evaluation order: by tier, then rank, then term.
+# Terms whose Perl predicates can never hold for these variants
+# (transcript_ablation, transcript_amplification, incomplete_terminal_codon_variant,
+# coding_sequence_variant and the UTR terms, which need both exon and utr)
+# are left out; UTR terms are added from the transcript model instead.
+OVERLAP_CONSEQUENCES: List[OverlapConsequence] = [
+    OverlapConsequence(
+        "mature_miRNA_variant",
+        17,
+        2,
+        {"nonsense_mediated_decay": 0, "protein_coding": 0, "within_feature": 1},
+        within_mature_mirna,
+    ),
+    OverlapConsequence(
+        "splice_acceptor_variant", 3, 3, {"intron_boundary": 1}, acceptor_splice_site
+    ),
+    OverlapConsequence(
+        "splice_donor_variant", 3, 3, {"intron_boundary": 1}, donor_splice_site
+    ),
+    OverlapConsequence("stop_gained", 4, 3, {"coding": 1}, stop_gained),
+    OverlapConsequence("frameshift_variant", 5, 3, {"coding": 1, "snp": 0}, frameshift),
+    OverlapConsequence("stop_lost", 6, 3, {"coding": 1}, stop_lost),
+    OverlapConsequence("start_lost", 7, 3, {"coding": 1}, start_lost),
+    OverlapConsequence(
+        "inframe_insertion", 10, 3, {"coding": 1, "insertion": 1}, inframe_insertion
+    ),
+    OverlapConsequence(
+        "inframe_deletion", 11, 3, {"coding": 1, "deletion": 1}, inframe_deletion
+    ),
+    OverlapConsequence(
+        "missense_variant",
+        12,
+        3,
+        {"coding": 1, "decrease_length": 0, "increase_length": 0},
+        missense_variant,
+    ),
+    OverlapConsequence(
+        "protein_altering_variant", 12, 3, {"coding": 1}, protein_altering_variant
+    ),
+    OverlapConsequence(
+        "splice_region_variant", 13, 3, {"intron_boundary": 1}, splice_region
+    ),
+    OverlapConsequence(
+        "start_retained_variant", 15, 3, {"coding": 1}, start_retained_variant
+    ),
+    OverlapConsequence("stop_retained_variant", 15, 3, {"coding": 1}, stop_retained),
+    OverlapConsequence("synonymous_variant", 15, 3, {"coding": 1}, synonymous_variant),
+    OverlapConsequence(
+        "non_coding_transcript_exon_variant",
+        20,
+        3,
+        {"exon": 1, "protein_coding": 0, "within_feature": 1},
+        non_coding_exon_variant,
+    ),
+    OverlapConsequence("intron_variant", 21, 3, {"intron": 1}, within_intron),
+    OverlapConsequence(
+        "NMD_transcript_variant",
+        22,
+        3,
+        {"nonsense_mediated_decay": 1, "within_feature": 1},
+        within_nmd_transcript,
+    ),
+    OverlapConsequence(
+        "non_coding_transcript_variant",
+        23,
+        3,
+        {"nonsense_mediated_decay": 0, "protein_coding": 0, "within_feature": 1},
+        within_non_coding_gene,
+    ),
+    OverlapConsequence("upstream_gene_variant", 24, 3, {"within_feature": 0}, upstream),
+    OverlapConsequence(
+        "downstream_gene_variant", 25, 3, {"within_feature": 0}, downstream
+    ),
+]
+INTERGENIC_VARIANT = OverlapConsequence("intergenic_variant", 38, 4, {}, None)
+# Keys of the include tables, which are all that count towards a predicate digest
+INCLUDE_KEYS = {
+    "coding",
+    "complete_overlap",
+    "decrease_length",
+    "deletion",
+    "exon",
+    "feature_class",
+    "increase_length",
+    "insertion",
+    "intron",
+    "intron_boundary",
+    "nonsense_mediated_decay",
+    "protein_coding",
+    "snp",
+    "sv",
+    "utr",
+    "vf_class",
+    "within_feature",
+}
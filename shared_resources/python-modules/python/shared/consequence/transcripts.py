@@ -0,0 +1,104 @@
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+
+def split_fields(text: str, separator: str) -> List[str]:
+    """text split on separator, dropping trailing empty fields like Perl's split."""
+    fields = text.split(separator)
+    while fields and not fields[-1]:
+        fields.pop()
+    return fields
+
+
+def parse_attributes(text: str) -> Dict[str, Optional[str]]:
+    """Key and value pairs of a GTF attribute column."""
+    attributes = {}
+    for attribute in split_fields(text, ";"):
+        words = attribute.split()
+        key = words[0] if words else ""
+        attributes[key] = words[1].replace('"', "") if len(words) > 1 else None
+    return attributes
+
+
+def _positional_value(attributes: List[str], index: int) -> str:
+    words = attributes[index].split() if index < len(attributes) else []
+    return words[1].replace('"', "") if len(words) > 1 else ""
+
+
+class Region(NamedTuple):
+    start: int
+    end: int
+
+
+class CodingRegion(NamedTuple):
+    start: int
+    end: int
+    frame: int
+
+
+class _FeatureLine(NamedTuple):
+    feature: str
+    start: int
+    end: int
+    frame: str
+    exon_number: str
+
+
+class TranscriptModel:
+    """A transcript from queryGTF with the parts of it that overlap the variant.
+
+    Features are read the way pluginConsequence reads them: matched on the
+    third attribute, with the last matching feature of each kind winning.
+    """
+
+    def __init__(self, line: str, features: Dict[str, List[_FeatureLine]]):
+        fields = line.split("\t")
+        self.source = fields[1]
+        self.feature = fields[2]
+        self.start = int(fields[3])
+        self.end = int(fields[4])
+        self.strand = 1 if fields[6].startswith("+") else -1
+        self.attributes = parse_attributes(fields[8])
+        self.exon: Optional[Region] = None
+        self.exon_number = ""
+        self.cds: Optional[CodingRegion] = None
+        self.start_stop = False
+        self.three_prime_utr = False
+        self.five_prime_utr = False
+        for feature in features.get(self.transcript_id or "", []):
+            if feature.feature == "exon":
+                self.exon = Region(feature.start, feature.end)
+                self.exon_number = feature.exon_number
+            elif feature.feature in ("CDS", "start_codon", "stop_codon"):
+                self.cds = CodingRegion(feature.start, feature.end, int(feature.frame))
+                self.start_stop |= feature.feature != "CDS"
+            elif feature.feature == "three_prime_utr":
+                self.three_prime_utr = True
+            elif feature.feature == "five_prime_utr":
+                self.five_prime_utr = True
+
+    @property
+    def transcript_id(self) -> Optional[str]:
+        return self.attributes.get("transcript_id")
+
+
+def transcript_models(data: List[str]) -> List[TranscriptModel]:
+    """The transcripts in queryGTF data lines, in order."""
+    transcripts = []
+    features = defaultdict(list)
+    for line in data:
+        fields = line.split("\t")
+        if len(fields) > 2 and fields[2] == "transcript":
+            transcripts.append(line)
+        elif len(fields) > 8:
+            attributes = fields[8].split(";")
+            features[_positional_value(attributes, 2)].append(
+                _FeatureLine(
+                    fields[2],
+                    int(fields[3]),
+                    int(fields[4]),
+                    fields[7],
+                    _positional_value(attributes, 4),
+                )
+            )
+    return [TranscriptModel(line, features) for line in transcripts]
@@ -6,3 +6,4 @@ from .jobs import (
     scan_pending_jobs,
     bulk_delete_jobs,
 )
+from .progress import start_job_progress, record_started, record_finished
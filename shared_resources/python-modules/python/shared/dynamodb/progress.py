@@ -0,0 +1,86 @@
+import json
+import os
+import time
+
+import boto3
+from botocore.exceptions import ClientError
+
+dynamodb_client = boto3.client("dynamodb")
+
+DYNAMO_SVEP_PROGRESS_TABLE = os.environ.get("DYNAMO_SVEP_PROGRESS_TABLE", "")
+# Progress is only needed while a job runs
+PROGRESS_TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+def _progress_key(request_id):
+    return {"request_id": {"S": request_id}}
+
+
+def start_job_progress(request_id, project):
+    kwargs = {
+        "TableName": DYNAMO_SVEP_PROGRESS_TABLE,
+        "Item": {
+            **_progress_key(request_id),
+            "project": {"S": project},
+            "started": {"N": "0"},
+            "finished": {"N": "0"},
+            "expires_at": {"N": str(int(time.time()) + PROGRESS_TTL_SECONDS)},
+        },
+    }
+    print(f"Calling dynamodb.put_item with kwargs: {json.dumps(kwargs)}")
+    dynamodb_client.put_item(**kwargs)
+
+
+def record_started(request_id, count=1):
+    dynamodb_client.update_item(
+        TableName=DYNAMO_SVEP_PROGRESS_TABLE,
+        Key=_progress_key(request_id),
+        UpdateExpression="ADD started :count",
+        ExpressionAttributeValues={":count": {"N": str(count)}},
+    )
+
+
+def record_finished(request_id, unused_starts=0):
+    """Counts a tracked function as finished.
+
+    Starts it recorded but never made are given back in the same update.
+    Returns the job's project if this was the last one to finish, which
+    only one caller per job ever sees, and None otherwise, including for
+    jobs whose progress was never started.
+    """
+    try:
+        progress = dynamodb_client.update_item(
+            TableName=DYNAMO_SVEP_PROGRESS_TABLE,
+            Key=_progress_key(request_id),
+            UpdateExpression="ADD finished :one, started :unused",
+            ConditionExpression="attribute_exists(request_id)",
+            ExpressionAttributeValues={
+                ":one": {"N": "1"},
+                ":unused": {"N": str(-unused_starts)},
+            },
+            ReturnValues="ALL_NEW",
+        )["Attributes"]
+    except ClientError as error:
+        if error.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            print(f"No progress recorded for {request_id}")
+            return None
+        raise
+    started = int(progress["started"]["N"])
+    finished = int(progress["finished"]["N"])
+    print(f"Finished {finished}/{started} tracked functions for {request_id}")
+    if finished < started:
+        return None
+    # Several finishers can see the counts level, but only one claims it
+    try:
+        dynamodb_client.update_item(
+            TableName=DYNAMO_SVEP_PROGRESS_TABLE,
+            Key=_progress_key(request_id),
+            UpdateExpression="SET completed_at = :now",
+            ConditionExpression="attribute_not_exists(completed_at) AND finished >= started",
+            ExpressionAttributeValues={":now": {"N": str(int(time.time()))}},
+        )
+    except ClientError as error:
+        if error.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return None
+        raise
+    return progress["project"]["S"]
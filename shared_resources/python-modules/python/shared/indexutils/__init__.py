@@ -1,2 +1,8 @@
+from .constraints import ConstraintTable, write_constraint_table
+from .fasta import FastaReader
+from .features import FeatureStore, write_feature_store
 from .index import create_index, filename_order
+from .lookup import VariantLookup, write_variant_lookup
 from .search import search_index_entry, get_index_page
+from .planner import RegionPlanner
+from .tabix import REGION_MERGE_GAP, TabixReader, get_merged_regions
@@ -0,0 +1,136 @@
+from array import array
+import json
+import math
+import mmap
+from typing import Dict
+
+from .lookup import FOOTER
+
+# Version 1 tables stored text values as NaN, so are no longer read
+CONSTRAINTS_MAGIC = b"SVEPCON2"
+
+
+def _parse_value(value: str):
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def write_constraint_table(constraints_tsv: str, output_file: str, columns: dict):
+    """Builds a columnar table of gene constraint metrics.
+
+    The TSV has gene, gene_id and transcript as its first three columns, and
+    columns maps output names to the index of a metric after those. Each
+    metric is stored as a float64 column, and values that aren't numbers,
+    such as "NA", are kept as text in the header, so they read back as they
+    appear in the TSV. A gene whose rows are split across the TSV keeps only
+    its last run of rows, as the JSON index read before this table did.
+    """
+    gene_rows = {}
+    last_gene = None
+    with open(constraints_tsv) as tsv_file:
+        # Skip the header
+        next(tsv_file)
+        for line in tsv_file:
+            line = line.strip()
+            if not line:
+                continue
+            gene, _, transcript, *values = line.split("\t")
+            if gene != last_gene:
+                gene_rows[gene] = []
+                last_gene = gene
+            gene_rows[gene].append(
+                (transcript, [_parse_value(values[i]) for i in columns.values()])
+            )
+    genes = {}
+    transcripts = bytearray()
+    transcript_ends = array("I")
+    column_values = [array("d") for _ in columns]
+    text_values = {name: {} for name in columns}
+    for gene, rows in gene_rows.items():
+        genes[gene] = [len(transcript_ends), len(transcript_ends) + len(rows)]
+        for transcript, values in rows:
+            row = len(transcript_ends)
+            transcripts += transcript.encode()
+            transcript_ends.append(len(transcripts))
+            for name, column, value in zip(columns, column_values, values):
+                if isinstance(value, str):
+                    text_values[name].setdefault(value, []).append(row)
+                    value = math.nan
+                column.append(value)
+    with open(output_file, "wb") as out_file:
+        out_file.write(CONSTRAINTS_MAGIC)
+        offsets = {}
+        for name, column in zip(columns, column_values):
+            offsets[name] = out_file.tell()
+            column.tofile(out_file)
+        offsets["transcript_ends"] = out_file.tell()
+        transcript_ends.tofile(out_file)
+        offsets["transcripts"] = out_file.tell()
+        out_file.write(transcripts)
+        # Keep later arrays aligned if the format grows
+        out_file.write(b"\0" * (-out_file.tell() % 8))
+        header = {
+            "columns": list(columns),
+            "rows": len(transcript_ends),
+            "offsets": offsets,
+            "genes": genes,
+            "text_values": text_values,
+        }
+        header_offset = out_file.tell()
+        out_file.write(json.dumps(header, separators=(",", ":")).encode())
+        out_file.write(FOOTER.pack(header_offset))
+    print(
+        f"Wrote {len(transcript_ends)} transcripts for {len(genes)} genes"
+        f" to {output_file}"
+    )
+
+
+class ConstraintTable:
+    """Memory-mapped gene constraint metrics, read by gene and transcript."""
+
+    def __init__(self, path: str):
+        self.file = open(path, "rb")
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self.mmap)
+        if self.buffer[: len(CONSTRAINTS_MAGIC)] != CONSTRAINTS_MAGIC:
+            self.buffer.release()
+            self.mmap.close()
+            self.file.close()
+            raise ValueError(f"{path} is not a constraint table")
+        (header_offset,) = FOOTER.unpack(self.buffer[-FOOTER.size :])
+        header = json.loads(bytes(self.buffer[header_offset : -FOOTER.size]))
+        self.genes = header["genes"]
+        rows = header["rows"]
+        offsets = header["offsets"]
+        self.columns = {
+            name: self.buffer[offsets[name] : offsets[name] + rows * 8].cast("d")
+            for name in header["columns"]
+        }
+        ends_offset = offsets["transcript_ends"]
+        self.transcript_ends = self.buffer[ends_offset : ends_offset + rows * 4].cast(
+            "I"
+        )
+        self.transcripts_offset = offsets["transcripts"]
+        self.text_values = {
+            name: {row: value for value, rows in values.items() for row in rows}
+            for name, values in header["text_values"].items()
+        }
+
+    def transcript(self, row: int) -> str:
+        start = self.transcript_ends[row - 1] if row else 0
+        end = self.transcript_ends[row]
+        offset = self.transcripts_offset
+        return bytes(self.buffer[offset + start : offset + end]).decode()
+
+    def get(self, gene: str) -> Dict[str, dict]:
+        """Metrics for each transcript of gene, as floats or their text."""
+        start, end = self.genes.get(gene, (0, 0))
+        constraints_data = {}
+        for row in range(start, end):
+            constraints_data[self.transcript(row)] = {
+                name: self.text_values[name].get(row, column[row])
+                for name, column in self.columns.items()
+            }
+        return constraints_data
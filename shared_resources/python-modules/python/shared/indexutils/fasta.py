@@ -0,0 +1,83 @@
+from bisect import bisect_right
+import os
+import struct
+from typing import Dict, List, NamedTuple
+
+from .tabix import BgzfFile, DEFAULT_CACHED_BLOCKS
+
+
+class FaiEntry(NamedTuple):
+    length: int
+    offset: int
+    line_bases: int
+    line_width: int
+
+
+def read_fai(path: str) -> Dict[str, FaiEntry]:
+    with open(path) as fai_file:
+        entries = {}
+        for line in fai_file:
+            name, length, offset, line_bases, line_width = line.split("\t")[:5]
+            entries[name] = FaiEntry(
+                int(length), int(offset), int(line_bases), int(line_width)
+            )
+    return entries
+
+
+def read_gzi(path: str) -> List[List[int]]:
+    """Compressed and uncompressed offsets of the blocks listed in a .gzi file."""
+    compressed = [0]
+    uncompressed = [0]
+    if os.path.exists(path):
+        with open(path, "rb") as gzi_file:
+            data = gzi_file.read()
+        (count,) = struct.unpack_from("<Q", data)
+        pairs = struct.unpack_from(f"<{2 * count}Q", data, 8)
+        compressed.extend(pairs[0::2])
+        uncompressed.extend(pairs[1::2])
+    return [compressed, uncompressed]
+
+
+class FastaReader:
+    """In-process equivalent of `samtools faidx file chrom:start-end` for bgzipped FASTA."""
+
+    def __init__(self, path: str, max_cached_blocks: int = DEFAULT_CACHED_BLOCKS):
+        self.sequences = read_fai(f"{path}.fai")
+        self.compressed, self.uncompressed = read_gzi(f"{path}.gzi")
+        self.bgzf = BgzfFile(path, max_cached_blocks)
+
+    def _byte(self, entry: FaiEntry, position: int) -> int:
+        return (
+            entry.offset
+            + (position - 1) // entry.line_bases * entry.line_width
+            + (position - 1) % entry.line_bases
+        )
+
+    def fetch(self, chrom: str, start: int, end: int) -> str:
+        """Bases from start to end, 1-based and inclusive, clamped to the sequence."""
+        entry = self.sequences.get(chrom)
+        if entry is None:
+            raise KeyError(f"Sequence {chrom} not found")
+        start = max(start, 1)
+        end = min(end, entry.length)
+        if start > end:
+            return ""
+        first_byte = self._byte(entry, start)
+        last_byte = self._byte(entry, end)
+        index = bisect_right(self.uncompressed, first_byte) - 1
+        block_start = self.uncompressed[index]
+        coffset = self.compressed[index]
+        # Blocks missing from the .gzi are found by reading on from the last one
+        chunks = []
+        length = 0
+        while block_start + length <= last_byte:
+            data, coffset = self.bgzf.read_block(coffset)
+            if not data:
+                break
+            chunks.append(data)
+            length += len(data)
+        text = b"".join(chunks)[first_byte - block_start : last_byte - block_start + 1]
+        return text.decode().replace("\n", "").replace("\r", "")
+
+    def close(self):
+        self.bgzf.close()
@@ -0,0 +1,206 @@
+from array import array
+import json
+import mmap
+import struct
+from typing import Dict, Iterable, List, Set
+
+from .tabix import BgzfFile
+
+FEATURES_MAGIC = b"SVEPFTR1"
+FOOTER = struct.Struct("<Q")
+# Per-feature columns, stored in this order for each chromosome
+COLUMNS = {
+    "starts": "I",
+    "ends": "I",
+    "max_ends": "I",
+    "genes": "I",
+    "voffsets": "Q",
+}
+GENE_NAME_KEY = 'gene_name "'
+# Chromosomes without features, such as contigs missing from the GTF
+EMPTY_SECTION = {"count": 0, "root_level": -1, "offsets": {}, "gene_names": []}
+
+
+def _gene_name(line: str) -> str:
+    start = line.find(GENE_NAME_KEY)
+    if start == -1:
+        return ""
+    start += len(GENE_NAME_KEY)
+    return line[start : line.find('"', start)]
+
+
+def _index_max_ends(starts: array, ends: array) -> (array, int):
+    """Builds the implicit interval tree used by cgranges.
+
+    Intervals must be sorted by start. Each node of the implicit tree stores
+    the largest end in its subtree, so a query only descends into subtrees
+    that can contain an overlap.
+    """
+    n = len(starts)
+    max_ends = array("I", ends)
+    if n == 0:
+        return max_ends, -1
+    last_i = 0
+    last = 0
+    for i in range(0, n, 2):
+        last_i = i
+        last = max_ends[i]
+    k = 1
+    while 1 << k <= n:
+        x = 1 << (k - 1)
+        for i in range((x << 1) - 1, n, x << 2):
+            right = max_ends[i + x] if i + x < n else last
+            max_ends[i] = max(ends[i], max_ends[i - x], right)
+        last_i = last_i - x if (last_i >> k) & 1 else last_i + x
+        if last_i < n and max_ends[last_i] > last:
+            last = max_ends[last_i]
+        k += 1
+    return max_ends, k - 1
+
+
+class _FeatureSection:
+    def __init__(self, chrom: str):
+        self.chrom = chrom
+        self.columns = {name: array(code) for name, code in COLUMNS.items()}
+        self.gene_names = {}
+
+    def add(self, start: int, end: int, gene_name: str, voffset: int):
+        columns = self.columns
+        # Stored 0-based, half-open
+        columns["starts"].append(start - 1)
+        columns["ends"].append(end)
+        columns["genes"].append(
+            self.gene_names.setdefault(gene_name, len(self.gene_names))
+        )
+        columns["voffsets"].append(voffset)
+
+    def write(self, out_file) -> Dict:
+        columns = self.columns
+        columns["max_ends"], root_level = _index_max_ends(
+            columns["starts"], columns["ends"]
+        )
+        offsets = {}
+        for name in COLUMNS:
+            offsets[name] = out_file.tell()
+            columns[name].tofile(out_file)
+            # Keep every column aligned for memoryview casts
+            out_file.write(b"\x00" * (-out_file.tell() % 8))
+        return {
+            "count": len(columns["starts"]),
+            "root_level": root_level,
+            "offsets": offsets,
+            "gene_names": list(self.gene_names),
+        }
+
+
+def write_feature_store(bgzipped_gtf: str, output_file: str):
+    """Builds a feature store for a sorted, bgzipped GTF.
+
+    Features are kept in file order and point back into the bgzipped GTF by
+    virtual offset, so the raw line can still be read through a BgzfFile.
+    """
+    sections = {}
+    bgzf = BgzfFile(bgzipped_gtf, max_cached_blocks=2)
+    with open(output_file, "wb") as out_file:
+        out_file.write(FEATURES_MAGIC)
+        section = None
+        voffset = 0
+        for line, next_voffset in bgzf.lines(0):
+            text = line.decode()
+            if text and not text.startswith("#"):
+                chrom, _, _, start, end, _ = text.split("\t", 5)
+                if section is None or section.chrom != chrom:
+                    if section is not None:
+                        sections[section.chrom] = section.write(out_file)
+                    section = _FeatureSection(chrom)
+                section.add(int(start), int(end), _gene_name(text), voffset)
+            voffset = next_voffset
+        if section is not None:
+            sections[section.chrom] = section.write(out_file)
+        header_offset = out_file.tell()
+        out_file.write(json.dumps(sections, separators=(",", ":")).encode())
+        out_file.write(FOOTER.pack(header_offset))
+    bgzf.close()
+    print(
+        f"Wrote {sum(s['count'] for s in sections.values())} features"
+        f" on {len(sections)} chromosomes to {output_file}"
+    )
+
+
+class ChromosomeFeatures:
+    def __init__(self, buffer: memoryview, section: Dict, bgzf: BgzfFile):
+        self.count = section["count"]
+        self.root_level = section["root_level"]
+        self.gene_names = section["gene_names"]
+        self.bgzf = bgzf
+        for name, code in COLUMNS.items():
+            if not self.count:
+                setattr(self, name, array(code))
+                continue
+            start = section["offsets"][name]
+            length = self.count * struct.calcsize(code)
+            setattr(self, name, buffer[start : start + length].cast(code))
+
+    def gene_ids(self, gene_names: Iterable[str]) -> Set[int]:
+        gene_names = set(gene_names)
+        return {i for i, name in enumerate(self.gene_names) if name in gene_names}
+
+    def overlapping(self, start: int, end: int) -> List[int]:
+        """Indices, in file order, of features overlapping 1-based start-end."""
+        query_beg = start - 1
+        starts = self.starts
+        ends = self.ends
+        max_ends = self.max_ends
+        n = self.count
+        found = []
+        if n == 0:
+            return found
+        stack = [(self.root_level, (1 << self.root_level) - 1, False)]
+        while stack:
+            level, x, left_done = stack.pop()
+            if level <= 3:
+                # Small subtree, scan it linearly
+                i = x >> level << level
+                i1 = min(i + (1 << (level + 1)) - 1, n)
+                while i < i1 and starts[i] < end:
+                    if query_beg < ends[i]:
+                        found.append(i)
+                    i += 1
+            elif not left_done:
+                y = x - (1 << (level - 1))
+                stack.append((level, x, True))
+                if y >= n or max_ends[y] > query_beg:
+                    stack.append((level - 1, y, False))
+            elif x < n and starts[x] < end:
+                if query_beg < ends[x]:
+                    found.append(x)
+                stack.append((level - 1, x + (1 << (level - 1)), False))
+        return found
+
+    def gene_name(self, i: int) -> str:
+        return self.gene_names[self.genes[i]]
+
+    def line(self, i: int) -> str:
+        return next(self.bgzf.lines(self.voffsets[i]))[0].decode()
+
+
+class FeatureStore:
+    """Memory-mapped lookup of GTF features by position."""
+
+    def __init__(self, path: str, bgzipped_gtf: str, bgzf: BgzfFile = None):
+        self.file = open(path, "rb")
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self.mmap)
+        if self.buffer[: len(FEATURES_MAGIC)] != FEATURES_MAGIC:
+            raise ValueError(f"{path} is not a feature store")
+        (header_offset,) = FOOTER.unpack(self.buffer[-FOOTER.size :])
+        self.sections = json.loads(bytes(self.buffer[header_offset : -FOOTER.size]))
+        self.bgzf = bgzf or BgzfFile(bgzipped_gtf)
+        self.chromosomes = {}
+
+    def chromosome(self, chrom: str) -> ChromosomeFeatures:
+        if chrom not in self.chromosomes:
+            self.chromosomes[chrom] = ChromosomeFeatures(
+                self.buffer, self.sections.get(chrom, EMPTY_SECTION), self.bgzf
+            )
+        return self.chromosomes[chrom]
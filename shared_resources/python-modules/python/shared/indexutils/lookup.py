@@ -0,0 +1,118 @@
+from array import array
+import bisect
+import hashlib
+import json
+import mmap
+import struct
+import sys
+from typing import List
+
+from .tabix import BgzfFile
+
+LOOKUP_MAGIC = b"SVEPVAR1"
+FOOTER = struct.Struct("<Q")
+
+
+def variant_key(chrom: str, pos: int, ref: str, alt: str) -> int:
+    digest = hashlib.blake2b(f"{chrom}\t{pos}\t{ref}\t{alt}".encode(), digest_size=8)
+    return int.from_bytes(digest.digest(), "little")
+
+
+def _write_section(out_file, entries) -> dict:
+    # Equal keys stay in file order
+    entries.sort()
+    offsets = {}
+    for name, column in (
+        ("keys", array("Q", (key for key, _ in entries))),
+        ("voffsets", array("Q", (voffset for _, voffset in entries))),
+    ):
+        offsets[name] = out_file.tell()
+        column.tofile(out_file)
+    return {"count": len(entries), "offsets": offsets}
+
+
+def write_variant_lookup(bgzipped_bed: str, output_file: str):
+    """Builds a hashed (chrom, pos, ref, alt) lookup for a sorted, bgzipped BED.
+
+    The BED must have chrom, start, end, ref and alt as its first five
+    columns. Each key points at the virtual offset of its record, so matches
+    are read back from the BED itself.
+    """
+    sections = {}
+    bgzf = BgzfFile(bgzipped_bed, max_cached_blocks=2)
+    with open(output_file, "wb") as out_file:
+        out_file.write(LOOKUP_MAGIC)
+        chrom = None
+        entries = []
+        voffset = 0
+        for line, next_voffset in bgzf.lines(0):
+            if line and not line.startswith(b"#"):
+                line_chrom, start, _, ref, alt, _ = line.decode().split("\t", 5)
+                if line_chrom != chrom:
+                    if chrom is not None:
+                        sections[chrom] = _write_section(out_file, entries)
+                    chrom = line_chrom
+                    entries = []
+                key = variant_key(chrom, int(start) + 1, ref, alt)
+                entries.append((key, voffset))
+            voffset = next_voffset
+        if chrom is not None:
+            sections[chrom] = _write_section(out_file, entries)
+        header_offset = out_file.tell()
+        out_file.write(json.dumps(sections, separators=(",", ":")).encode())
+        out_file.write(FOOTER.pack(header_offset))
+    bgzf.close()
+    print(
+        f"Wrote {sum(s['count'] for s in sections.values())} keys"
+        f" on {len(sections)} chromosomes to {output_file}"
+    )
+
+
+class VariantLookup:
+    """Memory-mapped lookup of BED records by chrom, 1-based pos, ref and alt."""
+
+    def __init__(self, path: str, bgzipped_bed: str, bgzf: BgzfFile = None):
+        self.file = open(path, "rb")
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self.mmap)
+        if self.buffer[: len(LOOKUP_MAGIC)] != LOOKUP_MAGIC:
+            raise ValueError(f"{path} is not a variant lookup")
+        (header_offset,) = FOOTER.unpack(self.buffer[-FOOTER.size :])
+        self.sections = json.loads(bytes(self.buffer[header_offset : -FOOTER.size]))
+        self.bgzf = bgzf or BgzfFile(bgzipped_bed)
+        self.columns = {}
+
+    def _columns(self, chrom: str):
+        if chrom not in self.columns:
+            section = self.sections.get(chrom)
+            if section is None:
+                self.columns[chrom] = ([], [])
+            else:
+                length = section["count"] * 8
+                self.columns[chrom] = tuple(
+                    self.buffer[offset : offset + length].cast("Q")
+                    for offset in (
+                        section["offsets"]["keys"],
+                        section["offsets"]["voffsets"],
+                    )
+                )
+        return self.columns[chrom]
+
+    def get(self, chrom: str, pos: int, ref: str, alt: str) -> List[str]:
+        """Matching BED lines, in file order."""
+        keys, voffsets = self._columns(chrom)
+        key = variant_key(chrom, pos, ref, alt)
+        lines = []
+        i = bisect.bisect_left(keys, key)
+        while i < len(keys) and keys[i] == key:
+            line = next(self.bgzf.lines(voffsets[i]))[0].decode()
+            _, start, _, line_ref, line_alt, _ = line.split("\t", 5)
+            # Guard against hash collisions
+            if int(start) + 1 == pos and line_ref == ref and line_alt == alt:
+                lines.append(line)
+            i += 1
+        return lines
+
+
+if __name__ == "__main__":
+    write_variant_lookup(*sys.argv[1:3])
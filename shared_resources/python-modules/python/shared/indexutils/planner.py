@@ -0,0 +1,87 @@
+import math
+import threading
+from typing import Iterable, List, Tuple
+
+from .tabix import get_merged_regions
+
+# Rough compressed size of a BGZF block, the smallest unit a query can read
+BGZF_BLOCK_BYTES = 20000
+DEFAULT_BYTES_PER_SECOND = 2000000
+DEFAULT_TARGET_QUERY_SECONDS = 20
+# Keeps command lines well within bcftools and ARG_MAX limits
+DEFAULT_MAX_REGIONS = 1000
+LATENCY_SMOOTHING = 0.3
+
+
+class RegionPlanner:
+    """Groups positions into region queries sized by estimated bytes read.
+
+    Positions close enough to share a BGZF block are merged into a covering
+    interval. Intervals are then packed into queries expected to take about
+    target_query_seconds, based on the throughput seen by earlier queries.
+    Planners are meant to live at module level so warm containers keep
+    their estimates.
+    """
+
+    def __init__(
+        self,
+        bytes_per_base: float,
+        bytes_per_second: float = DEFAULT_BYTES_PER_SECOND,
+        target_query_seconds: float = DEFAULT_TARGET_QUERY_SECONDS,
+        max_regions: int = DEFAULT_MAX_REGIONS,
+    ):
+        self.bytes_per_base = bytes_per_base
+        self.bytes_per_second = bytes_per_second
+        self.target_query_seconds = target_query_seconds
+        self.max_regions = max_regions
+        self.merge_gap = int(BGZF_BLOCK_BYTES / bytes_per_base)
+        self.queries_recorded = 0
+        self.lock = threading.Lock()
+
+    def estimate_bytes(self, intervals: Iterable[Tuple[int, int]]) -> int:
+        return sum(
+            max(BGZF_BLOCK_BYTES, (end - start + 1) * self.bytes_per_base)
+            for start, end in intervals
+        )
+
+    def plan(self, positions, min_queries: int = 1) -> List[List[Tuple[int, int]]]:
+        """Splits positions into queries, each a sorted list of (start, end)."""
+        intervals = [
+            (start, end) for start, end in get_merged_regions(positions, self.merge_gap)
+        ]
+        if not intervals:
+            return []
+        sizes = [self.estimate_bytes([interval]) for interval in intervals]
+        target_bytes = self.bytes_per_second * self.target_query_seconds
+        num_queries = max(
+            math.ceil(sum(sizes) / target_bytes),
+            math.ceil(len(intervals) / self.max_regions),
+            min(min_queries, len(intervals)),
+        )
+        # Spread the intervals evenly by size across the queries
+        query_bytes = sum(sizes) / num_queries
+        queries = [[]]
+        filled = 0
+        for interval, size in zip(intervals, sizes):
+            if queries[-1] and (
+                filled + size / 2 > query_bytes * len(queries)
+                or len(queries[-1]) >= self.max_regions
+            ):
+                queries.append([])
+            queries[-1].append(interval)
+            filled += size
+        print(
+            f"Planned {len(positions)} positions as {len(intervals)} intervals"
+            f" in {len(queries)} queries of ~{int(query_bytes)} bytes"
+            f" at {int(self.bytes_per_second)} bytes/s"
+        )
+        return queries
+
+    def record(self, intervals: Iterable[Tuple[int, int]], seconds: float):
+        """Updates the throughput estimate with a finished query."""
+        observed = self.estimate_bytes(intervals) / max(seconds, 0.001)
+        with self.lock:
+            self.bytes_per_second += LATENCY_SMOOTHING * (
+                observed - self.bytes_per_second
+            )
+            self.queries_recorded += 1
@@ -0,0 +1,294 @@
+from collections import OrderedDict
+import gzip
+import os
+import struct
+import zlib
+from typing import Iterator, List, Tuple
+
+BGZF_MAGIC = b"\x1f\x8b\x08\x04"
+BGZF_BLOCK_HEADER = struct.Struct("<4sI2BH")
+BGZF_SUBFIELD = struct.Struct("<2sH")
+TBI_MAGIC = b"TBI\x01"
+CSI_MAGIC = b"CSI\x01"
+# Tabix index geometry, CSI files store their own
+TBI_MIN_SHIFT = 14
+TBI_DEPTH = 5
+FORMAT_VCF = 2
+FLAG_UCSC = 0x10000
+DEFAULT_CACHED_BLOCKS = 512
+# Nearby variants are queried as a single region
+REGION_MERGE_GAP = 1000
+
+
+def get_merged_regions(positions, max_gap: int) -> List[List[int]]:
+    """Sorted [start, end] regions covering positions, joining any within max_gap."""
+    regions = []
+    for pos in sorted(set(positions)):
+        if regions and pos - regions[-1][1] <= max_gap:
+            regions[-1][1] = pos
+        else:
+            regions.append([pos, pos])
+    return regions
+
+
+class _IndexBuffer:
+    """Sequential reader over a decompressed index file."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def read(self, fmt: str):
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def read_bytes(self, length: int) -> bytes:
+        value = self.data[self.offset : self.offset + length]
+        self.offset += length
+        return value
+
+
+class TabixIndex:
+    def __init__(self, path: str):
+        with open(path, "rb") as index_file:
+            buffer = _IndexBuffer(gzip.decompress(index_file.read()))
+        magic = buffer.read_bytes(4)
+        if magic == TBI_MAGIC:
+            self.min_shift = TBI_MIN_SHIFT
+            self.depth = TBI_DEPTH
+            (n_ref,) = buffer.read("<i")
+            self._read_header(buffer)
+            self.references = [self._read_tbi_reference(buffer) for _ in range(n_ref)]
+        elif magic == CSI_MAGIC:
+            self.min_shift, self.depth, l_aux = buffer.read("<3i")
+            self._read_header(_IndexBuffer(buffer.read_bytes(l_aux)))
+            (n_ref,) = buffer.read("<i")
+            self.references = [self._read_csi_reference(buffer) for _ in range(n_ref)]
+        else:
+            raise ValueError(f"{path} is not a tabix or CSI index")
+        self.name_to_tid = {name: tid for tid, name in enumerate(self.names)}
+
+    def _read_header(self, buffer: _IndexBuffer):
+        (
+            self.format,
+            self.col_seq,
+            self.col_beg,
+            self.col_end,
+            meta,
+            self.skip,
+            l_nm,
+        ) = buffer.read("<7i")
+        self.meta = chr(meta)
+        self.names = [
+            name.decode() for name in buffer.read_bytes(l_nm).split(b"\x00") if name
+        ]
+
+    @staticmethod
+    def _read_chunks(buffer: _IndexBuffer) -> List[Tuple[int, int]]:
+        (n_chunk,) = buffer.read("<i")
+        chunks = buffer.read(f"<{2 * n_chunk}Q")
+        return list(zip(chunks[::2], chunks[1::2]))
+
+    def _read_tbi_reference(self, buffer: _IndexBuffer):
+        bins = {}
+        (n_bin,) = buffer.read("<i")
+        for _ in range(n_bin):
+            (bin_number,) = buffer.read("<I")
+            bins[bin_number] = (0, self._read_chunks(buffer))
+        (n_intv,) = buffer.read("<i")
+        return bins, buffer.read(f"<{n_intv}Q")
+
+    def _read_csi_reference(self, buffer: _IndexBuffer):
+        bins = {}
+        (n_bin,) = buffer.read("<i")
+        for _ in range(n_bin):
+            bin_number, loffset = buffer.read("<IQ")
+            bins[bin_number] = (loffset, self._read_chunks(buffer))
+        return bins, ()
+
+    def _reg2bins(self, beg: int, end: int) -> Iterator[int]:
+        shift = self.min_shift + self.depth * 3
+        end = min(end, 1 << shift) - 1
+        offset = 0
+        for level in range(self.depth + 1):
+            yield from range(offset + (beg >> shift), offset + (end >> shift) + 1)
+            shift -= 3
+            offset += 1 << (level * 3)
+
+    def _min_offset(self, bins, linear_index, beg: int) -> int:
+        if linear_index:
+            return linear_index[min(beg >> self.min_shift, len(linear_index) - 1)]
+        # CSI has no linear index, use the smallest existing bin containing beg
+        bin_number = ((1 << (self.depth * 3)) - 1) // 7 + (beg >> self.min_shift)
+        while bin_number and bin_number not in bins:
+            bin_number = (bin_number - 1) >> 3
+        return bins.get(bin_number, (0, []))[0]
+
+    def chunks(self, name: str, beg: int, end: int) -> List[Tuple[int, int]]:
+        """Merged virtual offset ranges that may hold records in [beg, end)."""
+        tid = self.name_to_tid.get(name)
+        if tid is None or beg >= end:
+            return []
+        bins, linear_index = self.references[tid]
+        min_offset = self._min_offset(bins, linear_index, beg)
+        chunks = sorted(
+            chunk
+            for bin_number in self._reg2bins(beg, end)
+            if bin_number in bins
+            for chunk in bins[bin_number][1]
+            if chunk[1] > min_offset
+        )
+        merged = []
+        for chunk_beg, chunk_end in chunks:
+            chunk_beg = max(chunk_beg, min_offset)
+            if merged and chunk_beg <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], chunk_end)
+            else:
+                merged.append([chunk_beg, chunk_end])
+        return [tuple(chunk) for chunk in merged]
+
+
+class BgzfFile:
+    """Random access to a BGZF file, keeping recently used blocks decompressed."""
+
+    def __init__(self, path: str, max_cached_blocks: int = DEFAULT_CACHED_BLOCKS):
+        self.file = open(path, "rb")
+        self.max_cached_blocks = max_cached_blocks
+        self.blocks = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def read_block(self, coffset: int) -> Tuple[bytes, int]:
+        """Returns the decompressed block at coffset and the offset of the next one."""
+        if (block := self.blocks.get(coffset)) is not None:
+            self.blocks.move_to_end(coffset)
+            self.hits += 1
+            return block
+        self.misses += 1
+        self.file.seek(coffset)
+        header = self.file.read(BGZF_BLOCK_HEADER.size)
+        if len(header) < BGZF_BLOCK_HEADER.size:
+            return b"", coffset
+        magic, _, _, _, xlen = BGZF_BLOCK_HEADER.unpack(header)
+        if magic != BGZF_MAGIC:
+            raise ValueError(f"Invalid BGZF block at offset {coffset}")
+        extra = self.file.read(xlen)
+        block_size = None
+        pos = 0
+        while pos < xlen:
+            subfield_id, subfield_length = BGZF_SUBFIELD.unpack_from(extra, pos)
+            if subfield_id == b"BC":
+                (block_size,) = struct.unpack_from("<H", extra, pos + 4)
+                block_size += 1
+            pos += BGZF_SUBFIELD.size + subfield_length
+        if block_size is None:
+            raise ValueError(f"Missing BGZF block size at offset {coffset}")
+        compressed = self.file.read(block_size - BGZF_BLOCK_HEADER.size - xlen - 8)
+        block = (zlib.decompress(compressed, -15), coffset + block_size)
+        self.blocks[coffset] = block
+        if len(self.blocks) > self.max_cached_blocks:
+            self.blocks.popitem(last=False)
+        return block
+
+    def lines(self, voffset: int) -> Iterator[Tuple[bytes, int]]:
+        """Yields each line from voffset along with the virtual offset after it."""
+        coffset, uoffset = voffset >> 16, voffset & 0xFFFF
+        data, next_coffset = self.read_block(coffset)
+        partial = b""
+        while data:
+            newline = data.find(b"\n", uoffset)
+            if newline == -1:
+                partial += data[uoffset:]
+                coffset = next_coffset
+                data, next_coffset = self.read_block(coffset)
+                uoffset = 0
+                continue
+            line = partial + data[uoffset:newline]
+            partial = b""
+            uoffset = newline + 1
+            if uoffset == len(data):
+                yield line, next_coffset << 16
+                coffset = next_coffset
+                data, next_coffset = self.read_block(coffset)
+                uoffset = 0
+            else:
+                yield line, (coffset << 16) | uoffset
+        if partial:
+            yield partial, coffset << 16
+
+    def close(self):
+        self.file.close()
+
+
+def _vcf_info_end(info: str):
+    # INFO/END, found as htslib finds it when indexing, or None
+    if info.startswith("END="):
+        value = info[4:]
+    elif (end_i := info.find(";END=")) != -1:
+        value = info[end_i + 5 :]
+    else:
+        return None
+    digits = value.split(";", 1)[0]
+    return int(digits) if digits.isdigit() else None
+
+
+class TabixReader:
+    """In-process equivalent of `tabix file chrom:start-end`.
+
+    Records span their begin and end columns, or for VCFs their REF allele,
+    or up to INFO/END where it lies past the record's position.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        index_path: str = None,
+        max_cached_blocks: int = DEFAULT_CACHED_BLOCKS,
+    ):
+        if index_path is None:
+            index_path = (
+                f"{path}.csi" if os.path.exists(f"{path}.csi") else f"{path}.tbi"
+            )
+        self.index = TabixIndex(index_path)
+        self.bgzf = BgzfFile(path, max_cached_blocks)
+        self.zero_based = bool(self.index.format & FLAG_UCSC)
+        self.is_vcf = (self.index.format & 0xFFFF) == FORMAT_VCF
+
+    def _interval(self, fields: List[str]) -> Tuple[int, int]:
+        beg = int(fields[self.index.col_beg - 1])
+        if not self.zero_based:
+            beg -= 1
+        if self.is_vcf:
+            end = beg + len(fields[3])
+            if len(fields) > 7 and (info_end := _vcf_info_end(fields[7])):
+                if info_end > beg:
+                    end = info_end
+        elif self.index.col_end:
+            end = int(fields[self.index.col_end - 1])
+        else:
+            end = beg + 1
+        return beg, max(end, beg + 1)
+
+    def fetch(self, chrom: str, start: int, end: int) -> Iterator[str]:
+        """Yields lines overlapping the 1-based, inclusive region chrom:start-end."""
+        beg = start - 1
+        meta = self.index.meta
+        col_seq = self.index.col_seq - 1
+        for chunk_beg, chunk_end in self.index.chunks(chrom, beg, end):
+            for line, voffset in self.bgzf.lines(chunk_beg):
+                text = line.decode()
+                if not text.startswith(meta):
+                    fields = text.split("\t")
+                    if fields[col_seq] != chrom:
+                        return
+                    rec_beg, rec_end = self._interval(fields)
+                    if rec_beg >= end:
+                        return
+                    if rec_end > beg:
+                        yield text
+                if voffset >= chunk_end:
+                    break
+
+    def close(self):
+        self.bgzf.close()
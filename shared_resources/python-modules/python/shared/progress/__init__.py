@@ -0,0 +1,6 @@
+from .tracker import (
+    ProgressTracker,
+    DynamoDbProgressTracker,
+    InMemoryProgressTracker,
+    progress_tracker,
+)
@@ -0,0 +1,85 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+
+from shared.dynamodb import record_finished, record_started, start_job_progress
+
+PROGRESS_TRACKER = os.environ.get("PROGRESS_TRACKER", "dynamodb")
+
+
+class ProgressTracker(ABC):
+    """Counts the tracked functions each job has started and finished.
+
+    Starts must be counted before the functions they cover are published,
+    and may be counted ahead in bulk, as long as the ones never used are
+    given back when the counting function finishes. finish returns the
+    job's project to exactly one caller, the one that leaves every counted
+    start finished.
+    """
+
+    @abstractmethod
+    def start_job(self, request_id: str, project: str):
+        pass
+
+    @abstractmethod
+    def add_started(self, request_id: str, count: int):
+        pass
+
+    @abstractmethod
+    def finish(self, request_id: str, unused_starts: int = 0):
+        pass
+
+
+class DynamoDbProgressTracker(ProgressTracker):
+    """Counters held in the progress table, shared by every function."""
+
+    def start_job(self, request_id, project):
+        start_job_progress(request_id, project)
+
+    def add_started(self, request_id, count):
+        record_started(request_id, count)
+
+    def finish(self, request_id, unused_starts=0):
+        return record_finished(request_id, unused_starts)
+
+
+class InMemoryProgressTracker(ProgressTracker):
+    """Counters local to the process, for tests and local runs."""
+
+    def __init__(self):
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def start_job(self, request_id, project):
+        with self.lock:
+            self.jobs[request_id] = {
+                "project": project,
+                "started": 0,
+                "finished": 0,
+                "completed": False,
+            }
+
+    def add_started(self, request_id, count):
+        with self.lock:
+            if request_id in self.jobs:
+                self.jobs[request_id]["started"] += count
+
+    def finish(self, request_id, unused_starts=0):
+        with self.lock:
+            job = self.jobs.get(request_id)
+            if job is None:
+                return None
+            job["started"] -= unused_starts
+            job["finished"] += 1
+            if job["completed"] or job["finished"] < job["started"]:
+                return None
+            job["completed"] = True
+            return job["project"]
+
+
+PROGRESS_TRACKERS = {
+    "dynamodb": DynamoDbProgressTracker,
+    "memory": InMemoryProgressTracker,
+}
+
+progress_tracker = PROGRESS_TRACKERS[PROGRESS_TRACKER]()
@@ -0,0 +1 @@
+from .cache import ReferenceCache, reference_cache
@@ -0,0 +1,76 @@
+from collections import OrderedDict
+import os
+from typing import Callable, Hashable, Iterable, Tuple
+
+REFERENCE_CACHE_BYTES = int(os.environ.get("REFERENCE_CACHE_MB", 400)) * 1024 * 1024
+
+
+class ReferenceCache:
+    """Reference artefacts loaded once per container and reused while warm.
+
+    Entries are keyed by name and version, so a job recorded against a new
+    reference version loads it afresh and drops the old one. Each entry is
+    sized by the files it holds in /tmp, which are served from the page
+    cache once read, and least recently used entries are dropped to keep
+    the total within max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = REFERENCE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(
+        self,
+        name: str,
+        version: Hashable,
+        load: Callable[[], Tuple[object, Iterable[str]]],
+    ):
+        """Returns the value for name at version, loading it if needed.
+
+        load returns the value and the paths of the files it keeps open,
+        which are deleted when the entry is evicted.
+        """
+        key = (name, version)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            print(f"Reference cache hit for {name} version {version} ({self.stats()})")
+            return self.entries[key][0]
+        self.misses += 1
+        # Files of other versions share paths with the one about to load
+        for old_key in [k for k in self.entries if k[0] == name]:
+            self._evict(old_key)
+        value, paths = load()
+        paths = list(paths)
+        size = sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+        self.entries[key] = (value, paths, size)
+        while len(self.entries) > 1 and self.size() > self.max_bytes:
+            self._evict(next(iter(self.entries)))
+        print(f"Reference cache loaded {name} version {version} ({self.stats()})")
+        return value
+
+    def size(self) -> int:
+        return sum(size for _, _, size in self.entries.values())
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes": self.size(),
+        }
+
+    def _evict(self, key):
+        _, paths, _ = self.entries.pop(key)
+        self.evictions += 1
+        print(f"Evicting {key[0]} version {key[1]} from the reference cache")
+        # Open memory maps stay valid until their objects are collected
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+reference_cache = ReferenceCache()
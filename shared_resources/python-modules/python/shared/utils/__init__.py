@@ -9,26 +9,30 @@ from .chrom_matching import (
 from .lambda_utils import (
     s3,
     CheckedProcess,
+    PROCESS_POOL_WIDTH,
+    run_processes,
     LoggingClient,
     Timer,
     orchestration,
     _truncate_string,
     generate_presigned_get_url,
     download_vcf,
-    _create_temp_file,
     clear_tmp,
     print_event,
     get_sns_event,
     sns_publish,
+    sns_publish_batch,
     truncated_print,
     handle_failed_execution,
     download_bedfile,
     download_to_tmp,
     s3_list_objects,
 )
+from .payload_utils import encode_payload, decode_payload
 from .reference_utils import (
     truncate_tmp,
     prepend_tmp,
+    gene_panel_prefix,
     fetch_remote_content,
     download_remote_content,
     query_references_table,
@@ -38,11 +42,24 @@ from .reference_utils import (
     execute_subprocess,
     _remove,
     _filter,
+    _filter_genes,
     _sort,
     _bgzip,
     _gzip_dc,
     _tabix_index,
 )
+from .gnomad_utils import (
+    CONSTRAINT_COLUMNS,
+    GNOMAD_CHROMOSOMES,
+    GNOMAD_COLUMNS,
+    GNOMAD_S3_PREFIX,
+    GNOMAD_S3_SUFFIX,
+    GNOMAD_SLIM_BASE,
+    GNOMAD_VERSION,
+    KGENOMES_COLUMNS,
+    KGENOMES_S3_PREFIX,
+)
+from .annotation_utils import AnnotationSource, annotate_from_sources
 from .cognito_utils import get_cognito_user_by_id
 from .auth import (
     InsufficientPermissionError,
@@ -0,0 +1,142 @@
+from collections import defaultdict
+
+from shared.indexutils import RegionPlanner
+from .lambda_utils import PROCESS_POOL_WIDTH, run_processes
+
+
+class AnnotationSource:
+    """A remote VCF whose INFO fields are copied onto matching rows.
+
+    location_template is formatted with the "chr" prefixed chromosome name.
+    columns maps output column names to bcftools query fields, and row_filter,
+    if given, decides which annotated rows are kept.
+    """
+
+    def __init__(
+        self,
+        name,
+        location_template,
+        columns,
+        bytes_per_base,
+        row_filter=None,
+    ):
+        self.name = name
+        self.location_template = location_template
+        self.columns = columns
+        self.row_filter = row_filter
+        # Kept for the life of the container so query sizing keeps adapting
+        self.planner = RegionPlanner(bytes_per_base=bytes_per_base)
+
+    def get_query_args(self, regions, ref_chrom):
+        chrom = f"chr{ref_chrom}"
+        fields = "\t".join("%" + val for val in self.columns.values())
+        return [
+            "bcftools",
+            "query",
+            "--regions",
+            ",".join(f"{chrom}:{start}-{end}" for start, end in regions),
+            "--format",
+            f"%POS\t%REF\t%ALT\t{fields}\n",
+            self.location_template.format(chrom=chrom),
+        ]
+
+
+def _group_by_position(sns_data):
+    regions_data = defaultdict(lambda: defaultdict(list))
+    for data in sns_data:
+        regions_data[data["posVcf"]][(data["refVcf"], data["altVcf"])].append(data)
+    return regions_data
+
+
+def _chunk_by_queries(regions_data, region_queries):
+    # Queries cover sorted, disjoint ranges of positions
+    positions = sorted(regions_data.keys())
+    chunked_data = []
+    pos_i = 0
+    for query_regions in region_queries:
+        chunk_data = {}
+        while pos_i < len(positions) and positions[pos_i] <= query_regions[-1][1]:
+            pos = positions[pos_i]
+            for (ref, alt), data_value in regions_data[pos].items():
+                chunk_data[(pos, ref, alt)] = data_value
+            pos_i += 1
+        chunked_data.append(chunk_data)
+    return chunked_data
+
+
+def _annotate_from_source(rows, ref_chrom, source, timer):
+    # Returns the ids of the rows whose queries did not finish
+    regions_data = _group_by_position(rows)
+    region_queries = source.planner.plan(
+        regions_data.keys(), min_queries=PROCESS_POOL_WIDTH
+    )
+    query_outputs = run_processes(
+        [
+            source.get_query_args(query_regions, ref_chrom)
+            for query_regions in region_queries
+        ],
+        timer,
+        error_message=f"bcftools error querying {source.name}",
+        on_complete=lambda i, seconds: source.planner.record(
+            region_queries[i], seconds
+        ),
+    )
+    unfinished_ids = set()
+    lines_updated = 0
+    column_names = list(source.columns.keys())
+    for query_i, chunk_data in enumerate(
+        _chunk_by_queries(regions_data, region_queries)
+    ):
+        if query_i not in query_outputs:
+            unfinished_ids.update(
+                id(data)
+                for variant_data in chunk_data.values()
+                for data in variant_data
+            )
+            continue
+        for line in query_outputs[query_i]:
+            line = line.strip()
+            if not line:
+                continue
+            pos_s, ref, alt, *query_data = line.split("\t")
+            pos = int(pos_s)
+            if (pos, ref, alt) not in chunk_data:
+                continue
+            for data in chunk_data[(pos, ref, alt)]:
+                data.update(zip(column_names, query_data))
+                lines_updated += 1
+    print(f"Updated {lines_updated} rows with {source.name} data")
+    return unfinished_ids
+
+
+def annotate_from_sources(sns_data, ref_chrom, sources, timer):
+    """Adds the columns of every source to the rows in sns_data.
+
+    Sources are queried in order, each only for the rows kept by the
+    row_filter of those before it, so rows a source filters out are never
+    queried in the sources after it. Returns the rows passing every source's
+    row_filter, and the rows whose queries did not all finish before the
+    timer ran out.
+    """
+    passed_records = sns_data
+    unfinished_ids = set()
+    for source in sources:
+        if not passed_records:
+            break
+        unfinished_ids |= _annotate_from_source(
+            passed_records, ref_chrom, source, timer
+        )
+        # Rows missing any source are sent again for all of them
+        completed_lines = [
+            data for data in passed_records if id(data) not in unfinished_ids
+        ]
+        passed_records = completed_lines
+        if source.row_filter is None:
+            continue
+        passed_records = [data for data in passed_records if source.row_filter(data)]
+        print(
+            f"Passed {len(passed_records)}/{len(completed_lines)} records"
+            f" after filtering on {source.name}"
+        )
+    remaining_data = [data for data in sns_data if id(data) in unfinished_ids]
+    return passed_records, remaining_data
@@ -0,0 +1,38 @@
+GNOMAD_VERSION = "4.1"
+GNOMAD_S3_PREFIX = f"https://gnomad-public-us-east-1.s3.amazonaws.com/release/{GNOMAD_VERSION}/vcf/genomes/gnomad.genomes.v{GNOMAD_VERSION}.sites."
+GNOMAD_S3_SUFFIX = ".vcf.bgz"
+# Copy in the reference bucket holding only the INFO fields we query
+GNOMAD_SLIM_BASE = f"gnomad.genomes.v{GNOMAD_VERSION}.sites.slim."
+GNOMAD_CHROMOSOMES = [f"chr{chrom}" for chrom in list(range(1, 23)) + ["X", "Y"]]
+# Just the columns after the identifying columns
+GNOMAD_COLUMNS = {
+    "afAfr": "INFO/AF_afr",
+    "afEas": "INFO/AF_eas",
+    "afFin": "INFO/AF_fin",
+    "afNfe": "INFO/AF_nfe",
+    "afSas": "INFO/AF_sas",
+    "afAmr": "INFO/AF_amr",
+    "af": "INFO/AF",
+    "ac": "INFO/AC",
+    "an": "INFO/AN",
+    "siftMax": "INFO/sift_max",
+}
+# HGDP + 1000 Genomes callset, queried alongside gnomAD
+KGENOMES_S3_PREFIX = "https://gnomad-public-us-east-1.s3.amazonaws.com/release/3.1.2/vcf/genomes/gnomad.genomes.v3.1.2.hgdp_tgp."
+KGENOMES_COLUMNS = {
+    "af1KG": "INFO/AF",
+    "afKhv": "INFO/AF_khv",
+    "ac1KG": "INFO/AC",
+    "an1KG": "INFO/AN",
+}
+# Indices of the constraint metrics after the gene, gene_id and transcript
+CONSTRAINT_COLUMNS = {
+    "misZ": 32,
+    "misOe": 27,
+    "misOeCiLower": 29,
+    "misOeCiUpper": 30,
+    "lofPli": 15,
+    "lofOe": 13,
+    "lofOeCiUpper": 19,
+    "lofOeCiLower": 18,
+}
@@ -1,10 +1,13 @@
-from collections import Counter
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from contextlib import contextmanager
 import os
 import shutil
 import json
 import math
 import subprocess
+import threading
+import time
 import traceback
 
 import boto3
@@ -12,11 +15,18 @@ from botocore.config import Config
 from botocore.exceptions import ClientError
 
 from shared.dynamodb import query_clinic_job, update_clinic_job
+from shared.progress import progress_tracker
+from .payload_utils import ENCODED_PAYLOAD_KEY, decode_payload, encode_payload
 
 # Optional environment variables
 SVEP_TEMP = os.environ.get("SVEP_TEMP")
 REGION = os.environ.get("REGION")
 NEXT_FUNCTION_SNS_TOPIC_ARN = os.environ.get("NEXT_FUNCTION_SNS_TOPIC_ARN")
+CONCAT_STARTER_SNS_TOPIC_ARN = os.environ.get("CONCAT_STARTER_SNS_TOPIC_ARN")
+PROCESS_POOL_WIDTH = int(os.environ.get("PROCESS_POOL_WIDTH", 4))
+PUBLISH_POOL_WIDTH = int(os.environ.get("PUBLISH_POOL_WIDTH", 4))
+# "json" sends messages as they are, "zlib" packs larger ones in an envelope
+PAYLOAD_ENCODING = os.environ.get("PAYLOAD_ENCODING", "json")
 
 # AWS clients and resources
 s3 = boto3.resource("s3")
@@ -30,14 +40,25 @@ s3_client = boto3.client(
 MAX_PRINT_LENGTH = 1024
 MAX_SNS_EVENT_PRINT_LENGTH = 2048
 MAX_SNS_MESSAGE_SIZE = 260000
+# PublishBatch limits, the size being the total of the batch's messages
+MAX_SNS_BATCH_ENTRIES = 10
+MAX_SNS_BATCH_SIZE = 262144
+MAX_SNS_BATCH_ATTEMPTS = 3
+# Messages shorter than this are left readable
+MIN_ENCODED_MESSAGE_SIZE = 4096
+PROCESS_POLL_SECONDS = 1
+# Tracked starts counted at a time, the unused ones given back on completion
+PROGRESS_RESERVATION_SIZE = 32
 S3_PAYLOAD_KEY = "_s3_payload_key"
 TEMP_FILE_FIELD = "tempFileName"
 REQUEST_ID_FIELD = "requestId"
 REF_CHROM_FIELD = "refChrom"
+REFERENCE_VERSIONS_FIELD = "referenceVersions"
 RESERVED_FIELDS = {
     TEMP_FILE_FIELD,
     REQUEST_ID_FIELD,
     REF_CHROM_FIELD,
+    REFERENCE_VERSIONS_FIELD,
 }
 
 
@@ -51,13 +72,19 @@ class Timer:
 
 
 class Orchestrator:
-    def __init__(self, event=None, request_id=None):
+    def __init__(self, event=None, request_id=None, reference_versions=None):
         self.function_calls = Counter()
+        self.reserved_starts = 0
         self.resent = False
+        # Messages waiting to be published, per topic, and batches being sent
+        self.outbox = defaultdict(list)
+        self.publishing = []
+        self.publisher = None
         if event is not None:
             self.message = get_sns_event(event)
             self.topic_arn = event["Records"][0]["Sns"]["TopicArn"]
             self.ref_chrom = self.message.get(REF_CHROM_FIELD)
+            self.reference_versions = self.message.get(REFERENCE_VERSIONS_FIELD, {})
             self.temp_file_name = self.message[TEMP_FILE_FIELD]
             if self.temp_file_name.startswith("_"):
                 self.track = False
@@ -70,6 +97,7 @@ class Orchestrator:
             self.message = None
             self.topic_arn = None
             self.ref_chrom = None
+            self.reference_versions = reference_versions or {}
             self.request_id = request_id
             self.temp_file_name = request_id
             self.track = False
@@ -127,22 +155,82 @@ class Orchestrator:
         message[REQUEST_ID_FIELD] = self.request_id
         if self.ref_chrom is not None:
             message[REF_CHROM_FIELD] = self.ref_chrom
+        if self.reference_versions:
+            message[REFERENCE_VERSIONS_FIELD] = self.reference_versions
         if track:
-            _create_temp_file(filename)
+            self._reserve_start()
         else:
             filename = f"_{filename}"
         message[TEMP_FILE_FIELD] = filename
-        sns_publish(topic_arn, message, max_length, filename)
+        message = _prepare_sns_message(
+            message, max_length, filename, encode=PAYLOAD_ENCODING == "zlib"
+        )
+        self._queue_message(topic_arn, message, max_length)
+
+    def _queue_message(self, topic_arn, message, max_length):
+        truncated_print(f"Queueing message for {topic_arn}: {message}", max_length)
+        if sum(map(len, self.outbox[topic_arn])) + len(message) > MAX_SNS_BATCH_SIZE:
+            self._send_batch(topic_arn)
+        batch = self.outbox[topic_arn]
+        batch.append(message)
+        if len(batch) == MAX_SNS_BATCH_ENTRIES:
+            self._send_batch(topic_arn)
+
+    def _send_batch(self, topic_arn):
+        if self.publisher is None:
+            self.publisher = ThreadPoolExecutor(max_workers=PUBLISH_POOL_WIDTH)
+        self.publishing.append(
+            self.publisher.submit(
+                sns_publish_batch, topic_arn, self.outbox.pop(topic_arn)
+            )
+        )
+
+    def flush(self):
+        """Publishes every queued message, waiting until all are sent."""
+        for topic_arn in list(self.outbox):
+            self._send_batch(topic_arn)
+        publishing, self.publishing = self.publishing, []
+        for future in publishing:
+            future.result()
+
+    def _close(self):
+        if self.publisher is not None:
+            self.publisher.shutdown(cancel_futures=True)
+            self.publisher = None
+
+    def _reserve_start(self):
+        # Counted before the function can start, so it can't be seen to
+        # finish first. Counting ahead in blocks saves a write per call, but
+        # only tracked functions finish, and so can give back what's unused.
+        if not self.reserved_starts:
+            count = PROGRESS_RESERVATION_SIZE if self.track else 1
+            progress_tracker.add_started(self.request_id, count)
+            self.reserved_starts = count
+        self.reserved_starts -= 1
 
     def _mark_completed(self):
-        if self.track:
-            print(f"Deleting file: {self.temp_file_name}")
-            s3.Object(SVEP_TEMP, self.temp_file_name).delete()
+        # Published before this function counts as finished, so a failure to
+        # publish fails the job rather than leaving it waiting
+        self.flush()
+        if not self.track:
+            return
+        print(f"Marking completed: {self.temp_file_name}")
+        project = progress_tracker.finish(self.request_id, self.reserved_starts)
+        self.reserved_starts = 0
+        if project is not None:
+            print("All tracked functions finished, starting concatenation")
+            self.start_function(
+                CONCAT_STARTER_SNS_TOPIC_ARN,
+                {
+                    "project": project,
+                },
+            )
+            self.flush()
 
 
 @contextmanager
-def orchestration(event=None, request_id=None):
-    orchestrator = Orchestrator(event, request_id)
+def orchestration(event=None, request_id=None, reference_versions=None):
+    orchestrator = Orchestrator(event, request_id, reference_versions)
     try:
         yield orchestrator
         orchestrator._mark_completed()
@@ -150,6 +238,8 @@ def orchestration(event=None, request_id=None):
     except Exception as e:
         handle_failed_execution(orchestrator.request_id, e)
         print("Completed unsuccessfully.")
+    finally:
+        orchestrator._close()
 
 
 class ProcessError(Exception):
@@ -190,6 +280,72 @@ class CheckedProcess:
             raise ProcessError(
                 self.error_message, stdout, stderr, returncode, self.process.args
             )
+        return stdout
+
+
+def run_processes(
+    args_list, timer, error_message=None, max_workers=None, on_complete=None
+):
+    """Runs each command with at most max_workers at a time.
+
+    Returns the stdout lines of each finished process, keyed by its index in
+    args_list. When the timer runs out, queued commands are dropped and
+    running processes killed, so their indices are missing from the result.
+    on_complete, if given, is called with the index and run time in seconds
+    of each process that succeeds.
+    """
+    cancelled = threading.Event()
+    running = {}
+    lock = threading.Lock()
+
+    def run(i, args):
+        with lock:
+            if cancelled.is_set():
+                return None
+            running[i] = CheckedProcess(args, error_message=error_message)
+            start_time = time.monotonic()
+        try:
+            # communicate() drains stdout and stderr so neither pipe fills
+            lines = running[i].check().splitlines()
+            if on_complete is not None:
+                on_complete(i, time.monotonic() - start_time)
+            return lines
+        except ProcessError:
+            if cancelled.is_set():
+                return None
+            raise
+        finally:
+            with lock:
+                running.pop(i)
+
+    def stop():
+        with lock:
+            cancelled.set()
+            for process in running.values():
+                process.process.kill()
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers or PROCESS_POOL_WIDTH) as executor:
+        futures = {executor.submit(run, i, args): i for i, args in enumerate(args_list)}
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(
+                    pending, timeout=PROCESS_POLL_SECONDS, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    if (lines := future.result()) is not None:
+                        results[futures[future]] = lines
+                if pending and timer.out_of_time():
+                    print(f"Out of time, stopping {len(pending)} unfinished processes")
+                    stop()
+                    for future in pending:
+                        future.cancel()
+                    break
+        except BaseException:
+            stop()
+            raise
+    return results
 
 
 def _get_function_name_from_arn(arn):
@@ -266,11 +422,6 @@ def download_bedfile(bucket, bedfile):
         download_to_tmp(bucket, f"{bedfile}.tbi", raise_on_notfound=True)
 
 
-def _create_temp_file(filename):
-    print(f"Creating file: {filename}")
-    s3.Object(SVEP_TEMP, filename).put(Body=b"")
-
-
 def clear_tmp():
     for file_name in os.listdir("/tmp"):
         file_path = f"/tmp/{file_name}"
@@ -292,13 +443,21 @@ def get_sns_event(event, max_length=MAX_SNS_EVENT_PRINT_LENGTH):
         payload = s3.Object(SVEP_TEMP, payload_key).get()
         message = json.loads(payload["Body"].read().decode())
         truncated_print(f"Payload from S3: {json.dumps(message)}", max_length)
+    if ENCODED_PAYLOAD_KEY in message:
+        message = decode_payload(message)
+        truncated_print(f"Decoded payload: {json.dumps(message)}", max_length)
     return message
 
 
-def sns_publish(
-    topic_arn, message, max_length=MAX_PRINT_LENGTH, s3_payload_prefix=None
+def _prepare_sns_message(
+    message, max_length=MAX_PRINT_LENGTH, s3_payload_prefix=None, encode=False
 ):
-    message = json.dumps(message, separators=(",", ":"))
+    serialised = json.dumps(message, separators=(",", ":"))
+    if encode and len(serialised) >= MIN_ENCODED_MESSAGE_SIZE:
+        message = json.dumps(encode_payload(message), separators=(",", ":"))
+        print(f"Encoded SNS message from {len(serialised)} to {len(message)} bytes")
+    else:
+        message = serialised
     if len(message) > MAX_SNS_MESSAGE_SIZE and s3_payload_prefix is not None:
         print(f"SNS message too large ({len(message)} bytes), uploading to S3")
         payload_key = f"payloads/{s3_payload_prefix}.json"
@@ -308,6 +467,13 @@ def sns_publish(
         )
         s3.Object(SVEP_TEMP, payload_key).put(Body=message.encode())
         message = json.dumps({S3_PAYLOAD_KEY: payload_key}, separators=(",", ":"))
+    return message
+
+
+def sns_publish(
+    topic_arn, message, max_length=MAX_PRINT_LENGTH, s3_payload_prefix=None
+):
+    message = _prepare_sns_message(message, max_length, s3_payload_prefix)
     kwargs = {
         "TopicArn": topic_arn,
         "Message": message,
@@ -316,6 +482,30 @@ def sns_publish(
     sns.publish(**kwargs)
 
 
+def sns_publish_batch(topic_arn, messages):
+    """Publishes already serialised messages with a single PublishBatch.
+
+    Entries that fail on the SNS side are sent again, up to
+    MAX_SNS_BATCH_ATTEMPTS times in all.
+    """
+    entries = [{"Id": str(i), "Message": message} for i, message in enumerate(messages)]
+    for attempt in range(1, MAX_SNS_BATCH_ATTEMPTS + 1):
+        print(f"Publishing batch of {len(entries)} messages to {topic_arn}")
+        response = sns.publish_batch(
+            TopicArn=topic_arn, PublishBatchRequestEntries=entries
+        )
+        failed = response.get("Failed", [])
+        if not failed:
+            return
+        if any(entry["SenderFault"] for entry in failed) or (
+            attempt == MAX_SNS_BATCH_ATTEMPTS
+        ):
+            raise RuntimeError(f"Failed to publish to {topic_arn}: {failed}")
+        retry_ids = {entry["Id"] for entry in failed}
+        entries = [entry for entry in entries if entry["Id"] in retry_ids]
+        time.sleep(0.1 * 2**attempt)
+
+
 def truncated_print(string, max_length=MAX_PRINT_LENGTH):
     if max_length is not None:
         string = _truncate_string(string, max_length)
@@ -0,0 +1,91 @@
+import base64
+import json
+import zlib
+
+ENCODED_PAYLOAD_KEY = "_encoded_payload"
+# Packed forms, which no message of the pipeline uses as keys of its own
+TABLE_KEY = "_t"
+ROWS_KEY = "_r"
+STRING_KEY = "_s"
+# Shorter strings cost about as much as a reference to them
+MIN_SHARED_STRING_LENGTH = 24
+COMPRESSION_LEVEL = 6
+
+
+class _Packer:
+    def __init__(self):
+        self.strings = []
+        self.string_ids = {}
+
+    def pack(self, value):
+        if isinstance(value, str):
+            if len(value) < MIN_SHARED_STRING_LENGTH:
+                return value
+            if (string_id := self.string_ids.get(value)) is None:
+                string_id = self.string_ids[value] = len(self.strings)
+                self.strings.append(value)
+            return {STRING_KEY: string_id}
+        if isinstance(value, list):
+            if (table := self._pack_table(value)) is not None:
+                return table
+            return [self.pack(item) for item in value]
+        if isinstance(value, dict):
+            if {TABLE_KEY, STRING_KEY} & value.keys():
+                raise ValueError(
+                    f"Cannot pack a message using the keys {TABLE_KEY} or {STRING_KEY}"
+                )
+            return {key: self.pack(item) for key, item in value.items()}
+        return value
+
+    def _pack_table(self, rows):
+        # Lists of records sharing their keys are sent as a column list and
+        # rows of values, so each key is sent once
+        if not rows or not isinstance(rows[0], dict):
+            return None
+        keys = list(rows[0])
+        if not all(isinstance(row, dict) and list(row) == keys for row in rows):
+            return None
+        return {
+            TABLE_KEY: keys,
+            ROWS_KEY: [[self.pack(row[key]) for key in keys] for row in rows],
+        }
+
+
+def _unpack(value, strings):
+    if isinstance(value, list):
+        return [_unpack(item, strings) for item in value]
+    if isinstance(value, dict):
+        if STRING_KEY in value:
+            return strings[value[STRING_KEY]]
+        if TABLE_KEY in value:
+            keys = value[TABLE_KEY]
+            return [
+                dict(zip(keys, (_unpack(item, strings) for item in row)))
+                for row in value[ROWS_KEY]
+            ]
+        return {key: _unpack(item, strings) for key, item in value.items()}
+    return value
+
+
+def encode_payload(message):
+    """Returns message as a compressed, base64 encoded JSON envelope.
+
+    Lists of records become tables with their keys listed once, and long
+    strings, such as the GTF lines repeated across records, are sent once
+    and referred to by index, before the whole is compressed with zlib.
+    """
+    packer = _Packer()
+    value = packer.pack(message)
+    packed = json.dumps(
+        {"strings": packer.strings, "value": value}, separators=(",", ":")
+    )
+    compressed = zlib.compress(packed.encode(), COMPRESSION_LEVEL)
+    return {ENCODED_PAYLOAD_KEY: base64.b64encode(compressed).decode()}
+
+
+def decode_payload(message):
+    """Returns the original message of an envelope, or message unchanged."""
+    if (encoded := message.get(ENCODED_PAYLOAD_KEY)) is None:
+        return message
+    packed = json.loads(zlib.decompress(base64.b64decode(encoded)))
+    return _unpack(packed["value"], packed["strings"])
@@ -1,3 +1,4 @@
+import hashlib
 import os
 import json
 import math
@@ -23,6 +24,15 @@ def prepend_tmp(filename):
     return f"/tmp/{truncate_tmp(filename)}"
 
 
+def gene_panel_prefix(genes):
+    """Prefix for reference files restricted to a gene panel, empty if no panel."""
+    genes = sorted(set(genes) - {""})
+    if not genes:
+        return ""
+    digest = hashlib.sha256(",".join(genes).encode()).hexdigest()[:16]
+    return f"panel_{digest}_"
+
+
 def download_remote_content(url, filename):
     # Open the URL and fetch the headers to get content length
     with urllib.request.urlopen(url) as response:
@@ -144,6 +154,15 @@ def _filter(input_file, output_file, keyword):
     execute_subprocess(command)
 
 
+def _filter_genes(input_file, output_file, genes):
+    print(f"Filtering {input_file} to {len(genes)} genes")
+    with open(input_file) as in_file, open(output_file, "w") as out_file:
+        for line in in_file:
+            start = line.find('gene_name "') + 11
+            if start > 10 and line[start : line.find('"', start)] in genes:
+                out_file.write(line)
+
+
 def _sort(input_file, output_file):
     command = f"sort -k1,1d -k4,4n -k5,5n -S{MAX_MEMORY-512}M --compress-program=gzip {input_file} > {output_file}"
     execute_subprocess(command)
@@ -45,7 +45,11 @@ resource "aws_sns_topic_subscription" "pluginConsequence" {
   topic_arn = aws_sns_topic.pluginConsequence.arn
   protocol  = "lambda"
   # TODO: Reference.lambda_function_arn once the module source is updated
-  endpoint = module.lambda-pluginConsequence.lambda_function_arn
+  endpoint = (
+    var.consequence_engine == "python"
+    ? module.lambda-pluginConsequencePython.lambda_function_arn
+    : module.lambda-pluginConsequence.lambda_function_arn
+  )
 }
 
 resource "aws_sns_topic" "pluginClinvar" {
@@ -68,16 +72,6 @@ resource "aws_sns_topic_subscription" "pluginGnomad" {
   endpoint  = module.lambda-pluginGnomad.lambda_function_arn
 }
 
-resource "aws_sns_topic" "pluginGnomadOneKG" {
-  name = "svep-backend-pluginGnomadOneKG"
-}
-
-resource "aws_sns_topic_subscription" "pluginGnomadOneKG" {
-  topic_arn = aws_sns_topic.pluginGnomadOneKG.arn
-  protocol  = "lambda"
-  endpoint  = module.lambda-pluginGnomadOneKG.lambda_function_arn
-}
-
 resource "aws_sns_topic" "pluginGnomadConstraint" {
   name = "svep-backend-pluginGnomadConstraint"
 }
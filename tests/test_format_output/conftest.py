@@ -38,4 +38,15 @@ def resources_dict():
             },
         )
 
+        dynamodb_client = boto3.client("dynamodb")
+        dynamodb_client.create_table(
+            TableName=os.environ["DYNAMO_SVEP_PROGRESS_TABLE"],
+            KeySchema=[{"AttributeName": "request_id", "KeyType": "HASH"}],
+            AttributeDefinitions=[
+                {"AttributeName": "request_id", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        boto3.client("sns").create_topic(Name="svep-backend-concatStarter")
+
         yield setup_resources()
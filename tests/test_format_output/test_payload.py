@@ -0,0 +1,73 @@
+import json
+from unittest.mock import patch
+
+GTF_LINES = [
+    f'chr1\tensembl\texon\t{start}\t{start + 99}\t.\t+\t.\tgene_id "ENSG{start:011d}";'
+    for start in range(1000, 6000, 500)
+]
+
+
+def sample_message():
+    return {
+        "snsData": [
+            {
+                "chrom": "chr1",
+                "posVcf": pos,
+                "refVcf": "A",
+                "altVcf": "T",
+                "qual": ".",
+                "data": GTF_LINES[pos % 3 : pos % 3 + 4],
+                "rank": None,
+                "pass": pos % 2 == 0,
+                "af": 0.25,
+            }
+            for pos in range(200)
+        ],
+        "requestId": "d9b8f6b3-payload-test",
+        "nested": [{"a": 1}, {"b": "x" * 30}, [], "y" * 30],
+    }
+
+
+def test_payload_round_trip():
+    from shared.utils import decode_payload, encode_payload
+
+    message = sample_message()
+    encoded = encode_payload(message)
+
+    assert decode_payload(encoded) == message, "Expected the original message."
+    assert (
+        len(json.dumps(encoded)) < len(json.dumps(message)) / 10
+    ), "Expected the envelope to be much smaller than the message."
+    assert (
+        decode_payload(message) is message
+    ), "Expected plain messages to be left as they are."
+
+
+def test_encoded_messages_read_by_get_sns_event():
+    from shared.progress import InMemoryProgressTracker
+    from shared.utils import lambda_utils
+    from test_progress import CLINVAR_TOPIC_ARN, RecordingSns
+
+    sns = RecordingSns()
+    message = sample_message()
+    del message["requestId"]
+    with patch.object(
+        lambda_utils, "progress_tracker", InMemoryProgressTracker()
+    ), patch.object(lambda_utils, "sns", sns), patch.object(
+        lambda_utils, "PAYLOAD_ENCODING", "zlib"
+    ):
+        with lambda_utils.orchestration(request_id="d9b8f6b3") as orc:
+            orc.start_function(CLINVAR_TOPIC_ARN, message, track=True)
+            orc.start_function(CLINVAR_TOPIC_ARN, {"small": True}, track=True)
+
+    [(_, [encoded, small])] = sns.batches
+    assert set(encoded) == {
+        lambda_utils.ENCODED_PAYLOAD_KEY
+    }, "Expected the large message to be sent in an envelope."
+    assert small["small"], "Expected the small message to be sent as it is."
+    event = {"Records": [{"Sns": {"Message": json.dumps(encoded)}}]}
+    decoded = lambda_utils.get_sns_event(event)
+    assert decoded == message | {
+        "requestId": "d9b8f6b3",
+        "tempFileName": "d9b8f6b3_0_svep-backend-pluginClinvar",
+    }, "Expected get_sns_event to give back the message that was sent."
@@ -0,0 +1,116 @@
+import json
+from unittest.mock import patch
+
+CLINVAR_TOPIC_ARN = "arn:aws:sns:ap-southeast-2:123456789012:svep-backend-pluginClinvar"
+
+
+def test_last_finisher_claims_completion(resources_dict):
+    from shared.dynamodb import record_finished, record_started, start_job_progress
+
+    request_id = "a6e5c3e0-progress-test"
+    start_job_progress(request_id, "test-project")
+    record_started(request_id)
+    record_started(request_id)
+
+    assert (
+        record_finished(request_id) is None
+    ), "Expected the job to still be pending with one function running."
+    assert (
+        record_finished(request_id) == "test-project"
+    ), "Expected the last finisher to be given the project."
+    record_started(request_id)
+    assert (
+        record_finished(request_id) is None
+    ), "Expected completion to be claimed only once."
+
+
+def sns_event(message, topic="svep-backend-pluginClinvar"):
+    return {
+        "Records": [
+            {
+                "Sns": {
+                    "TopicArn": f"arn:aws:sns:ap-southeast-2:123456789012:{topic}",
+                    "Message": json.dumps(message),
+                }
+            }
+        ]
+    }
+
+
+class RecordingSns:
+    def __init__(self):
+        self.batches = []
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+        self.batches.append(
+            (TopicArn, [json.loads(e["Message"]) for e in PublishBatchRequestEntries])
+        )
+        return {"Successful": PublishBatchRequestEntries, "Failed": []}
+
+    def take_messages(self):
+        messages = [
+            (topic_arn, message)
+            for topic_arn, batch in self.batches
+            for message in batch
+        ]
+        self.batches.clear()
+        return messages
+
+
+def test_reserved_starts_given_back():
+    from shared.progress import InMemoryProgressTracker
+    from shared.utils import lambda_utils
+
+    tracker = InMemoryProgressTracker()
+    sns = RecordingSns()
+    request_id = "b7f6d4f1-progress-test"
+    tracker.start_job(request_id, "test-project")
+    with patch.object(lambda_utils, "progress_tracker", tracker), patch.object(
+        lambda_utils, "sns", sns
+    ):
+        with lambda_utils.orchestration(request_id=request_id) as orc:
+            orc.start_function(CLINVAR_TOPIC_ARN, {}, track=True)
+        [(_, message)] = sns.take_messages()
+        with lambda_utils.orchestration(sns_event(message)) as orc:
+            for i in range(3):
+                orc.start_function(CLINVAR_TOPIC_ARN, {}, suffix=i, track=True)
+        assert (
+            tracker.jobs[request_id]["started"] == 4
+        ), "Expected unused reserved starts to be given back."
+        for _, message in sns.take_messages():
+            with lambda_utils.orchestration(sns_event(message)):
+                pass
+
+    published = sns.take_messages()
+    assert [topic_arn for topic_arn, _ in published] == [
+        lambda_utils.CONCAT_STARTER_SNS_TOPIC_ARN
+    ], "Expected only the last finisher to start concatenation."
+    assert published[0][1]["project"] == "test-project"
+
+
+def test_messages_published_in_batches():
+    from shared.progress import InMemoryProgressTracker
+    from shared.utils import lambda_utils
+
+    sns = RecordingSns()
+    request_id = "c8a7e5a2-progress-test"
+    with patch.object(
+        lambda_utils, "progress_tracker", InMemoryProgressTracker()
+    ), patch.object(lambda_utils, "sns", sns):
+        with lambda_utils.orchestration(request_id=request_id) as orc:
+            for i in range(25):
+                orc.start_function(CLINVAR_TOPIC_ARN, {"index": i}, track=True)
+
+    assert sorted(len(batch) for _, batch in sns.batches) == [
+        5,
+        10,
+        10,
+    ], "Expected messages to be sent ten at a time."
+    names = {
+        message["index"]: message["tempFileName"]
+        for _, batch in sns.batches
+        for message in batch
+    }
+    assert names == {
+        i: f"{request_id}_{i}_svep-backend-pluginClinvar" for i in range(25)
+    }, "Expected temp file names to follow the order of the calls."
@@ -12,6 +12,8 @@ keys = {
     "COLUMNS": "rank,region,alt,consequence,varName,geneName,geneId,feature,transcriptId,transcriptBiotype,exonNumber,aminoAcids,codons,strand,transcriptSupportLevel,ref,gt,qual,filter,variationId,rsId,omimId,classification,conditions,clinSig,reviewStatus,lastEvaluated,accession,pubmed,afAfr,afEas,afFin,afNfe,afSas,afAmr,af,ac,an,siftMax,af1KG,afKhv,misZ,misOe,misOeCiLower,misOeCiUpper,lofPli,lofOe,lofOeCiUpper,lofOeCiLower",
     "SVEP_REGIONS": "svep-backend-regions-20250530000050131700000001",
     "AWS_LAMBDA_FUNCTION_NAME": "svep-backend-formatOutput",
+    "DYNAMO_SVEP_PROGRESS_TABLE": "svep-backend-progress",
+    "CONCAT_STARTER_SNS_TOPIC_ARN": "arn:aws:sns:ap-southeast-2:123456789012:svep-backend-concatStarter",
 }
 
 # Set environment variables for testing
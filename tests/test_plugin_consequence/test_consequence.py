@@ -0,0 +1,101 @@
+import json
+import os
+
+
+def load_fixture(resources_dict, file_name):
+    with open(os.path.join(resources_dict["data_dir"], file_name)) as fixture:
+        return json.load(fixture)
+
+
+def normalise(records):
+    # VEP.pm joins the terms of a record in hash order
+    return [
+        dict(record, consequence=sorted(record["consequence"].split(",")))
+        for record in records
+    ]
+
+
+def test_matches_perl_vep(resources_dict):
+    import lambda_function
+
+    variants = load_fixture(resources_dict, "variants.json")
+    expected = [
+        record
+        for records in load_fixture(resources_dict, "expected_vep.json")
+        for record in records
+    ]
+
+    result = lambda_function.add_consequences(variants, "1", {})
+
+    assert normalise(result) == normalise(
+        expected
+    ), "Expected the records VEP.pm gives for the same variants."
+
+
+def test_terms_ordered_by_rank(resources_dict):
+    import lambda_function
+    from shared.consequence.predicates import OVERLAP_CONSEQUENCES
+
+    ranks = {oc.term: oc.rank for oc in OVERLAP_CONSEQUENCES}
+    variants = load_fixture(resources_dict, "variants.json")
+
+    result = lambda_function.add_consequences(variants, "1", {})
+
+    for record in result:
+        terms = [
+            term
+            for term in record["consequence"].split(",")
+            if not term.endswith("UTR_variant")
+        ]
+        assert [ranks.get(term, 99) for term in terms] == sorted(
+            ranks.get(term, 99) for term in terms
+        ), f"Expected {record['consequence']} to be ordered by rank."
+
+
+def test_filter_consequence_rank(resources_dict):
+    import lambda_function
+    from shared.consequence import ConsequenceEngine
+
+    variants = load_fixture(resources_dict, "variants.json")
+    unfiltered = lambda_function.get_engine("1", {})
+    engine = ConsequenceEngine(
+        unfiltered.fasta_reader, unfiltered.splice, unfiltered.mirna, filter_rank=12
+    )
+
+    result = [
+        record for variant in variants for record in engine.annotate(variant, "1")
+    ]
+
+    expected = [
+        record
+        for records in load_fixture(resources_dict, "expected_vep.json")
+        for record in records
+        if record["rank"] <= 12
+    ]
+    assert result, "Expected some records with rank of at most 12."
+    assert normalise(result) == normalise(
+        expected
+    ), "Expected only the records of rank 12 or less."
+    assert engine.processed_records == sum(
+        len(records) for records in load_fixture(resources_dict, "expected_vep.json")
+    ), "Expected filtered records to be counted as processed."
+
+
+def test_features_sent_by_index(resources_dict):
+    import lambda_function
+
+    variants = load_fixture(resources_dict, "variants.json")
+    features = list(dict.fromkeys(line for v in variants for line in v["data"]))
+    feature_ids = {line: i for i, line in enumerate(features)}
+    indexed = [
+        dict(variant, data=[feature_ids[line] for line in variant["data"]])
+        for variant in variants
+    ]
+
+    result = lambda_function.add_consequences(
+        lambda_function.resolve_features(indexed, features), "1", {}
+    )
+
+    assert normalise(result) == normalise(
+        lambda_function.add_consequences(variants, "1", {})
+    ), "Expected the same records as with the GTF lines sent in full."
@@ -0,0 +1,18 @@
+import os
+
+keys = {
+    # aws
+    "AWS_DEFAULT_REGION": "ap-southeast-2",
+    # svep
+    "SVEP_TEMP": "svep-backend-temp-20250530000050167100000004",
+    "REFERENCE_LOCATION": "svep-backend-references-20250530000050147500000002",
+    "AWS_LAMBDA_FUNCTION_NAME": "svep-backend-pluginConsequencePython",
+    "SPLICE_REFERENCE": "sorted_splice.gtf.bgz",
+    "MIRNA_REFERENCE": "sorted_filtered_mirna.gff3.bgz",
+    "FASTA_REFERENCE_BASE": "Homo_sapiens.GRCh38.dna.chromosome",
+    "FILTER_CONSEQUENCE_RANK": "99",
+}
+
+# Set environment variables for testing
+for key, value in keys.items():
+    os.environ[key] = value
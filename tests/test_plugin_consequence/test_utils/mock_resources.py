@@ -0,0 +1,32 @@
+import os
+
+import boto3
+from moto import mock_aws
+
+from .env import keys  # to inject keys into the environment
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"
+)
+
+
+@mock_aws
+def setup_resources():
+    s3_client = boto3.client("s3", region_name=os.environ["AWS_DEFAULT_REGION"])
+
+    # The references pluginConsequence reads, cut down to a synthetic chromosome
+    for file_name in os.listdir(DATA_DIR):
+        if file_name.endswith(".json"):
+            continue
+        s3_client.upload_file(
+            os.path.join(DATA_DIR, file_name), keys["REFERENCE_LOCATION"], file_name
+        )
+
+    return {
+        "references_bucket": keys["REFERENCE_LOCATION"],
+        "data_dir": DATA_DIR,
+    }
+
+
+if __name__ == "__main__":
+    setup_resources()
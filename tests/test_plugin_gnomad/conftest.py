@@ -9,7 +9,7 @@ from test_utils.mock_resources import setup_resources
 
 sys.path.append(
     os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "../../lambda/pluginGnomadOneKG")
+        os.path.join(os.path.dirname(__file__), "../../lambda/pluginGnomad")
     )
 )
 sys.path.append(
@@ -37,11 +37,5 @@ def resources_dict():
                 "LocationConstraint": os.environ["AWS_DEFAULT_REGION"],
             },
         )
-        s3_client.create_bucket(
-            Bucket=os.environ["SVEP_REGIONS"],
-            CreateBucketConfiguration={
-                "LocationConstraint": os.environ["AWS_DEFAULT_REGION"],
-            },
-        )
 
         yield setup_resources()
@@ -0,0 +1,106 @@
+def test_gnomad_slim_store(resources_dict):
+    import lambda_function
+
+    assert lambda_function.GNOMAD_LOCATION_PREFIX.endswith(
+        "data/gnomad.genomes.v4.1.sites.slim."
+    ), "Expected the local slim gnomAD store to be used."
+
+    sns_data = [
+        {"posVcf": 43044295, "refVcf": "T", "altVcf": "G"},
+        {"posVcf": 43045711, "refVcf": "A", "altVcf": "G"},
+        {"posVcf": 43045800, "refVcf": "C", "altVcf": "T"},
+    ]
+    ref_chrom = "17"
+    timer = type("DummyTimer", (), {"out_of_time": lambda self: False})()
+
+    result = lambda_function.add_gnomad_columns(
+        sns_data, ref_chrom, timer, sources=[lambda_function.GNOMAD_SOURCE]
+    )
+
+    assert result == (
+        [
+            {
+                "posVcf": 43044295,
+                "refVcf": "T",
+                "altVcf": "G",
+                "afAfr": "0",
+                "afEas": "0",
+                "afFin": "0",
+                "afNfe": "4.41e-05",
+                "afSas": "0",
+                "afAmr": "0",
+                "af": "1.97368e-05",
+                "ac": "3",
+                "an": "152000",
+                "siftMax": "0.11",
+            },
+            {"posVcf": 43045800, "refVcf": "C", "altVcf": "T"},
+        ],
+        [],
+    ), "Expected result does not match the actual result."
+
+
+def test_1kg_source(resources_dict):
+    import lambda_function
+
+    sns_data = [{"posVcf": 80113242, "refVcf": "G", "altVcf": "A"}]
+    ref_chrom = "17"
+    timer = type("DummyTimer", (), {"out_of_time": lambda self: False})()
+
+    result = lambda_function.add_gnomad_columns(
+        sns_data, ref_chrom, timer, sources=[lambda_function.KGENOMES_SOURCE]
+    )
+
+    assert result == (
+        [
+            {
+                "ac1KG": "562",
+                "posVcf": 80113242,
+                "refVcf": "G",
+                "altVcf": "A",
+                "an1KG": "6760",
+                "af1KG": "0.0831361",
+                "afKhv": "0.232673",
+            }
+        ],
+        [],
+    ), "Expected result does not match the actual result."
+
+
+def test_1kg_queried_after_maf_filter(resources_dict):
+    from unittest.mock import patch
+
+    import lambda_function
+    from shared.utils import annotation_utils
+
+    sns_data = [
+        {"posVcf": 43044295, "refVcf": "T", "altVcf": "G"},
+        {"posVcf": 43045711, "refVcf": "A", "altVcf": "G"},
+    ]
+    gnomad_af = {"43044295": "0.9", "43045711": "0.001"}
+    queried_regions = []
+
+    def run_processes(args_list, timer, **kwargs):
+        outputs = {}
+        for i, args in enumerate(args_list):
+            regions = args[args.index("--regions") + 1]
+            if args[-1].startswith(lambda_function.KGENOMES_S3_PREFIX):
+                queried_regions.append(regions)
+                outputs[i] = []
+                continue
+            pos = regions.split(":")[1].split("-")[0]
+            values = ["0"] * 6 + [gnomad_af[pos], "1", "2", "0.1"]
+            outputs[i] = [
+                "\t".join([pos, "T" if pos == "43044295" else "A", "G", *values])
+            ]
+        return outputs
+
+    timer = type("DummyTimer", (), {"out_of_time": lambda self: False})()
+    with patch.object(annotation_utils, "run_processes", run_processes):
+        passed, remaining = lambda_function.add_gnomad_columns(sns_data, "17", timer)
+
+    assert [data["posVcf"] for data in passed] == [43045711]
+    assert remaining == []
+    assert queried_regions == [
+        "chr17:43045711-43045711"
+    ], "Expected 1000 Genomes to be queried only for rows passing the MAF filter."
@@ -0,0 +1,20 @@
+import os
+
+keys = {
+    # aws
+    "AWS_DEFAULT_REGION": "ap-southeast-2",
+    # svep
+    "SVEP_TEMP": "svep-backend-temp-20250530000050167100000004",
+    "SVEP_REGIONS": "svep-backend-regions-20250530000050131700000001",
+    "DYNAMO_SVEP_REFERENCES_TABLE": "svep-references",
+    "AWS_LAMBDA_FUNCTION_NAME": "svep-backend-pluginGnomad",
+    "FILTER_MAX_MAF": "0.5",
+    # Serve the slim gnomAD store from the local fixture
+    "GNOMAD_SLIM_LOCATION": os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data/"
+    ),
+}
+
+# Set environment variables for testing
+for key, value in keys.items():
+    os.environ[key] = value
@@ -0,0 +1,33 @@
+import os
+
+import boto3
+from moto import mock_aws
+
+from .env import keys  # to inject keys into the environment
+
+
+@mock_aws
+def setup_resources():
+    dynamodb_client = boto3.client(
+        "dynamodb", region_name=os.environ["AWS_DEFAULT_REGION"]
+    )
+
+    # Mark the slim gnomAD store as built
+    dynamodb_client.create_table(
+        TableName=keys["DYNAMO_SVEP_REFERENCES_TABLE"],
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    dynamodb_client.put_item(
+        TableName=keys["DYNAMO_SVEP_REFERENCES_TABLE"],
+        Item={"id": {"S": "gnomad_slim_version"}, "version": {"S": "4.1"}},
+    )
+
+    return {
+        "references_table": keys["DYNAMO_SVEP_REFERENCES_TABLE"],
+    }
+
+
+if __name__ == "__main__":
+    setup_resources()
@@ -0,0 +1,27 @@
+import os
+import sys
+
+keys = {
+    "AWS_DEFAULT_REGION": "ap-southeast-2",
+    "AWS_LAMBDA_FUNCTION_NAME": "svep-backend-pluginGnomadConstraint",
+    "REFERENCE_LOCATION": "svep-backend-references",
+    "CONSTRAINT_REFERENCE": "gnomad_constraint_metrics.tsv",
+}
+
+# Set environment variables for testing
+for key, value in keys.items():
+    os.environ[key] = value
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "../../lambda/pluginGnomadConstraint")
+    )
+)
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            "../../shared_resources/python-modules/python",
+        )
+    )
+)
@@ -0,0 +1,77 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+COLUMNS = {"misZ": 2, "lofPli": 0, "lofOe": 1}
+
+# BRCA1's rows are split by TP53's, and some values aren't numbers
+CONSTRAINTS_TSV = """gene\tgene_id\ttranscript\tlof.pLI\tlof.oe\tmis.z_score
+BRCA1\tENSG00000012048\tENST00000357654\t1.2e-05\t0.35\t2.1
+BRCA1\tENSG00000012048\tENST00000471181\tNA\t0.4\tNaN
+TP53\tENSG00000141510\tENST00000269305\t0.99\tNA\tNaN
+TP53\tENSG00000141510\tENST00000413465\t0.5\t.\t-1.5
+BRCA1\tENSG00000012048\tENST00000493795\t0.01\tnot_computed\t0.7
+
+GENE1\tENSG00000000001\tENST00000000001\tinf\t1\t0
+"""
+
+
+def write_json_index(constraints_tsv, index_path):
+    # As updateReferenceFiles builds the index read before the table
+    pos = 0
+    last_gene = None
+    index = {}
+    with open(constraints_tsv) as constraints_file:
+        while line := constraints_file.readline():
+            gene = line.split("\t")[0]
+            if gene != last_gene:
+                index[gene] = pos
+                last_gene = gene
+            pos = constraints_file.tell()
+    with open(index_path, "w") as index_file:
+        json.dump(index, index_file)
+
+
+def test_table_matches_tsv_lookup(tmp_path):
+    from shared.indexutils import ConstraintTable, write_constraint_table
+    import lambda_function
+
+    tsv_path = tmp_path / "constraints.tsv"
+    tsv_path.write_text(CONSTRAINTS_TSV)
+    index_path = tmp_path / "constraints.tsv.idx"
+    write_json_index(tsv_path, index_path)
+    table_path = tmp_path / "constraints.tsv.table"
+    write_constraint_table(str(tsv_path), str(table_path), COLUMNS)
+
+    table = ConstraintTable(str(table_path))
+    with open(index_path) as index_file:
+        index = json.load(index_file)
+    genes = ["BRCA1", "TP53", "GENE1", "MISSING"]
+    with patch.object(lambda_function, "CONSTRAINT_COLUMNS", COLUMNS), open(
+        tsv_path
+    ) as constraint_file:
+        expected = {
+            gene: lambda_function.get_query_process(gene, index, constraint_file)
+            for gene in genes
+        }
+    actual = {gene: table.get(gene) for gene in genes}
+
+    # NaN only compares equal to itself through its JSON form
+    assert json.dumps(actual) == json.dumps(
+        expected
+    ), "Expected the table to give the same constraints as the TSV."
+    assert actual["BRCA1"] == {
+        "ENST00000493795": {"misZ": 0.7, "lofPli": 0.01, "lofOe": "not_computed"}
+    }, "Expected only the last run of a gene's rows to be used."
+    assert actual["TP53"]["ENST00000269305"]["lofOe"] == "NA"
+    assert actual["TP53"]["ENST00000413465"]["lofOe"] == "."
+
+
+def test_first_version_table_rejected(tmp_path):
+    from shared.indexutils import ConstraintTable
+
+    table_path = tmp_path / "constraints.tsv.table"
+    table_path.write_bytes(b"SVEPCON1" + bytes(16))
+    with pytest.raises(ValueError):
+        ConstraintTable(str(table_path))
@@ -0,0 +1,11 @@
+import os
+import sys
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            "../../shared_resources/python-modules/python",
+        )
+    )
+)
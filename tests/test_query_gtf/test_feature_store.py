@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from test_utils.bgzf import write_bgzf
+
+
+def random_features(rng, count):
+    # Mostly short features with some long ones, as genes span many exons
+    features = []
+    for _ in range(count):
+        start = rng.randint(1, 5_000_000)
+        length = rng.choice([rng.randint(1, 500), rng.randint(1, 2_000_000)])
+        features.append((start, start + length))
+    return sorted(features)
+
+
+@pytest.fixture(scope="module")
+def feature_store(tmp_path_factory):
+    from shared.indexutils import FeatureStore
+    from shared.indexutils.features import write_feature_store
+
+    rng = random.Random(3)
+    # Neither count is a power of two, so the implicit trees have tails
+    features = {"1": random_features(rng, 6007), "2": random_features(rng, 77)}
+    lines = [
+        f'{chrom}\tensembl\texon\t{start}\t{end}\t.\t+\t.\tgene_name "G{i}";\n'
+        for chrom, chrom_features in features.items()
+        for i, (start, end) in enumerate(chrom_features)
+    ]
+    directory = tmp_path_factory.mktemp("features")
+    gtf = str(directory / "test.gtf.bgz")
+    write_bgzf(gtf, lines)
+    write_feature_store(gtf, f"{gtf}.features")
+    return FeatureStore(f"{gtf}.features", gtf), features
+
+
+def test_overlapping_matches_brute_force(feature_store):
+    store, features = feature_store
+    rng = random.Random(7)
+    for chrom, chrom_features in features.items():
+        chrom_store = store.chromosome(chrom)
+        for _ in range(300):
+            start = rng.randint(1, 7_000_000)
+            end = start + rng.randint(0, 1000)
+            expected = [
+                i
+                for i, (feature_start, feature_end) in enumerate(chrom_features)
+                if feature_start <= end and feature_end >= start
+            ]
+            assert (
+                chrom_store.overlapping(start, end) == expected
+            ), f"Expected the features overlapping {chrom}:{start}-{end}."
+
+
+def test_chromosome_without_features(feature_store):
+    store, _ = feature_store
+
+    chrom_store = store.chromosome("GL000192.1")
+
+    assert chrom_store.overlapping(1, 1_000_000) == [], "Expected no features."
+    assert chrom_store.gene_ids(["G1"]) == set(), "Expected no genes."
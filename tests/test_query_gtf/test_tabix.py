@@ -0,0 +1,177 @@
+import random
+import shutil
+import subprocess
+
+import pytest
+
+from test_utils.bgzf import write_bgzf
+from test_utils.tabix_index import FLAG_UCSC, FORMAT_GENERIC, FORMAT_VCF, write_index
+
+# Small blocks, so records and query results span several of them
+BLOCK_SIZE = 997
+NAMES = ["1", "2"]
+INDEX_TYPES = ["tbi", "csi"]
+REGIONS = [
+    ("1", 1, 1),
+    ("1", 1, 50_000),
+    ("1", 2_000_000, 2_100_000),
+    ("1", 4_999_000, 6_000_000),
+    ("2", 1, 10_000_000),
+    ("2", 123_456, 123_456),
+    # Chromosomes missing from the index
+    ("3", 1, 1_000_000),
+    ("GL000192.1", 1, 1_000_000),
+]
+
+
+def random_regions(rng, count):
+    regions = []
+    for _ in range(count):
+        start = rng.randint(1, 5_100_000)
+        regions.append((rng.choice(NAMES), start, start + rng.randint(0, 20_000)))
+    return regions
+
+
+def bed_records(rng):
+    records = []
+    for tid, count in enumerate([3000, 200]):
+        for _ in range(count):
+            beg = rng.randint(0, 5_000_000)
+            records.append((tid, beg, beg + rng.randint(1, 2000)))
+    return sorted(records)
+
+
+def vcf_records(rng):
+    # Some records reach past their REF allele with INFO/END
+    records = []
+    for tid, count in enumerate([1500, 100]):
+        for _ in range(count):
+            beg = rng.randint(0, 5_000_000)
+            ref = rng.choice(["A", "CT", "GAT"])
+            info = rng.choice(
+                ["DP=3", f"END={beg + rng.randint(1, 200_000)}", "SVEND=5;DP=1"]
+            )
+            records.append((tid, beg, ref, info))
+    return sorted(records)
+
+
+def write_bed(path, rng, index_type=None):
+    records = bed_records(rng)
+    lines = [
+        f"{NAMES[tid]}\t{beg}\t{end}\tfeature{i}\n"
+        for i, (tid, beg, end) in enumerate(records)
+    ]
+    offsets = write_bgzf(path, ["#chrom\tstart\tend\tname\n", *lines], BLOCK_SIZE)[1:]
+    if index_type is not None:
+        write_index(
+            f"{path}.{index_type}",
+            NAMES,
+            [(*record, *offset) for record, offset in zip(records, offsets)],
+            FORMAT_GENERIC | FLAG_UCSC,
+            (1, 2, 3),
+            csi=index_type == "csi",
+        )
+    return [
+        (NAMES[tid], beg, end, line[:-1])
+        for (tid, beg, end), line in zip(records, lines)
+    ]
+
+
+def write_vcf(path, rng, index_type=None):
+    records = vcf_records(rng)
+    lines = [
+        f"{NAMES[tid]}\t{beg + 1}\t.\t{ref}\tA\t.\t.\t{info}\n"
+        for tid, beg, ref, info in records
+    ]
+    intervals = []
+    for tid, beg, ref, info in records:
+        end = int(info[4:]) if info.startswith("END=") else beg + len(ref)
+        intervals.append((tid, beg, end))
+    header = [
+        "##fileformat=VCFv4.2\n",
+        "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n",
+    ]
+    offsets = write_bgzf(path, [*header, *lines], BLOCK_SIZE)[len(header) :]
+    if index_type is not None:
+        write_index(
+            f"{path}.{index_type}",
+            NAMES,
+            [(*interval, *offset) for interval, offset in zip(intervals, offsets)],
+            FORMAT_VCF,
+            (1, 2, 0),
+            csi=index_type == "csi",
+        )
+    return [
+        (NAMES[tid], beg, end, line[:-1])
+        for (tid, beg, end), line in zip(intervals, lines)
+    ]
+
+
+def brute_force(records, chrom, start, end):
+    return [
+        line
+        for record_chrom, beg, record_end, line in records
+        if record_chrom == chrom and beg < end and record_end > start - 1
+    ]
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+@pytest.mark.parametrize("write_file", [write_bed, write_vcf])
+def test_fetch_matches_brute_force(tmp_path, index_type, write_file):
+    from shared.indexutils import TabixReader
+
+    rng = random.Random(5)
+    path = str(tmp_path / "records.bgz")
+    records = write_file(path, rng, index_type)
+    reader = TabixReader(path)
+    for chrom, start, end in REGIONS + random_regions(rng, 300):
+        assert list(reader.fetch(chrom, start, end)) == brute_force(
+            records, chrom, start, end
+        ), f"Expected fetch to match every overlapping record in {chrom}:{start}-{end}."
+    reader.close()
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_fetch_skips_earlier_blocks(tmp_path, index_type):
+    from shared.indexutils import TabixReader
+
+    path = str(tmp_path / "records.bgz")
+    records = write_bed(path, random.Random(7), index_type)
+    reader = TabixReader(path)
+    results = list(reader.fetch("1", 4_990_000, 5_000_000))
+    assert results == brute_force(records, "1", 4_990_000, 5_000_000)
+    assert results, "Expected the region to hold records."
+    assert (
+        reader.bgzf.misses <= 3
+    ), "Expected blocks before the region to be skipped using the index."
+    reader.close()
+
+
+def tabix_output(path, chrom, start, end):
+    return subprocess.run(
+        ["tabix", path, f"{chrom}:{start}-{end}"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.splitlines()
+
+
+@pytest.mark.skipif(shutil.which("tabix") is None, reason="tabix is not installed")
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+@pytest.mark.parametrize("write_file,preset", [(write_bed, "bed"), (write_vcf, "vcf")])
+def test_fetch_matches_tabix(tmp_path, index_type, write_file, preset):
+    from shared.indexutils import TabixReader
+
+    rng = random.Random(11)
+    path = str(tmp_path / "records.bgz")
+    write_file(path, rng)
+    subprocess.run(
+        ["tabix", *(["--csi"] if index_type == "csi" else []), "-p", preset, path],
+        check=True,
+    )
+    reader = TabixReader(path)
+    for chrom, start, end in REGIONS + random_regions(rng, 100):
+        assert list(reader.fetch(chrom, start, end)) == tabix_output(
+            path, chrom, start, end
+        ), f"Expected fetch to match tabix for {chrom}:{start}-{end}."
+    reader.close()
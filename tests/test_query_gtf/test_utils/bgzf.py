@@ -0,0 +1,43 @@
+import struct
+import zlib
+
+BGZF_BLOCK_SIZE = 60000
+
+
+def bgzf_block(data):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    header = b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00"
+    return (
+        header
+        + struct.pack("<H", len(compressed) + 25)
+        + compressed
+        + struct.pack("<II", zlib.crc32(data), len(data))
+    )
+
+
+def write_bgzf(path, lines, block_size=BGZF_BLOCK_SIZE):
+    """Writes lines in blocks of block_size bytes, so lines may span blocks.
+
+    Returns the virtual offsets of the start and end of each line.
+    """
+    data = "".join(lines).encode()
+    block_offsets = []
+    with open(path, "wb") as out_file:
+        for start in range(0, len(data), block_size):
+            block_offsets.append(out_file.tell())
+            out_file.write(bgzf_block(data[start : start + block_size]))
+        block_offsets.append(out_file.tell())
+        out_file.write(bgzf_block(b""))
+
+    def virtual_offset(position):
+        block_i, within = divmod(position, block_size)
+        return block_offsets[block_i] << 16 | within
+
+    offsets = []
+    position = 0
+    for line in lines:
+        end = position + len(line.encode())
+        offsets.append((virtual_offset(position), virtual_offset(end)))
+        position = end
+    return offsets
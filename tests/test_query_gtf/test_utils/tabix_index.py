@@ -0,0 +1,92 @@
+import gzip
+import struct
+
+TBI_MIN_SHIFT = 14
+TBI_DEPTH = 5
+FORMAT_GENERIC = 0
+FORMAT_VCF = 2
+FLAG_UCSC = 0x10000
+
+
+def reg2bin(beg, end, min_shift, depth):
+    end -= 1
+    shift = min_shift
+    first_bin = ((1 << (depth * 3)) - 1) // 7
+    for level in range(depth, 0, -1):
+        if beg >> shift == end >> shift:
+            return first_bin + (beg >> shift)
+        first_bin -= 1 << ((level - 1) * 3)
+        shift += 3
+    return 0
+
+
+def bin_start(bin_number, min_shift, depth):
+    first_bin = 0
+    shift = min_shift + depth * 3
+    for level in range(depth + 1):
+        level_bins = 1 << (level * 3)
+        if bin_number < first_bin + level_bins:
+            return (bin_number - first_bin) << shift
+        first_bin += level_bins
+        shift -= 3
+    raise ValueError(f"Bin {bin_number} is deeper than the index")
+
+
+def write_index(path, names, records, file_format, columns, csi=False):
+    """Writes a .tbi, or a .csi with csi, for records as htslib lays them out.
+
+    records are (tid, beg, end, start_voffset, end_voffset) in file order,
+    with 0-based, half-open intervals, and columns the sequence, begin and
+    end column numbers.
+    """
+    min_shift, depth = (TBI_MIN_SHIFT, TBI_DEPTH)
+    names_data = b"".join(name.encode() + b"\0" for name in names)
+    header = (
+        struct.pack("<7i", file_format, *columns, ord("#"), 0, len(names_data))
+        + names_data
+    )
+    if csi:
+        data = struct.pack("<4s3i", b"CSI\x01", min_shift, depth, len(header))
+        data += header + struct.pack("<i", len(names))
+    else:
+        data = struct.pack("<4si", b"TBI\x01", len(names)) + header
+    for tid in range(len(names)):
+        tid_records = [record for record in records if record[0] == tid]
+        bins = {}
+        linear_index = []
+        for _, beg, end, vbeg, vend in tid_records:
+            chunks = bins.setdefault(reg2bin(beg, end, min_shift, depth), [])
+            if chunks and chunks[-1][1] == vbeg:
+                chunks[-1][1] = vend
+            else:
+                chunks.append([vbeg, vend])
+            last_window = (end - 1) >> min_shift
+            linear_index += [None] * (last_window + 1 - len(linear_index))
+            for window in range(beg >> min_shift, last_window + 1):
+                if linear_index[window] is None:
+                    linear_index[window] = vbeg
+        data += struct.pack("<i", len(bins))
+        for bin_number, chunks in sorted(bins.items()):
+            data += struct.pack("<I", bin_number)
+            if csi:
+                start = bin_start(bin_number, min_shift, depth)
+                data += struct.pack(
+                    "<Q",
+                    min(
+                        (vbeg for _, _, end, vbeg, _ in tid_records if end > start),
+                        default=0,
+                    ),
+                )
+            data += struct.pack("<i", len(chunks))
+            for chunk in chunks:
+                data += struct.pack("<2Q", *chunk)
+        if not csi:
+            # Windows without records of their own start where the last did
+            previous = 0
+            for window, offset in enumerate(linear_index):
+                previous = linear_index[window] = previous if offset is None else offset
+            data += struct.pack(
+                f"<i{len(linear_index)}Q", len(linear_index), *linear_index
+            )
+    with open(path, "wb") as index_file:
+        index_file.write(gzip.compress(data))
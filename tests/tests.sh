@@ -6,4 +6,7 @@ cd "$SCRIPT_DIR"
 
 export PATH=$PATH:$SCRIPT_DIR/../layers/binaries/bin/
 pytest -p no:warnings -vv ./test_format_output/
-pytest -p no:warnings -vv ./test_plugin_gnomade_one_kg/
\ No newline at end of file
+pytest -p no:warnings -vv ./test_plugin_gnomad/
+pytest -p no:warnings -vv ./test_plugin_consequence/
+pytest -p no:warnings -vv ./test_query_gtf/
+pytest -p no:warnings -vv ./test_plugin_gnomad_constraint/
@@ -117,6 +117,40 @@ variable "svep-references-table-name" {
   description = "Name of the references table"
 }
 
+variable "payload_encoding" {
+  type        = string
+  description = "Encoding of larger messages between pipeline functions, either json or zlib for a compressed columnar envelope"
+  default     = "json"
+
+  validation {
+    condition     = contains(["json", "zlib"], var.payload_encoding)
+    error_message = "payload_encoding must be \"json\" or \"zlib\"."
+  }
+}
+
+variable "svep-progress-table-name" {
+  type        = string
+  description = "Name of the table counting the tracked functions of each job"
+  default     = "svep-backend-progress"
+}
+
+variable "gnomad_local_store" {
+  type        = bool
+  description = "Build a slim copy of gnomAD in the references bucket and query it instead of the public gnomAD bucket"
+  default     = false
+}
+
+variable "consequence_engine" {
+  type        = string
+  description = "Engine that annotates consequences: \"perl\" for the VEP docker image or \"python\" for the Python port"
+  default     = "perl"
+
+  validation {
+    condition     = contains(["perl", "python"], var.consequence_engine)
+    error_message = "consequence_engine must be \"perl\" or \"python\"."
+  }
+}
+
 # Hub configurations
 variable "hub_name" {
   type        = string
@@ -133,6 +167,8 @@ variable "filters" {
     genes            = optional(list(string), [])
     max_maf          = optional(number, 1)
     min_qual         = optional(number, 0)
+    # key of a BED file in the references bucket, restricting variants to its regions
+    target_bed = optional(string, "")
   })
   description = "Filters to apply to the svep records"
 }